@@ -1,5 +1,7 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_shutdown
+from prometheus_client import multiprocess
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'credit_approval.settings')
@@ -12,3 +14,10 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
+
+
+@worker_process_shutdown.connect
+def mark_pool_process_dead(pid=None, **kwargs):
+    """Drop the metric files of an exiting pool process, like gunicorn's child_exit"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid or os.getpid())
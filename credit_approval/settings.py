@@ -4,7 +4,7 @@ Django settings for credit_approval project.
 
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -30,6 +30,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so the timings cover the rest of the stack
+    'loans.middleware.RequestMetricsMiddleware',
+    'loans.profiling.ProfilingMiddleware',
+    'loans.traffic.TrafficCaptureMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,6 +88,46 @@ else:
         }
     }
 
+# Cache
+# Credit profiles are cached in Redis (the instance already deployed for
+# Celery, on its own database number). SQLite mode, or an empty
+# REDIS_CACHE_URL, falls back to Django's in-process LRU cache.
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='redis://redis:6379/1')
+
+if USE_SQLITE or not REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'credit-approval',
+            'OPTIONS': {
+                'MAX_ENTRIES': config('LOCAL_CACHE_MAX_ENTRIES', default=10000, cast=int),
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+
+# Seconds a customer's cached credit profile stays valid
+CREDIT_PROFILE_CACHE_TTL = config('CREDIT_PROFILE_CACHE_TTL', default=300, cast=int)
+
+# Seconds a view-loan/view-loans response body stays cached under its ETag
+LOAN_RESPONSE_CACHE_TTL = config('LOAN_RESPONSE_CACHE_TTL', default=300, cast=int)
+
+# Seconds a customer or loan version stamp is kept; an expired stamp is
+# replaced by a new one, which only costs clients one full response
+LOAN_VERSION_TTL = config('LOAN_VERSION_TTL', default=86400, cast=int)
+
+# Per-request query counts and timings in Server-Timing headers and logs
+REQUEST_METRICS_ENABLED = config('REQUEST_METRICS_ENABLED', default=True, cast=bool)
+
+# Number of customer/loan IDs each process reserves per allocator round trip
+ID_BLOCK_SIZE = config('ID_BLOCK_SIZE', default=100, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -130,3 +174,53 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+
+# Data ingestion
+# Number of rows read and written per ingestion batch
+INGEST_BATCH_SIZE = config('INGEST_BATCH_SIZE', default=1000, cast=int)
+
+# Number of data rows handled by each task of a parallel ingestion
+INGEST_CHUNK_ROWS = config('INGEST_CHUNK_ROWS', default=50000, cast=int)
+
+# Directory, shared with every Celery worker, where xlsx files are split into
+# per-chunk CSV files for a parallel ingestion
+INGEST_CHUNK_DIR = config('INGEST_CHUNK_DIR', default=str(BASE_DIR / 'ingest_chunks'))
+
+# Source files (.xlsx or .csv) for the ingest tasks
+CUSTOMER_DATA_FILE = config('CUSTOMER_DATA_FILE', default=str(BASE_DIR / 'customer_data.xlsx'))
+LOAN_DATA_FILE = config('LOAN_DATA_FILE', default=str(BASE_DIR / 'loan_data.xlsx'))
+
+# Sampled cProfile profiling (off unless PROFILING_ENABLED)
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+
+# Fraction of requests profiled, and URL names eligible (empty: every view)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_VIEWS = config('PROFILING_VIEWS', default='check_eligibility', cast=Csv())
+
+# Requests sending this value in an X-Profile header are always profiled
+PROFILING_HEADER_TOKEN = config('PROFILING_HEADER_TOKEN', default='')
+
+# Fraction of Celery ingest task runs profiled
+PROFILING_TASK_SAMPLE_RATE = config('PROFILING_TASK_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_TASKS = config(
+    'PROFILING_TASKS',
+    default='loans.tasks.ingest_customer_data,loans.tasks.ingest_loan_data,'
+            'loans.tasks.ingest_customer_chunk,loans.tasks.ingest_loan_chunk',
+    cast=Csv()
+)
+
+# Where .prof files and their summaries are written; the oldest profiles
+# are deleted beyond PROFILING_MAX_FILES
+PROFILING_SPOOL_DIR = config('PROFILING_SPOOL_DIR', default=str(BASE_DIR / 'profiles'))
+PROFILING_MAX_FILES = config('PROFILING_MAX_FILES', default=200, cast=int)
+
+# Functions listed in each profile summary
+PROFILING_TOP_N = config('PROFILING_TOP_N', default=30, cast=int)
+
+# Sampled capture of endpoint traffic for replay_traffic (off unless
+# TRAFFIC_CAPTURE_ENABLED); bodies are sanitized before they are written
+TRAFFIC_CAPTURE_ENABLED = config('TRAFFIC_CAPTURE_ENABLED', default=False, cast=bool)
+TRAFFIC_CAPTURE_SAMPLE_RATE = config('TRAFFIC_CAPTURE_SAMPLE_RATE', default=0.01, cast=float)
+TRAFFIC_CAPTURE_FILE = config(
+    'TRAFFIC_CAPTURE_FILE', default=str(BASE_DIR / 'traffic' / 'traffic.jsonl')
+)
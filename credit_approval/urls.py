@@ -3,8 +3,10 @@ URL configuration for credit_approval project.
 """
 from django.contrib import admin
 from django.urls import path, include
+from loans import views as loan_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', loan_views.metrics, name='metrics'),
     path('api/', include('loans.urls')),
 ]
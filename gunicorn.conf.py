@@ -0,0 +1,14 @@
+import os
+
+from prometheus_client import multiprocess
+
+# Settings for serving the WSGI application with several worker processes:
+#   gunicorn -c gunicorn.conf.py credit_approval.wsgi
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', '4'))
+
+
+def child_exit(server, worker):
+    """Drop the metric files of an exited worker from PROMETHEUS_MULTIPROC_DIR"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
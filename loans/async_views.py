@@ -0,0 +1,184 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from .models import Customer, Loan
+from .credit import aload_customer_profile
+from .metrics import record_response_cache
+from .versions import acustomer_version, aloan_version, aremember_loan_owner, response_cache_key
+from .views import (
+    LOANS_STREAM_CHUNK_SIZE, current_loan_rows, evaluate_eligibility, loan_detail,
+    loan_list_item, loan_page, not_modified_response, parse_view_loans_options,
+    validate_loan_request, view_loan_etag, view_loans_etag
+)
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def check_eligibility(request):
+    """
+    Async check_eligibility.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+
+    try:
+        # Parse request body
+        data = json.loads(request.body)
+
+        # Validate required fields, data types and ranges
+        values, error = validate_loan_request(data)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        customer_id, loan_amount, interest_rate, tenure = values
+
+        # Get customer and its loan history summary from cache or database
+        try:
+            customer, profile = await aload_customer_profile(customer_id)
+        except Customer.DoesNotExist:
+            return JsonResponse({'error': 'Customer not found'}, status=404)
+
+        response_data = evaluate_eligibility(
+            customer, profile, loan_amount, interest_rate, tenure
+        )
+
+        return JsonResponse(response_data, status=200)
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except Exception as e:
+        logger.error(f"Error in async check_eligibility endpoint: {str(e)}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+
+# The csrf_exempt decorator only wraps sync views on Django 4.2
+check_eligibility.csrf_exempt = True
+
+
+async def tagged_json_response(request, etag, build):
+    """
+    Async loans.views.tagged_json_response; build is a coroutine function.
+    """
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        record_response_cache('not_modified')
+        return not_modified
+
+    key = response_cache_key(etag)
+    try:
+        body = await cache.aget(key)
+    except Exception as e:
+        logger.warning(f"Loan response cache unavailable: {str(e)}")
+        body = None
+
+    if body is not None:
+        record_response_cache('hit')
+        response = HttpResponse(body, content_type='application/json')
+    else:
+        record_response_cache('miss')
+        response = await build()
+        if response.status_code != 200:
+            return response
+        try:
+            await cache.aset(key, response.content, settings.LOAN_RESPONSE_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Could not cache loan response: {str(e)}")
+
+    response['ETag'] = etag
+    return response
+
+
+async def view_loan(request, loan_id):
+    """
+    Async view_loan, with the same ETags and response cache.
+    """
+    try:
+        async def read_loan():
+            loan = await Loan.objects.select_related('customer').filter(loan_id=loan_id).afirst()
+            if loan is not None:
+                await aremember_loan_owner(loan_id, loan.customer_id)
+            return loan
+
+        def respond(loan):
+            if loan is None:
+                return JsonResponse({'error': 'Loan not found'}, status=404)
+            return JsonResponse(loan_detail(loan), status=200)
+
+        version = await aloan_version(loan_id)
+        if version is None:
+            # The owner is not known yet, so the version needs the loan first
+            loan = await read_loan()
+            if loan is None:
+                return respond(loan)
+            version = await aloan_version(loan_id, loan.customer_id)
+
+            async def build():
+                return respond(loan)
+        else:
+            async def build():
+                return respond(await read_loan())
+
+        etag = view_loan_etag(loan_id, version)
+        return await tagged_json_response(request, etag, build)
+
+    except Exception as e:
+        logger.error(f"Error in async view_loan endpoint: {str(e)}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+
+async def stream_loan_list(loans):
+    """Async loans.views.stream_loan_list"""
+    yield '['
+    index = 0
+    async for loan in loans.aiterator(chunk_size=LOANS_STREAM_CHUNK_SIZE):
+        yield (',' if index else '') + json.dumps(loan_list_item(loan))
+        index += 1
+    yield ']'
+
+
+async def view_loans(request, customer_id):
+    """
+    Async view_loans, with the same pagination and streaming options,
+    ETags and response cache.
+    """
+    try:
+        options, error = parse_view_loans_options(request.GET)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        paginated, streamed, limit, after = options
+
+        async def build():
+            # Check customer exists
+            if not await Customer.objects.filter(customer_id=customer_id).aexists():
+                return JsonResponse({'error': 'Customer not found'}, status=404)
+
+            loans = current_loan_rows(customer_id, after)
+
+            if streamed:
+                return StreamingHttpResponse(
+                    stream_loan_list(loans), content_type='application/json', status=200
+                )
+
+            if paginated:
+                rows = [loan async for loan in loans[:limit + 1]]
+                return JsonResponse(loan_page(rows, limit), status=200)
+
+            loans_data = [loan_list_item(loan) async for loan in loans]
+            return JsonResponse(loans_data, safe=False, status=200)
+
+        etag = view_loans_etag(customer_id, await acustomer_version(customer_id), request.GET)
+        if streamed:
+            not_modified = not_modified_response(request, etag)
+            if not_modified is not None:
+                return not_modified
+            response = await build()
+            if response.status_code == 200:
+                response['ETag'] = etag
+            return response
+
+        return await tagged_json_response(request, etag, build)
+
+    except Exception as e:
+        logger.error(f"Error in async view_loans endpoint: {str(e)}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
@@ -0,0 +1,224 @@
+import asyncio
+import json
+import statistics
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db.models import Max, Min
+
+from .credit import rebuild_credit_summaries
+from .models import Customer, Loan
+from .synthetic import generate_synthetic_data
+
+
+def server_address(base_url):
+    """(host, port, use_tls) of a base URL, with the scheme's default port"""
+    url = urlsplit(base_url)
+    use_tls = url.scheme == 'https'
+    return url.hostname, url.port or (443 if use_tls else 80), use_tls
+
+
+async def send_request(host, port, method, path, body=b'', use_tls=False):
+    """
+    Send one HTTP/1.1 request on a fresh connection (over TLS when
+    use_tls) and return (status, seconds). Only the stdlib is used so the
+    load generator needs nothing beyond the application's own requirements.
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(host, port, ssl=use_tls or None)
+    try:
+        head = (
+            f'{method} {path} HTTP/1.1\r\n'
+            f'Host: {host}:{port}\r\n'
+            'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            'Connection: close\r\n\r\n'
+        )
+        writer.write(head.encode() + body)
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+    finally:
+        writer.close()
+    status = int(status_line.split()[1]) if status_line else 0
+    return status, time.perf_counter() - started
+
+
+async def run_load(base_url, make_request, total, concurrency):
+    """
+    Issue `total` requests with at most `concurrency` in flight, where
+    make_request(i) returns the (method, path, body) of the i-th request.
+    Returns (latencies, errors, elapsed seconds).
+    """
+    host, port, use_tls = server_address(base_url)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(index):
+        nonlocal errors
+        async with semaphore:
+            try:
+                status, seconds = await send_request(
+                    host, port, *make_request(index), use_tls=use_tls
+                )
+            except OSError:
+                errors += 1
+                return
+            if status >= 400:
+                errors += 1
+            else:
+                latencies.append(seconds)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(total)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def summarize(latencies, errors, elapsed):
+    """Requests per second and latency percentiles in milliseconds"""
+    if not latencies:
+        return {'rps': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'errors': errors}
+    ordered = sorted(latencies)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        'rps': len(ordered) / elapsed,
+        'p50': statistics.median(ordered) * 1000,
+        'p95': percentile(0.95),
+        'p99': percentile(0.99),
+        'errors': errors,
+    }
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve_in_process():
+    """
+    Serve the application from a threaded WSGI server on a free local port
+    for the duration of the block, yielding its base URL. The load
+    generator shares the process (and GIL) with it, so use a separate
+    server for absolute numbers; results are comparable between commits.
+    """
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address[:2]
+        yield f'http://{host}:{port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def sample_ids(model, count, rng, batch_size=500):
+    """
+    Up to `count` existing primary keys of model drawn at random, without
+    scanning the table: random candidates between the lowest and highest
+    key are kept when they exist.
+    """
+    bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return []
+
+    candidates = sorted(set(rng.integers(bounds['low'], bounds['high'] + 1, count * 2).tolist()))
+    found = []
+    for start in range(0, len(candidates), batch_size):
+        found.extend(model.objects.filter(
+            pk__in=candidates[start:start + batch_size]
+        ).values_list('pk', flat=True))
+    rng.shuffle(found)
+    return found[:count] or [bounds['low']]
+
+
+def endpoint_requests(customer_ids, loan_ids):
+    """
+    Request factories for run_load, by URL name: each maps a request
+    index to (method, path, body), cycling through the sampled IDs.
+    """
+    def application(index):
+        return {
+            'customer_id': customer_ids[index % len(customer_ids)],
+            'loan_amount': 50000 + (index % 20) * 10000,
+            'interest_rate': 10 + index % 8,
+            'tenure': 12 * (1 + index % 4),
+        }
+
+    def post(path, data):
+        return 'POST', path, json.dumps(data).encode()
+
+    return {
+        'register': lambda index: post('/api/register/', {
+            'first_name': 'Bench', 'last_name': f'User{index}', 'age': 20 + index % 40,
+            'monthly_income': 30000 + (index % 50) * 2000, 'phone_number': 9000000000 + index,
+        }),
+        'check_eligibility': lambda index: post('/api/check-eligibility/', application(index)),
+        'create_loan': lambda index: post('/api/create-loan/', application(index)),
+        'view_loan': lambda index: (
+            'GET', f'/api/view-loan/{loan_ids[index % len(loan_ids)]}/', b''
+        ),
+        'view_loans': lambda index: (
+            'GET', f'/api/view-loans/{customer_ids[index % len(customer_ids)]}/', b''
+        ),
+    }
+
+
+def parse_scale(value):
+    """Parse a CUSTOMERSxLOANS scale such as 10000x30000"""
+    try:
+        customers, loans = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise ValueError(f'Invalid scale {value!r}, expected CUSTOMERSxLOANS')
+    if customers < 1 or loans < 0:
+        raise ValueError(f'Invalid scale {value!r}')
+    return customers, loans
+
+
+def grow_to_scale(customers, loans, seed):
+    """
+    Top the database up with synthetic data until it holds at least
+    `customers` customers and `loans` loans, and build their summaries.
+    """
+    missing_customers = max(customers - Customer.objects.count(), 0)
+    missing_loans = max(loans - Loan.objects.count(), 0)
+    if not missing_customers and not missing_loans:
+        return
+
+    customer_ids, _ = generate_synthetic_data(missing_customers, missing_loans, seed=seed)
+    rebuild_credit_summaries(customer_ids if customer_ids else None)
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(results, baseline):
+    """
+    Pair results with the baseline entries of the same scale, endpoint
+    and concurrency. Yields (result, baseline_result) pairs.
+    """
+    def key(result):
+        scale = result['scale']
+        return scale['customers'], scale['loans'], result['endpoint'], result['concurrency']
+
+    previous = {key(result): result for result in baseline['results']}
+    for result in results:
+        if key(result) in previous:
+            yield result, previous[key(result)]
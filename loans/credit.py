@@ -0,0 +1,600 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, Min, Q, Sum, Value, When
+from django.db.models.functions import ExtractYear
+
+from .models import Customer, CustomerCreditSummary, Loan
+
+logger = logging.getLogger(__name__)
+
+CENTS = Decimal('0.01')
+
+PROFILE_CACHE_PREFIX = 'credit_profile'
+
+# In-process lock stripes for databases without SELECT ... FOR UPDATE
+_CUSTOMER_LOCK_STRIPES = [threading.Lock() for _ in range(64)]
+
+
+@dataclass(frozen=True)
+class CreditProfile:
+    """
+    Aggregated loan history for one customer.
+    Holds every input used by credit scoring and the eligibility checks.
+    """
+    total_loans: int = 0
+    paid_on_time: int = 0
+    loans_current_year: int = 0
+    total_loan_volume: float = 0.0
+    current_loans_sum: float = 0.0
+    current_emis_sum: float = 0.0
+
+    @classmethod
+    def from_aggregate(cls, row):
+        """Build a profile from a row produced by credit_profile_aggregates()"""
+        return cls(
+            total_loans=row['total_loans'] or 0,
+            paid_on_time=row['paid_on_time'] or 0,
+            loans_current_year=row['loans_current_year'] or 0,
+            total_loan_volume=float(row['total_loan_volume'] or 0),
+            current_loans_sum=float(row['current_loans_sum'] or 0),
+            current_emis_sum=float(row['current_emis_sum'] or 0),
+        )
+
+
+def credit_profile_aggregates(current_year=None, today=None):
+    """
+    Aggregate expressions computing a CreditProfile over a Loan queryset.
+    Current sums cover loans ending on or after today.
+    """
+    if current_year is None:
+        current_year = datetime.now().year
+    current = Q(end_date__gte=today or date.today())
+
+    return {
+        'total_loans': Count('loan_id'),
+        'paid_on_time': Count('loan_id', filter=Q(emis_paid_on_time=F('tenure'))),
+        'loans_current_year': Count('loan_id', filter=Q(start_date__year=current_year)),
+        'total_loan_volume': Sum('loan_amount'),
+        'current_loans_sum': Sum('loan_amount', filter=current),
+        'current_emis_sum': Sum('monthly_repayment', filter=current),
+    }
+
+
+def get_credit_profile(customer, current_year=None):
+    """
+    Compute the CreditProfile for a customer in a single aggregated query.
+    """
+    row = Loan.objects.filter(customer_id=customer.customer_id).aggregate(
+        **credit_profile_aggregates(current_year)
+    )
+    return CreditProfile.from_aggregate(row)
+
+
+def summary_to_profile(summary, current_year=None):
+    """Convert a CustomerCreditSummary row into a CreditProfile"""
+    if current_year is None:
+        current_year = datetime.now().year
+
+    return CreditProfile(
+        total_loans=summary.loan_count,
+        paid_on_time=summary.on_time_count,
+        loans_current_year=summary.yearly_activity.get(str(current_year), 0),
+        total_loan_volume=float(summary.total_volume),
+        current_loans_sum=float(summary.current_principal_sum),
+        current_emis_sum=float(summary.current_emi_sum),
+    )
+
+
+def summary_is_stale(summary, today=None):
+    """True once one of the loans in the summary's current sums has ended"""
+    return summary.current_until is not None and summary.current_until < (today or date.today())
+
+
+def _current_loan_sums_query(customer_ids, today=None):
+    return (
+        Loan.objects.current(today).filter(customer_id__in=customer_ids).order_by()
+        .values('customer_id')
+        .annotate(
+            principal=Sum('loan_amount'), emis=Sum('monthly_repayment'), until=Min('end_date')
+        )
+    )
+
+
+def current_loan_sums(customer_ids, today=None):
+    """
+    Sum the principal and EMIs of each customer's current loans in one
+    grouped query over the (customer_id, end_date) index.
+    Returns a dict of customer_id -> (principal, emis, earliest end date).
+    """
+    return {
+        row['customer_id']: (row['principal'], row['emis'], row['until'])
+        for row in _current_loan_sums_query(customer_ids, today)
+    }
+
+
+# Summary fields a stale summary refresh replaces
+REFRESHED_FIELDS = ('current_principal_sum', 'current_emi_sum', 'current_until')
+
+
+def _refresh_stale_summaries(stale, fresh_sums):
+    """
+    Replace the current sums and current_until of the stale summaries
+    with their fresh_sums (current_loan_sums()) values, and return the
+    queryset and update() values that store them all in one statement.
+    Each row only matches while it still holds its stale current_until,
+    so a concurrent rebuild is not overwritten.
+    """
+    guard = Q()
+    whens = {field: [] for field in REFRESHED_FIELDS}
+    for summary in stale:
+        principal, emis, until = fresh_sums.get(summary.customer_id, (0, 0, None))
+        guard |= Q(customer_id=summary.customer_id, current_until=summary.current_until)
+        summary.current_principal_sum = principal or Decimal(0)
+        summary.current_emi_sum = emis or Decimal(0)
+        summary.current_until = until
+        for field in REFRESHED_FIELDS:
+            output_field = CustomerCreditSummary._meta.get_field(field)
+            whens[field].append(When(
+                customer_id=summary.customer_id,
+                then=Value(getattr(summary, field), output_field=output_field)
+            ))
+
+    return CustomerCreditSummary.objects.filter(guard), {
+        field: Case(*whens[field], output_field=CustomerCreditSummary._meta.get_field(field))
+        for field in REFRESHED_FIELDS
+    }
+
+
+def summaries_to_profiles(summaries):
+    """
+    Convert summary rows into a dict of customer_id -> CreditProfile.
+    The current sums of stale summaries are recomputed with one extra
+    query and stored with one more, whatever the number of summaries.
+    """
+    stale = [summary for summary in summaries if summary_is_stale(summary)]
+    if stale:
+        fresh_sums = current_loan_sums([summary.customer_id for summary in stale])
+        queryset, values = _refresh_stale_summaries(stale, fresh_sums)
+        queryset.update(**values)
+
+    return {summary.customer_id: summary_to_profile(summary) for summary in summaries}
+
+
+def _load_customer_profile_from_db(customer_id):
+    """
+    Fetch a customer and its CreditProfile from the database.
+    Uses the credit summary row (one primary-key lookup) when present and
+    falls back to aggregating the loans table otherwise.
+    """
+    try:
+        summary = CustomerCreditSummary.objects.select_related('customer').get(
+            customer_id=customer_id
+        )
+    except CustomerCreditSummary.DoesNotExist:
+        customer = Customer.objects.get(customer_id=customer_id)
+        return customer, get_credit_profile(customer)
+
+    return summary.customer, summaries_to_profiles([summary])[customer_id]
+
+
+@contextmanager
+def locked_customer_profile(customer_id):
+    """
+    Open a transaction holding the customer's row lock and yield its
+    (customer, profile) read under that lock, so concurrent loan
+    decisions for one customer are serialized while other customers
+    proceed in parallel.
+    On databases without SELECT ... FOR UPDATE (SQLite) the lock is an
+    in-process one, which covers the single-process development server.
+    Raises Customer.DoesNotExist for unknown customers.
+    """
+    if connection.features.has_select_for_update:
+        local_lock = None
+    else:
+        local_lock = _CUSTOMER_LOCK_STRIPES[customer_id % len(_CUSTOMER_LOCK_STRIPES)]
+        local_lock.acquire()
+
+    try:
+        with transaction.atomic():
+            customer = Customer.objects.select_for_update().get(customer_id=customer_id)
+            summary = CustomerCreditSummary.objects.filter(customer_id=customer_id).first()
+            if summary is None:
+                profile = get_credit_profile(customer)
+            else:
+                profile = summaries_to_profiles([summary])[customer_id]
+            yield customer, profile
+    finally:
+        if local_lock is not None:
+            local_lock.release()
+
+
+async def _aload_customer_profile_from_db(customer_id):
+    """Async _load_customer_profile_from_db, using the async ORM"""
+    try:
+        summary = await CustomerCreditSummary.objects.select_related('customer').aget(
+            customer_id=customer_id
+        )
+    except CustomerCreditSummary.DoesNotExist:
+        customer = await Customer.objects.aget(customer_id=customer_id)
+        row = await Loan.objects.filter(customer_id=customer_id).aaggregate(
+            **credit_profile_aggregates()
+        )
+        return customer, CreditProfile.from_aggregate(row)
+
+    if summary_is_stale(summary):
+        fresh_sums = {}
+        async for row in _current_loan_sums_query([customer_id]):
+            fresh_sums[customer_id] = (row['principal'], row['emis'], row['until'])
+        queryset, values = _refresh_stale_summaries([summary], fresh_sums)
+        await queryset.aupdate(**values)
+
+    return summary.customer, summary_to_profile(summary)
+
+
+def _profile_cache_key(customer_id):
+    return f"{PROFILE_CACHE_PREFIX}:{customer_id}"
+
+
+def _count_cache_event(event, count=1):
+    """Increment the shared hit/miss counter for the profile cache"""
+    if not count:
+        return
+
+    key = f"{PROFILE_CACHE_PREFIX}:stats:{event}"
+    try:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, count)
+    except Exception as e:
+        logger.warning(f"Could not update credit profile cache stats: {str(e)}")
+
+
+def load_customer_profile(customer_id, use_cache=True):
+    """
+    Fetch a customer and its CreditProfile.
+    Results are cached per customer for CREDIT_PROFILE_CACHE_TTL seconds;
+    pass use_cache=False to always read from the database.
+    Raises Customer.DoesNotExist for unknown customers.
+    """
+    if not use_cache:
+        return _load_customer_profile_from_db(customer_id)
+
+    key = _profile_cache_key(customer_id)
+    try:
+        cached = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Credit profile cache unavailable: {str(e)}")
+        cached = None
+
+    if cached is not None:
+        _count_cache_event('hits')
+        return cached
+
+    _count_cache_event('misses')
+    result = _load_customer_profile_from_db(customer_id)
+
+    try:
+        cache.set(key, result, settings.CREDIT_PROFILE_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Could not cache credit profile: {str(e)}")
+
+    return result
+
+
+async def _acount_cache_event(event, count=1):
+    """Async _count_cache_event"""
+    key = f"{PROFILE_CACHE_PREFIX}:stats:{event}"
+    try:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key, count)
+    except Exception as e:
+        logger.warning(f"Could not update credit profile cache stats: {str(e)}")
+
+
+async def aload_customer_profile(customer_id):
+    """
+    Async load_customer_profile for async views; reads and fills the same
+    cache entries.
+    Raises Customer.DoesNotExist for unknown customers.
+    """
+    key = _profile_cache_key(customer_id)
+    try:
+        cached = await cache.aget(key)
+    except Exception as e:
+        logger.warning(f"Credit profile cache unavailable: {str(e)}")
+        cached = None
+
+    if cached is not None:
+        await _acount_cache_event('hits')
+        return cached
+
+    await _acount_cache_event('misses')
+    result = await _aload_customer_profile_from_db(customer_id)
+
+    try:
+        await cache.aset(key, result, settings.CREDIT_PROFILE_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Could not cache credit profile: {str(e)}")
+
+    return result
+
+
+def _load_customer_profiles_from_db(customer_ids):
+    """
+    Fetch several customers and their CreditProfiles in at most three
+    queries: summary rows first, then customers without a summary and the
+    grouped loan aggregates for those.
+    """
+    summaries = list(
+        CustomerCreditSummary.objects.select_related('customer').filter(
+            customer_id__in=customer_ids
+        )
+    )
+    profiles = summaries_to_profiles(summaries)
+    results = {
+        summary.customer_id: (summary.customer, profiles[summary.customer_id])
+        for summary in summaries
+    }
+
+    remaining = [customer_id for customer_id in customer_ids if customer_id not in results]
+    if not remaining:
+        return results
+
+    customers = Customer.objects.in_bulk(remaining)
+    if not customers:
+        return results
+
+    aggregates = {
+        row['customer_id']: row
+        for row in Loan.objects.filter(customer_id__in=list(customers)).order_by()
+        .values('customer_id').annotate(**credit_profile_aggregates())
+    }
+    for customer_id, customer in customers.items():
+        row = aggregates.get(customer_id)
+        profile = CreditProfile.from_aggregate(row) if row else CreditProfile()
+        results[customer_id] = (customer, profile)
+
+    return results
+
+
+def load_customer_profiles(customer_ids):
+    """
+    Fetch several customers and their CreditProfiles at once, using the
+    cache for repeat customers and a constant number of queries otherwise.
+    Returns a dict of customer_id -> (customer, profile); unknown
+    customers are left out.
+    """
+    customer_ids = list(dict.fromkeys(customer_ids))
+    if not customer_ids:
+        return {}
+
+    keys = {_profile_cache_key(customer_id): customer_id for customer_id in customer_ids}
+    try:
+        cached = cache.get_many(list(keys))
+    except Exception as e:
+        logger.warning(f"Credit profile cache unavailable: {str(e)}")
+        cached = {}
+
+    results = {keys[key]: value for key, value in cached.items()}
+    missing = [customer_id for customer_id in customer_ids if customer_id not in results]
+    _count_cache_event('hits', len(results))
+    _count_cache_event('misses', len(missing))
+
+    if missing:
+        loaded = _load_customer_profiles_from_db(missing)
+        results.update(loaded)
+        try:
+            cache.set_many(
+                {_profile_cache_key(customer_id): value for customer_id, value in loaded.items()},
+                settings.CREDIT_PROFILE_CACHE_TTL
+            )
+        except Exception as e:
+            logger.warning(f"Could not cache credit profiles: {str(e)}")
+
+    return results
+
+
+def invalidate_customer_profiles(customer_ids):
+    """
+    Drop the cached credit profiles of the given customers once the
+    current transaction commits (immediately outside a transaction).
+    """
+    keys = [_profile_cache_key(customer_id) for customer_id in set(customer_ids)]
+    if not keys:
+        return
+
+    def delete_keys():
+        try:
+            cache.delete_many(keys)
+        except Exception as e:
+            logger.error(f"Could not invalidate credit profile cache: {str(e)}")
+
+    transaction.on_commit(delete_keys)
+
+
+def credit_profile_cache_stats():
+    """Return the hit/miss counters of the credit profile cache"""
+    try:
+        counters = cache.get_many([
+            f"{PROFILE_CACHE_PREFIX}:stats:hits",
+            f"{PROFILE_CACHE_PREFIX}:stats:misses",
+        ])
+    except Exception as e:
+        logger.warning(f"Credit profile cache unavailable: {str(e)}")
+        counters = {}
+
+    hits = counters.get(f"{PROFILE_CACHE_PREFIX}:stats:hits", 0)
+    misses = counters.get(f"{PROFILE_CACHE_PREFIX}:stats:misses", 0)
+    lookups = hits + misses
+
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / lookups if lookups else 0.0,
+    }
+
+
+def to_cents(value):
+    """
+    Quantize an amount to whole paise, so that it is stored unchanged
+    whatever rounding the database backend would apply.
+    """
+    return Decimal(str(value)).quantize(CENTS)
+
+
+def _stored_amounts(loan):
+    """
+    The loan_amount and monthly_repayment of a saved loan as stored.
+    Amounts with more than two decimal places are re-read, since each
+    backend rounds them its own way.
+    """
+    amounts = (Decimal(str(loan.loan_amount)), Decimal(str(loan.monthly_repayment)))
+    if all(amount == amount.quantize(CENTS) for amount in amounts):
+        return amounts
+
+    loan.refresh_from_db(fields=['loan_amount', 'monthly_repayment'])
+    return loan.loan_amount, loan.monthly_repayment
+
+
+def record_new_loan(loan):
+    """
+    Add a newly created loan to its customer's credit summary.
+    Must run inside the transaction that created the loan.
+    """
+    invalidate_customer_profiles([loan.customer_id])
+
+    summary = CustomerCreditSummary.objects.select_for_update().filter(
+        customer_id=loan.customer_id
+    ).first()
+
+    if summary is None or summary_is_stale(summary):
+        # No summary yet, or stale current sums: build it from the loans
+        # table, which already includes the new loan
+        rebuild_credit_summaries([loan.customer_id])
+        return
+
+    loan_amount, monthly_repayment = _stored_amounts(loan)
+    year = str(loan.start_date.year)
+
+    summary.loan_count += 1
+    if loan.emis_paid_on_time == loan.tenure:
+        summary.on_time_count += 1
+    summary.total_volume += loan_amount
+    if loan.end_date >= date.today():
+        summary.current_principal_sum += loan_amount
+        summary.current_emi_sum += monthly_repayment
+        if summary.current_until is None or loan.end_date < summary.current_until:
+            summary.current_until = loan.end_date
+    summary.yearly_activity[year] = summary.yearly_activity.get(year, 0) + 1
+    summary.save()
+
+
+def compute_credit_summaries(customer_ids, today=None):
+    """
+    Compute fresh (unsaved) CustomerCreditSummary rows for the given
+    customers from the loans table, using two grouped queries.
+    Customers without loans get an all-zero summary.
+    """
+    customer_ids = list(
+        Customer.objects.filter(customer_id__in=customer_ids)
+        .values_list('customer_id', flat=True)
+    )
+    loans = Loan.objects.filter(customer_id__in=customer_ids).order_by()
+    current = Q(end_date__gte=today or date.today())
+
+    totals = {
+        row['customer_id']: row
+        for row in loans.values('customer_id').annotate(
+            loan_count=Count('loan_id'),
+            on_time_count=Count('loan_id', filter=Q(emis_paid_on_time=F('tenure'))),
+            total_volume=Sum('loan_amount'),
+            current_principal_sum=Sum('loan_amount', filter=current),
+            current_emi_sum=Sum('monthly_repayment', filter=current),
+            current_until=Min('end_date', filter=current),
+        )
+    }
+
+    yearly = {}
+    for row in loans.values('customer_id', year=ExtractYear('start_date')).annotate(
+        count=Count('loan_id')
+    ):
+        yearly.setdefault(row['customer_id'], {})[str(row['year'])] = row['count']
+
+    summaries = []
+    for customer_id in customer_ids:
+        row = totals.get(customer_id, {})
+        summaries.append(CustomerCreditSummary(
+            customer_id=customer_id,
+            loan_count=row.get('loan_count') or 0,
+            on_time_count=row.get('on_time_count') or 0,
+            total_volume=row.get('total_volume') or 0,
+            current_principal_sum=row.get('current_principal_sum') or 0,
+            current_emi_sum=row.get('current_emi_sum') or 0,
+            current_until=row.get('current_until'),
+            yearly_activity=yearly.get(customer_id, {}),
+        ))
+    return summaries
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def rebuild_credit_summaries(customer_ids=None, batch_size=1000):
+    """
+    Recompute and store credit summaries for the given customers
+    (all customers when customer_ids is None). Their cached credit profiles
+    are invalidated. Returns the number of rows written.
+    """
+    if customer_ids is None:
+        customer_ids = Customer.objects.values_list('customer_id', flat=True)
+    customer_ids = sorted(set(customer_ids))
+
+    written = 0
+    for chunk in _chunks(customer_ids, batch_size):
+        summaries = compute_credit_summaries(chunk)
+        with transaction.atomic():
+            invalidate_customer_profiles(chunk)
+            CustomerCreditSummary.objects.filter(customer_id__in=chunk).delete()
+            CustomerCreditSummary.objects.bulk_create(summaries)
+        written += len(summaries)
+    return written
+
+
+def _summary_values(summary):
+    return (
+        summary.loan_count,
+        summary.on_time_count,
+        Decimal(summary.total_volume).quantize(CENTS),
+        Decimal(summary.current_principal_sum).quantize(CENTS),
+        Decimal(summary.current_emi_sum).quantize(CENTS),
+        summary.current_until,
+        {str(year): count for year, count in summary.yearly_activity.items()},
+    )
+
+
+def verify_credit_summaries(customer_ids=None, batch_size=1000):
+    """
+    Compare stored credit summaries against the loans table.
+    Returns the list of customer IDs whose summary is missing or stale.
+    """
+    if customer_ids is None:
+        customer_ids = Customer.objects.values_list('customer_id', flat=True)
+    customer_ids = sorted(set(customer_ids))
+
+    mismatched = []
+    for chunk in _chunks(customer_ids, batch_size):
+        stored = CustomerCreditSummary.objects.in_bulk(chunk)
+        for expected in compute_credit_summaries(chunk):
+            actual = stored.get(expected.customer_id)
+            if actual is None or _summary_values(actual) != _summary_values(expected):
+                mismatched.append(expected.customer_id)
+    return mismatched
@@ -0,0 +1,63 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Distinct (annual rate, tenure) pairs whose annuity factors are kept.
+# Applications and loan books use a small set of rates and tenures, so
+# almost every EMI is a cache hit.
+ANNUITY_FACTOR_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=ANNUITY_FACTOR_CACHE_SIZE)
+def _annuity_terms(annual_rate, tenure_months):
+    if annual_rate == 0:
+        return 1.0, float(tenure_months)
+
+    monthly_rate = annual_rate / (12 * 100)  # Convert to decimal
+    growth = (1 + monthly_rate) ** tenure_months
+    return monthly_rate * growth, growth - 1
+
+
+def annuity_terms(annual_rate, tenure_months):
+    """
+    (numerator, denominator) of the compound interest annuity factor,
+    r(1+r)^n / ((1+r)^n - 1), memoized on (annual_rate, tenure_months).
+    EMIs are principal * numerator / denominator, evaluated in that order
+    so they match the formula exactly.
+    """
+    # Normalized so 12, 12.0 and Decimal('12') share one float entry
+    return _annuity_terms(float(annual_rate), int(tenure_months))
+
+
+def annuity_factor(annual_rate, tenure_months):
+    """EMI per unit of principal"""
+    numerator, denominator = annuity_terms(annual_rate, tenure_months)
+    return numerator / denominator
+
+
+def calculate_emi(principal, annual_rate, tenure_months):
+    """
+    Calculate EMI using compound interest formula.
+    """
+    numerator, denominator = annuity_terms(annual_rate, tenure_months)
+    return float(principal) * numerator / denominator
+
+
+def calculate_emi_many(principals, annual_rates, tenures):
+    """
+    Vectorized calculate_emi over equal-length sequences, as a float64
+    array. The terms of each distinct (rate, tenure) pair come from the
+    same memoized table, so every EMI equals the scalar result exactly.
+    """
+    principals = np.asarray(principals, dtype=np.float64)
+    annual_rates = np.asarray(annual_rates, dtype=np.float64)
+    tenures = np.asarray(tenures, dtype=np.int64)
+    if not len(principals):
+        return np.empty(0, dtype=np.float64)
+
+    pairs, inverse = np.unique(
+        np.column_stack((annual_rates, tenures.astype(np.float64))), axis=0, return_inverse=True
+    )
+    terms = np.array([annuity_terms(float(rate), int(tenure)) for rate, tenure in pairs])
+    inverse = inverse.reshape(-1)
+    return principals * terms[inverse, 0] / terms[inverse, 1]
@@ -0,0 +1,131 @@
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+from django.db.models import Max
+
+from .models import Customer, IdBlockCounter, Loan
+
+logger = logging.getLogger(__name__)
+
+# Attempts made by create_with_id before giving up on ID collisions
+MAX_ID_ATTEMPTS = 3
+
+# Backends that lock the whole database for a writer: a second connection
+# would wait for the caller's transaction, so blocks are reserved inline
+SINGLE_WRITER_VENDORS = {'sqlite'}
+
+
+class BlockIdAllocator:
+    """
+    Hi/lo allocator for the primary key of `model`.
+
+    A block of IDs is reserved with one row-locked update of the
+    IdBlockCounter row `name` and then handed out from memory, so writers
+    only meet in the database once per block. Reservations always start
+    above the highest ID already in the table, which keeps allocated IDs
+    clear of customers and loans imported from the data files.
+    """
+
+    def __init__(self, name, model, first_id=1, block_size=None):
+        self.name = name
+        self.model = model
+        self.first_id = first_id
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._next = 0
+        self._stop = 0
+
+    def reserve_block(self):
+        """
+        Advance the shared counter by one block and return its [start, stop) range.
+        The counter is advanced in a transaction of its own, on a separate
+        connection when the caller is inside a transaction, so a returned
+        block is already committed: the counter row is not locked for the
+        rest of the caller's transaction, and rolling that transaction back
+        cannot hand the block out again. On SINGLE_WRITER_VENDORS the
+        reservation joins the caller's transaction; a block handed out twice
+        after a rollback is caught and skipped by create_with_id.
+        """
+        block_size = self.block_size or settings.ID_BLOCK_SIZE
+        pk_name = self.model._meta.pk.attname
+
+        # Read on the caller's connection, which sees its own new rows
+        highest = self.model.objects.aggregate(highest=Max(pk_name))['highest']
+        floor = max(self.first_id, (highest or 0) + 1)
+
+        if connection.in_atomic_block and connection.vendor not in SINGLE_WRITER_VENDORS:
+            start = self._reserve_autocommit(floor, block_size)
+        else:
+            with transaction.atomic():
+                counter, _ = IdBlockCounter.objects.select_for_update().get_or_create(
+                    name=self.name, defaults={'next_value': self.first_id}
+                )
+                start = max(counter.next_value, floor)
+                counter.next_value = start + block_size
+                counter.save(update_fields=['next_value'])
+
+        logger.debug(f"Reserved {self.name} block [{start}, {start + block_size})")
+        return start, start + block_size
+
+    def _reserve_autocommit(self, floor, block_size):
+        """
+        Advance the counter to at least floor plus one block with a single
+        upsert on a new autocommit connection, and return the block start.
+        """
+        own_connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        table = own_connection.ops.quote_name(IdBlockCounter._meta.db_table)
+        try:
+            with own_connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (name, next_value) VALUES (%s, %s) "
+                    f"ON CONFLICT (name) DO UPDATE SET next_value = CASE "
+                    f"WHEN {table}.next_value > excluded.next_value - %s "
+                    f"THEN {table}.next_value ELSE excluded.next_value - %s END + %s "
+                    f"RETURNING next_value - %s",
+                    [self.name, floor + block_size, block_size, block_size, block_size, block_size]
+                )
+                return cursor.fetchone()[0]
+        finally:
+            own_connection.close()
+
+    def next_id(self):
+        """Return the next unused ID, reserving a new block when needed"""
+        with self._lock:
+            # A forked worker must not reuse its parent's block
+            if self._pid != os.getpid() or self._next >= self._stop:
+                self._next, self._stop = self.reserve_block()
+                self._pid = os.getpid()
+            value = self._next
+            self._next += 1
+            return value
+
+    def discard_block(self):
+        """Drop the rest of the current block so the next ID comes from a fresh one"""
+        with self._lock:
+            self._next = self._stop = 0
+
+
+def create_with_id(allocator, create):
+    """
+    Call create(new_id) in a transaction with IDs from allocator.
+    If the ID was taken meanwhile (e.g. by a data file imported after the
+    block was reserved), the block is discarded and a fresh ID tried.
+    """
+    for attempt in range(1, MAX_ID_ATTEMPTS + 1):
+        new_id = allocator.next_id()
+        try:
+            with transaction.atomic():
+                return create(new_id)
+        except IntegrityError:
+            if attempt == MAX_ID_ATTEMPTS or not allocator.model.objects.filter(pk=new_id).exists():
+                raise
+            logger.warning(f"{allocator.name} {new_id} already taken, reserving a new block")
+            allocator.discard_block()
+
+
+customer_ids = BlockIdAllocator('customer_id', Customer, first_id=1)
+loan_ids = BlockIdAllocator('loan_id', Loan, first_id=1001)
@@ -0,0 +1,570 @@
+from itertools import islice
+from pathlib import Path
+import csv
+import hashlib
+import io
+import pandas as pd
+from openpyxl import load_workbook
+from decimal import Decimal
+from django.db import DatabaseError, connection, models, transaction
+from .models import Customer, IngestionCheckpoint, Loan
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Excel column -> model field, for each data file
+CUSTOMER_COLUMNS = {
+    'Customer ID': 'customer_id',
+    'First Name': 'first_name',
+    'Last Name': 'last_name',
+    'Age': 'age',
+    'Phone Number': 'phone_number',
+    'Monthly Salary': 'monthly_salary',
+    'Approved Limit': 'approved_limit',
+}
+
+LOAN_COLUMNS = {
+    'Customer ID': 'customer_id',
+    'Loan ID': 'loan_id',
+    'Loan Amount': 'loan_amount',
+    'Tenure': 'tenure',
+    'Interest Rate': 'interest_rate',
+    'Monthly payment': 'monthly_repayment',
+    'EMIs paid on Time': 'emis_paid_on_time',
+    'Date of Approval': 'start_date',
+    'End Date': 'end_date',
+}
+
+
+# Column of chunk files (see split_into_chunk_files) holding each row's
+# offset in the original data file
+ROW_OFFSET_COLUMN = 'Row Offset'
+
+
+def _is_blank(row):
+    return all(value is None for value in row)
+
+
+def _iter_xlsx_batches(path, batch_size, start, stop):
+    """
+    Stream an xlsx worksheet with openpyxl in read-only mode.
+    Only one batch of rows is held in memory at a time.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        header = next(sheet.iter_rows(max_row=1, values_only=True), None)
+        if header is None:
+            return
+
+        # Worksheet row 1 is the header, so data row offset N is row N + 2
+        rows = sheet.iter_rows(
+            min_row=start + 2,
+            max_row=stop + 1 if stop is not None else None,
+            values_only=True
+        )
+
+        offset = start
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+
+            # Blank rows are skipped but keep their row numbers
+            index = [
+                offset + position for position, row in enumerate(batch)
+                if not _is_blank(row)
+            ]
+            records = [row for row in batch if not _is_blank(row)]
+            offset += len(batch)
+
+            if records:
+                yield pd.DataFrame.from_records(records, columns=header, index=index)
+    finally:
+        workbook.close()
+
+
+def _iter_csv_batches(path, batch_size, start, stop):
+    """
+    Stream a CSV file in chunks of batch_size rows.
+    Chunk files keep their cells as text and are indexed by their
+    ROW_OFFSET_COLUMN, like the xlsx rows they were split from.
+    """
+    is_chunk_file = pd.read_csv(path, nrows=0).columns[:1].tolist() == [ROW_OFFSET_COLUMN]
+    reader = pd.read_csv(
+        path,
+        skiprows=range(1, start + 1),
+        nrows=stop - start if stop is not None else None,
+        chunksize=batch_size,
+        index_col=0 if is_chunk_file else None,
+        dtype=str if is_chunk_file else None
+    )
+    for chunk in reader:
+        if is_chunk_file:
+            chunk.index = chunk.index.astype('int64')
+        else:
+            chunk.index = chunk.index + start
+        yield chunk
+
+
+def iter_row_batches(path, batch_size, start=0, stop=None):
+    """
+    Yield DataFrames of at most batch_size rows from an xlsx or csv file,
+    optionally restricted to the data rows [start, stop).
+    Each frame is indexed by its row offset in the file (0 = first data
+    row), so spreadsheet row numbers stay correct across batches.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == '.xlsx':
+        return _iter_xlsx_batches(path, batch_size, start, stop)
+    if suffix == '.csv':
+        return _iter_csv_batches(path, batch_size, start, stop)
+    raise ValueError(f"Unsupported data file type: {path}")
+
+
+def count_data_rows(path):
+    """Count the data rows (excluding the header) of an xlsx or csv file"""
+    suffix = Path(path).suffix.lower()
+    if suffix == '.xlsx':
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            return max(0, sum(1 for _ in workbook.active.iter_rows(values_only=True)) - 1)
+        finally:
+            workbook.close()
+    if suffix == '.csv':
+        return sum(len(chunk) for chunk in pd.read_csv(path, chunksize=100000, usecols=[0]))
+    raise ValueError(f"Unsupported data file type: {path}")
+
+
+def split_into_chunk_files(path, chunk_rows, directory):
+    """
+    Parse an xlsx file once and write each run of chunk_rows data rows to
+    its own CSV file in directory, so parallel chunk tasks read only their
+    own rows instead of each re-parsing the workbook up to its range.
+    Row offsets are kept in ROW_OFFSET_COLUMN, so error messages still
+    name rows of the original file. Returns the chunk file paths.
+    """
+    paths = []
+    for number, frame in enumerate(_iter_xlsx_batches(path, chunk_rows, 0, None)):
+        chunk_path = Path(directory) / f'chunk-{number:05d}.csv'
+        frame.to_csv(chunk_path, index_label=ROW_OFFSET_COLUMN)
+        paths.append(str(chunk_path))
+    return paths
+
+
+def plan_row_ranges(total_rows, chunk_rows):
+    """Split total_rows data rows into [start, stop) ranges of chunk_rows"""
+    return [
+        (start, min(start + chunk_rows, total_rows))
+        for start in range(0, total_rows, chunk_rows)
+    ]
+
+
+def _row_number(index):
+    """Spreadsheet row number of a DataFrame index (header is row 1)"""
+    return index + 2
+
+
+def _convert_columns(df, columns, integer_columns, decimal_columns, text_columns, date_columns):
+    """
+    Convert DataFrame columns to typed model columns in a vectorized way.
+    Returns the converted frame (indexed like df) and per-row error messages
+    for rows with missing or unparsable values.
+    """
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    frame = pd.DataFrame(index=df.index)
+    invalid = pd.Series('', index=df.index)
+
+    for column in integer_columns + decimal_columns:
+        values = pd.to_numeric(df[column], errors='coerce')
+        invalid = invalid.mask(values.isna() & (invalid == ''), column)
+        frame[columns[column]] = values
+
+    for column in date_columns:
+        values = pd.to_datetime(df[column], errors='coerce')
+        invalid = invalid.mask(values.isna() & (invalid == ''), column)
+        frame[columns[column]] = values.dt.date
+
+    for column in text_columns:
+        frame[columns[column]] = df[column].astype(str).str.strip()
+
+    errors = [
+        f"Row {_row_number(index)}: Invalid value for '{column}'"
+        for index, column in invalid[invalid != ''].items()
+    ]
+    frame = frame[invalid == '']
+
+    for column in integer_columns:
+        frame[columns[column]] = frame[columns[column]].astype('int64')
+    for column in decimal_columns:
+        frame[columns[column]] = frame[columns[column]].astype('float64')
+
+    return frame, errors
+
+
+def normalize_customer_frame(df):
+    """
+    Convert a customer_data.xlsx DataFrame into customer field columns.
+    Returns (frame, errors).
+    """
+    frame, errors = _convert_columns(
+        df,
+        CUSTOMER_COLUMNS,
+        integer_columns=['Customer ID', 'Age'],
+        decimal_columns=['Monthly Salary', 'Approved Limit'],
+        text_columns=['First Name', 'Last Name', 'Phone Number'],
+        date_columns=[],
+    )
+    frame['current_debt'] = 0  # Default value as per PRD
+    frame['monthly_income'] = frame['monthly_salary']  # Same as monthly_salary
+    return frame, errors
+
+
+def normalize_loan_frame(df):
+    """
+    Convert a loan_data.xlsx DataFrame into loan field columns.
+    Returns (frame, errors).
+    """
+    return _convert_columns(
+        df,
+        LOAN_COLUMNS,
+        integer_columns=['Customer ID', 'Loan ID', 'Tenure', 'EMIs paid on Time'],
+        decimal_columns=['Loan Amount', 'Interest Rate', 'Monthly payment'],
+        text_columns=[],
+        date_columns=['Date of Approval', 'End Date'],
+    )
+
+
+def _frame_records(frame):
+    """Yield (row_number, field dict) pairs with native Python values"""
+    for index, record in zip(frame.index, frame.to_dict('records')):
+        yield _row_number(index), record
+
+
+def bulk_upsert(model, objects, batch_size):
+    """
+    Insert or update model objects with chunked
+    bulk_create(update_conflicts=True) calls on the primary key.
+    `objects` is a list of (row_number, instance) pairs; when a chunk fails
+    its rows are retried one by one so errors are reported per row.
+    Returns (success_count, errors, failed_row_numbers).
+    """
+    unique_field = model._meta.pk.name
+    update_fields = [
+        field.name for field in model._meta.concrete_fields if not field.primary_key
+    ]
+
+    def upsert(instances):
+        model.objects.bulk_create(
+            instances,
+            update_conflicts=True,
+            unique_fields=[unique_field],
+            update_fields=update_fields,
+        )
+
+    success_count = 0
+    errors = []
+    failed_row_numbers = set()
+    for start in range(0, len(objects), batch_size):
+        batch = objects[start:start + batch_size]
+        try:
+            with transaction.atomic():
+                upsert([instance for _, instance in batch])
+            success_count += len(batch)
+        except DatabaseError:
+            # Find the offending rows one at a time
+            for row_number, instance in batch:
+                try:
+                    with transaction.atomic():
+                        upsert([instance])
+                    success_count += 1
+                except DatabaseError as e:
+                    errors.append(f"Row {row_number}: {str(e)}")
+                    failed_row_numbers.add(row_number)
+
+    return success_count, errors, failed_row_numbers
+
+
+def _copy_value(value):
+    """Render a database value for COPY ... WITH (FORMAT csv, NULL '\\N')"""
+    return r'\N' if value is None else value
+
+
+def copy_upsert(model, objects, batch_size):
+    """
+    PostgreSQL fast path with the same contract as bulk_upsert.
+    Each chunk is streamed with COPY into a temporary staging table and
+    merged into the real table with one INSERT ... ON CONFLICT statement.
+    Chunks that fail are handed to bulk_upsert for per-row error reporting.
+    Rows repeating a primary key are superseded by the last one, as one
+    INSERT ... ON CONFLICT cannot update a row twice; they count as written.
+    Other databases (e.g. USE_SQLITE) fall back to bulk_upsert entirely.
+    """
+    if connection.vendor != 'postgresql':
+        logger.info("COPY ingestion requires PostgreSQL, using bulk upserts instead")
+        return bulk_upsert(model, objects, batch_size)
+
+    latest = {}
+    for row_number, instance in objects:
+        latest[instance.pk] = (row_number, instance)
+    superseded = len(objects) - len(latest)
+    objects = list(latest.values())
+
+    quote = connection.ops.quote_name
+    fields = model._meta.concrete_fields
+    table = quote(model._meta.db_table)
+    staging = quote(f"{model._meta.db_table}_staging")
+    columns = ', '.join(quote(field.column) for field in fields)
+    updates = ', '.join(
+        f"{quote(field.column)} = EXCLUDED.{quote(field.column)}"
+        for field in fields if not field.primary_key
+    )
+
+    success_count = superseded
+    errors = []
+    failed_row_numbers = set()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging} "
+            f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+
+        for start in range(0, len(objects), batch_size):
+            batch = objects[start:start + batch_size]
+
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for _, instance in batch:
+                writer.writerow([
+                    _copy_value(field.get_db_prep_save(getattr(instance, field.attname), connection))
+                    for field in fields
+                ])
+            buffer.seek(0)
+
+            try:
+                with transaction.atomic():
+                    cursor.execute(f"TRUNCATE {staging}")
+                    cursor.cursor.copy_expert(
+                        f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                        buffer
+                    )
+                    cursor.execute(
+                        f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} "
+                        f"ON CONFLICT ({quote(model._meta.pk.column)}) DO UPDATE SET {updates}"
+                    )
+                success_count += len(batch)
+            except (DatabaseError, connection.Database.Error):
+                # Find the offending rows through the ORM path
+                batch_success, batch_errors, batch_failed = bulk_upsert(model, batch, batch_size)
+                success_count += batch_success
+                errors.extend(batch_errors)
+                failed_row_numbers.update(batch_failed)
+
+    return success_count, errors, failed_row_numbers
+
+
+# Write strategies selectable with ingest_data --engine
+UPSERT_ENGINES = {
+    'orm': bulk_upsert,
+    'copy': copy_upsert,
+}
+
+
+def _deduplicate(records, key):
+    """
+    Keep the last record for each key, like sequential update_or_create.
+    Returns (unique_records, duplicate_count).
+    """
+    latest = {}
+    for row_number, record in records:
+        latest[record[key]] = (row_number, record)
+    return list(latest.values()), len(records) - len(latest)
+
+
+def existing_customer_id_set(customer_ids, batch_size):
+    """
+    Return the subset of customer_ids present in the customers table,
+    querying batch_size IDs at a time.
+    """
+    customer_ids = sorted(customer_ids)
+    existing = set()
+    for start in range(0, len(customer_ids), batch_size):
+        existing.update(
+            Customer.objects.filter(customer_id__in=customer_ids[start:start + batch_size])
+            .values_list('customer_id', flat=True)
+        )
+    return existing
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents, read in 1 MiB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def unchanged_checkpoint(data_type, file_hash):
+    """
+    Return the checkpoint of data_type if its last run ingested a file
+    with the same contents without errors, else None.
+    """
+    return IngestionCheckpoint.objects.filter(
+        data_type=data_type, file_hash=file_hash, error_count=0
+    ).first()
+
+
+def save_checkpoint(data_type, path, file_hash, stats):
+    """Record the file hash and outcome of an ingestion run"""
+    IngestionCheckpoint.objects.update_or_create(
+        data_type=data_type,
+        defaults={
+            'file_path': str(path),
+            'file_hash': file_hash,
+            'row_count': stats['total_processed'],
+            'error_count': stats['error_count'],
+        }
+    )
+
+
+def _stored_value(field, value):
+    """A field value as the database stores it, so rows compare exactly"""
+    value = field.to_python(value)
+    if isinstance(field, models.DecimalField) and value is not None:
+        value = value.quantize(Decimal(1).scaleb(-field.decimal_places))
+    return value
+
+
+def _row_image(model, record):
+    """Stored values of the fields in a normalized record"""
+    return {
+        name: _stored_value(model._meta.get_field(name), value)
+        for name, value in record.items()
+    }
+
+
+def _existing_rows(model, keys, fields, batch_size):
+    """Return {pk: row image} of the rows among keys already in the table"""
+    keys = sorted(keys)
+    key = model._meta.pk.attname
+    rows = {}
+    for start in range(0, len(keys), batch_size):
+        for row in model.objects.filter(
+            **{f'{key}__in': keys[start:start + batch_size]}
+        ).values(*fields):
+            rows[row[key]] = _row_image(model, row)
+    return rows
+
+
+def _upsert_delta(model, key, records, batch_size, engine, full, errors, build=None):
+    """
+    Write the rows of `records` that are new or differ from the table
+    (all rows when full). Rows are compared with the stored rows, so rows
+    deleted or edited in the database since the last run are written again.
+    `build` may reject a record by returning an error message.
+    Returns the stats of the write, the written records and the
+    {pk: row image} of the rows that already existed.
+    """
+    images = {record[key]: _row_image(model, record) for _, record in records}
+    fields = list(records[0][1]) if records else []
+    existing = _existing_rows(model, images, fields, batch_size)
+
+    changed = [
+        (row_number, record) for row_number, record in records
+        if full or existing.get(record[key]) != images[record[key]]
+    ]
+
+    objects = []
+    for row_number, record in changed:
+        error = build(record) if build else None
+        if error:
+            errors.append(f"Row {row_number}: {error}")
+            continue
+        objects.append((row_number, model(**record)))
+
+    success_count, upsert_errors, failed_row_numbers = UPSERT_ENGINES[engine](
+        model, objects, batch_size
+    )
+    errors.extend(upsert_errors)
+
+    written = [
+        instance for row_number, instance in objects
+        if row_number not in failed_row_numbers
+    ]
+    inserted_count = sum(1 for instance in written if getattr(instance, key) not in existing)
+    return {
+        'inserted_count': inserted_count,
+        'updated_count': len(written) - inserted_count,
+        'skipped_count': len(records) - len(changed),
+    }, written, existing
+
+
+def upsert_customers(frame, batch_size, engine='orm', full=False):
+    """
+    Bulk upsert normalized customer rows with the given UPSERT_ENGINES entry.
+    Rows identical to the stored ones are skipped unless full is set.
+    Returns a stats dict with success/error/insert/update/skip counts and
+    the IDs of the customers written.
+    """
+    records, duplicates = _deduplicate(list(_frame_records(frame)), 'customer_id')
+
+    errors = []
+    delta, written, _ = _upsert_delta(
+        Customer, 'customer_id', records, batch_size, engine, full, errors
+    )
+    delta['skipped_count'] += duplicates
+
+    return {
+        'success_count': len(written) + delta['skipped_count'],
+        'errors': errors,
+        'customer_ids': {instance.customer_id for instance in written},
+        **delta,
+    }
+
+
+def upsert_loans(frame, batch_size, engine='orm', full=False):
+    """
+    Bulk upsert normalized loan rows whose customer exists, with the given
+    UPSERT_ENGINES entry.
+    Rows identical to the stored ones are skipped unless full is set.
+    Returns a stats dict with success/error/insert/update/skip counts and
+    the IDs of the customers whose loans changed, including previous
+    owners of re-assigned loans.
+    """
+    records, duplicates = _deduplicate(list(_frame_records(frame)), 'loan_id')
+
+    # Resolve every referenced customer in one set-based pass
+    existing_customer_ids = existing_customer_id_set(
+        {record['customer_id'] for _, record in records}, batch_size
+    )
+
+    def check_customer(record):
+        if record['customer_id'] not in existing_customer_ids:
+            return f"Customer ID {record['customer_id']} not found"
+        return None
+
+    errors = []
+    delta, written, existing = _upsert_delta(
+        Loan, 'loan_id', records, batch_size, engine, full, errors,
+        build=check_customer
+    )
+    delta['skipped_count'] += duplicates
+
+    # Previous owners of the rewritten loans also need their credit
+    # summary refreshed
+    customer_ids = {instance.customer_id for instance in written}
+    customer_ids.update(
+        existing[instance.loan_id]['customer_id'] for instance in written
+        if instance.loan_id in existing
+    )
+
+    return {
+        'success_count': len(written) + delta['skipped_count'],
+        'errors': errors,
+        'customer_ids': customer_ids,
+        **delta,
+    }
@@ -0,0 +1,105 @@
+from django.core.management.base import BaseCommand, CommandError
+from loans.benchmarking import run_load, summarize
+from loans.models import Loan
+import asyncio
+import json
+
+# Sync and async URL of each benchmarked endpoint
+ENDPOINTS = {
+    'view-loan': ('/api/view-loan/{loan_id}/', '/api/async/view-loan/{loan_id}/'),
+    'view-loans': ('/api/view-loans/{customer_id}/', '/api/async/view-loans/{customer_id}/'),
+    'check-eligibility': ('/api/check-eligibility/', '/api/async/check-eligibility/'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Benchmark the sync and async read endpoints at high concurrency against '
+            'a running server (serve with uvicorn to exercise the async views)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url',
+            type=str,
+            default='http://127.0.0.1:8000',
+            help='Server to benchmark'
+        )
+
+        parser.add_argument(
+            '--endpoint',
+            type=str,
+            choices=[*ENDPOINTS, 'all'],
+            default='all',
+            help='Endpoint to benchmark'
+        )
+
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Requests sent to each URL'
+        )
+
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=200,
+            help='Requests kept in flight at once'
+        )
+
+        parser.add_argument(
+            '--customer-id',
+            type=int,
+            default=1,
+            help='Customer used by view-loans and check-eligibility'
+        )
+
+        parser.add_argument(
+            '--loan-id',
+            type=int,
+            default=None,
+            help='Loan used by view-loan (defaults to the first loan of --customer-id)'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+
+        loan_id = options['loan_id'] or self.first_loan_id(options['customer_id'])
+        names = list(ENDPOINTS) if options['endpoint'] == 'all' else [options['endpoint']]
+        eligibility = json.dumps({
+            'customer_id': options['customer_id'],
+            'loan_amount': 100000,
+            'interest_rate': 12,
+            'tenure': 12,
+        }).encode()
+
+        self.stdout.write(
+            f"{options['requests']} requests per URL, {options['concurrency']} concurrent, "
+            f"against {options['base_url']}"
+        )
+        self.stdout.write(
+            f"{'Endpoint':<20}{'Mode':<7}{'req/s':>10}{'p50 ms':>10}"
+            f"{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"
+        )
+
+        for name in names:
+            method, body = ('POST', eligibility) if name == 'check-eligibility' else ('GET', b'')
+            for mode, template in zip(('sync', 'async'), ENDPOINTS[name]):
+                path = template.format(loan_id=loan_id, customer_id=options['customer_id'])
+                stats = summarize(*asyncio.run(run_load(
+                    options['base_url'], lambda index: (method, path, body),
+                    options['requests'], options['concurrency']
+                )))
+                style = self.style.WARNING if stats['errors'] else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"{name:<20}{mode:<7}{stats['rps']:>10.1f}{stats['p50']:>10.1f}"
+                    f"{stats['p95']:>10.1f}{stats['p99']:>10.1f}{stats['errors']:>8}"
+                ))
+
+    def first_loan_id(self, customer_id):
+        """Pick a loan of the benchmarked customer for view-loan"""
+        loan_id = (Loan.objects.filter(customer_id=customer_id)
+                   .order_by('loan_id').values_list('loan_id', flat=True).first())
+        if loan_id is None:
+            raise CommandError(f'Customer {customer_id} has no loans; pass --loan-id')
+        return loan_id
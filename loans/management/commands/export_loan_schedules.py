@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from loans.schedules import export_schedules
+
+
+class Command(BaseCommand):
+    help = 'Export the month-by-month amortization schedules of loans to a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='loan_schedules.csv',
+            help='CSV file written, one row per loan instalment'
+        )
+
+        parser.add_argument(
+            '--customer-id',
+            type=int,
+            default=None,
+            help="Only export this customer's loans"
+        )
+
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Loans whose schedules are computed together'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive')
+
+        with open(options['output'], 'w', newline='') as f:
+            loans, rows = export_schedules(f, options['customer_id'], options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {rows} instalments of {loans} loans to {options['output']}"
+        ))
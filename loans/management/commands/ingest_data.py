@@ -1,12 +1,12 @@
 from django.core.management.base import BaseCommand, CommandError
-from loans.tasks import ingest_customer_data, ingest_loan_data, ingest_all_data
+from loans.tasks import ingest_customer_data, ingest_loan_data, ingest_all_data, ingest_parallel
 import logging
 
 logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
-    help = 'Ingest data from Excel files into the database'
+    help = 'Ingest data from Excel or CSV files into the database'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -23,9 +23,73 @@ class Command(BaseCommand):
             help='Run synchronously instead of using Celery'
         )
 
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Rows read and written per batch (defaults to INGEST_BATCH_SIZE)'
+        )
+
+        parser.add_argument(
+            '--engine',
+            type=str,
+            choices=['orm', 'copy'],
+            default='orm',
+            help='Write path: bulk ORM upserts, or PostgreSQL COPY into a staging table '
+                 '(falls back to orm on SQLite)'
+        )
+
+        parser.add_argument(
+            '--parallel',
+            action='store_true',
+            help='Split the files into row ranges and ingest them across the Celery worker pool'
+        )
+
+        parser.add_argument(
+            '--chunk-rows',
+            type=int,
+            default=None,
+            help='Data rows per parallel chunk task (defaults to INGEST_CHUNK_ROWS)'
+        )
+
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rewrite every row, including unchanged files and rows'
+        )
+
+        parser.add_argument(
+            '--customer-file',
+            type=str,
+            default=None,
+            help='Customer data file, .xlsx or .csv (defaults to CUSTOMER_DATA_FILE)'
+        )
+
+        parser.add_argument(
+            '--loan-file',
+            type=str,
+            default=None,
+            help='Loan data file, .xlsx or .csv (defaults to LOAN_DATA_FILE)'
+        )
+
     def handle(self, *args, **options):
         data_type = options['type']
         sync_mode = options['sync']
+        batch_size = options['batch_size']
+        customer_file = options['customer_file']
+        loan_file = options['loan_file']
+
+        engine = options['engine']
+        parallel = options['parallel']
+        chunk_rows = options['chunk_rows']
+        full = options['full']
+
+        if batch_size is not None and batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+        if chunk_rows is not None and chunk_rows <= 0:
+            raise CommandError('--chunk-rows must be positive')
+        if parallel and sync_mode:
+            raise CommandError('--parallel dispatches Celery tasks and cannot be combined with --sync')
 
         self.stdout.write(
             self.style.SUCCESS(f'Starting data ingestion for: {data_type}')
@@ -35,32 +99,43 @@ class Command(BaseCommand):
             if sync_mode:
                 # Run synchronously
                 if data_type == 'customers':
-                    result = ingest_customer_data()
+                    result = ingest_customer_data(batch_size, customer_file, engine, full)
                     self.display_result('Customer', result)
                 elif data_type == 'loans':
-                    result = ingest_loan_data()
+                    result = ingest_loan_data(batch_size, loan_file, engine, full)
                     self.display_result('Loan', result)
                 else:  # all
-                    result = ingest_all_data()
+                    result = ingest_all_data(batch_size, customer_file, loan_file, engine, full)
                     if result.get('overall_success'):
                         self.display_result('Customer', result['customer_result'])
                         self.display_result('Loan', result['loan_result'])
                     else:
                         raise CommandError(f"Ingestion failed: {result.get('error')}")
+            elif parallel:
+                # Fan out chunk tasks across the Celery worker pool
+                result = ingest_parallel(
+                    data_type, batch_size, chunk_rows, customer_file, loan_file, engine, full
+                )
+                self.stdout.write(
+                    self.style.SUCCESS(f'Parallel ingestion workflow queued: {result.id}')
+                )
+                self.stdout.write(
+                    self.style.WARNING('Chunks are running in background. Check Celery logs for progress.')
+                )
             else:
                 # Run asynchronously with Celery
                 if data_type == 'customers':
-                    task = ingest_customer_data.delay()
+                    task = ingest_customer_data.delay(batch_size, customer_file, engine, full)
                     self.stdout.write(
                         self.style.SUCCESS(f'Customer ingestion task queued: {task.id}')
                     )
                 elif data_type == 'loans':
-                    task = ingest_loan_data.delay()
+                    task = ingest_loan_data.delay(batch_size, loan_file, engine, full)
                     self.stdout.write(
                         self.style.SUCCESS(f'Loan ingestion task queued: {task.id}')
                     )
                 else:  # all
-                    task = ingest_all_data.delay()
+                    task = ingest_all_data.delay(batch_size, customer_file, loan_file, engine, full)
                     self.stdout.write(
                         self.style.SUCCESS(f'Full ingestion task queued: {task.id}')
                     )
@@ -84,6 +159,11 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS(f'  Successfully ingested: {success}')
         )
+        self.stdout.write(
+            f"  Inserted: {result.get('inserted_count', 0)}, "
+            f"Updated: {result.get('updated_count', 0)}, "
+            f"Unchanged: {result.get('skipped_count', 0)}"
+        )
 
         if errors > 0:
             self.stdout.write(
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from loans.credit import rebuild_credit_summaries, verify_credit_summaries
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-customer credit summary table from the loans table and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Only compare stored summaries against the loans table, without rebuilding'
+        )
+
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of customers processed per batch'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+
+        if not options['verify_only']:
+            self.stdout.write('Rebuilding credit summaries...')
+            written = rebuild_credit_summaries(batch_size=batch_size)
+            self.stdout.write(
+                self.style.SUCCESS(f'  Rebuilt {written} credit summaries')
+            )
+
+        self.stdout.write('Verifying credit summaries...')
+        mismatched = verify_credit_summaries(batch_size=batch_size)
+
+        if mismatched:
+            logger.error(f"Stale credit summaries for customers: {mismatched[:10]}")
+            self.stdout.write(
+                self.style.ERROR(f'  {len(mismatched)} summaries are missing or stale')
+            )
+            self.stdout.write('  Sample customer IDs:')
+            for customer_id in mismatched[:3]:
+                self.stdout.write(f'    - {customer_id}')
+            raise CommandError('Credit summary verification failed')
+
+        self.stdout.write(
+            self.style.SUCCESS('  All credit summaries match the loans table')
+        )
@@ -0,0 +1,126 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from loans.benchmarking import current_commit
+from loans.replay import client_sender, http_sender, read_traffic_log, replay, replay_report
+from loans.traffic import CAPTURED_VIEWS
+import asyncio
+import json
+
+
+class Command(BaseCommand):
+    help = ('Replay a traffic capture log against a server or the in-process test client '
+            'and report per-endpoint latencies and status code mismatches. Replayed '
+            'register and create-loan requests write to the target database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'log',
+            type=str,
+            help='JSONL capture log written by TrafficCaptureMiddleware'
+        )
+
+        parser.add_argument(
+            '--base-url',
+            type=str,
+            default=None,
+            help='Replay against a running server (defaults to the in-process test client)'
+        )
+
+        parser.add_argument(
+            '--speedup',
+            type=float,
+            default=1.0,
+            help='Divide the recorded gaps between requests by this factor '
+                 '(0 sends them as fast as --concurrency allows)'
+        )
+
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Most requests in flight'
+        )
+
+        parser.add_argument(
+            '--endpoint',
+            type=str,
+            action='append',
+            choices=CAPTURED_VIEWS,
+            default=None,
+            help='Only replay this endpoint (repeatable; defaults to all)'
+        )
+
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Replay at most this many records, oldest first'
+        )
+
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='Also write the report to this JSON file'
+        )
+
+    def handle(self, *args, **options):
+        if options['speedup'] < 0 or options['concurrency'] < 1:
+            raise CommandError('--speedup must not be negative and --concurrency must be positive')
+
+        try:
+            records = read_traffic_log(options['log'], options['endpoint'], options['limit'])
+        except OSError as e:
+            raise CommandError(f"Could not read {options['log']}: {str(e)}")
+        if not records:
+            self.stdout.write(self.style.WARNING('No matching records in the log'))
+            return
+
+        span = records[-1]['time'] - records[0]['time']
+        self.stdout.write(
+            f'Replaying {len(records)} requests recorded over {span:.1f} s '
+            f"at {options['speedup']:g}x, concurrency {options['concurrency']}..."
+        )
+
+        if options['base_url']:
+            results, elapsed = asyncio.run(replay(
+                records, http_sender(options['base_url']),
+                options['speedup'], options['concurrency']
+            ))
+        else:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                results, elapsed = asyncio.run(replay(
+                    records, client_sender(executor),
+                    options['speedup'], options['concurrency']
+                ))
+
+        report = replay_report(results, elapsed)
+        for view, stats in report.items():
+            self.write_stats(view, stats)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'commit': current_commit(),
+                    'created_at': datetime.now().isoformat(timespec='seconds'),
+                    'log': options['log'],
+                    'target': options['base_url'] or 'in-process',
+                    'speedup': options['speedup'],
+                    'concurrency': options['concurrency'],
+                    'elapsed_s': round(elapsed, 3),
+                    'endpoints': report,
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+    def write_stats(self, view, stats):
+        style = self.style.WARNING if stats['errors'] or stats['mismatches'] else self.style.SUCCESS
+        line = (
+            f"  {view:<18} n={stats['requests']:<6} p50 {stats['p50_ms']:>8.2f} ms  "
+            f"p95 {stats['p95_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms  "
+            f"max {stats['max_ms']:>8.2f} ms  errors {stats['errors']}  "
+            f"mismatches {stats['mismatches']}"
+        )
+        if stats['mismatched_statuses']:
+            line += f" ({', '.join(stats['mismatched_statuses'])})"
+        self.stdout.write(style(line))
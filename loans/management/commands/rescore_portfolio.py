@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+from loans.tasks import rescore_portfolio_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Recompute credit scores for every customer using vectorized NumPy reductions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--with-slab',
+            action='store_true',
+            help='Also store the approval slab for each customer'
+        )
+
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows fetched and written per batch'
+        )
+
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Run synchronously instead of using Celery'
+        )
+
+    def handle(self, *args, **options):
+        with_slab = options['with_slab']
+        batch_size = options['batch_size']
+
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be positive')
+
+        self.stdout.write(self.style.SUCCESS('Starting portfolio rescoring'))
+
+        try:
+            if options['sync']:
+                result = rescore_portfolio_task(with_slab=with_slab, batch_size=batch_size)
+                self.stdout.write('\nPortfolio Rescoring Results:')
+                self.stdout.write(f"  Loans processed: {result['loans_processed']}")
+                self.stdout.write(
+                    self.style.SUCCESS(f"  Customers scored: {result['customers_scored']}")
+                )
+                self.stdout.write(f"  Mean score: {result['mean_score']:.2f}")
+            else:
+                task = rescore_portfolio_task.delay(with_slab=with_slab, batch_size=batch_size)
+                self.stdout.write(
+                    self.style.SUCCESS(f'Portfolio rescoring task queued: {task.id}')
+                )
+                self.stdout.write(
+                    self.style.WARNING('Task is running in background. Check Celery logs for progress.')
+                )
+
+        except Exception as e:
+            logger.error(f"Rescoring command failed: {str(e)}")
+            raise CommandError(f"Rescoring failed: {str(e)}")
@@ -0,0 +1,169 @@
+from contextlib import nullcontext
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from loans.benchmarking import (
+    compare_results, current_commit, endpoint_requests, grow_to_scale, parse_scale, run_load,
+    sample_ids, serve_in_process, summarize
+)
+from loans.models import Customer, Loan
+import asyncio
+import json
+import numpy as np
+
+ENDPOINTS = ['register', 'check_eligibility', 'create_loan', 'view_loan', 'view_loans']
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every endpoint at growing data scales and concurrency levels and '
+            'write p50/p95/p99 latency and throughput to a JSON report. Adds synthetic '
+            'data to the configured database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales',
+            type=str,
+            default='1000x3000,10000x30000',
+            help='Comma-separated CUSTOMERSxLOANS sizes the database is grown to, in order'
+        )
+
+        parser.add_argument(
+            '--concurrency',
+            type=str,
+            default='1,16,64',
+            help='Comma-separated numbers of requests kept in flight'
+        )
+
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Requests per endpoint, scale and concurrency level'
+        )
+
+        parser.add_argument(
+            '--endpoint',
+            type=str,
+            action='append',
+            choices=ENDPOINTS,
+            default=None,
+            help='Endpoint to benchmark (repeatable; defaults to all)'
+        )
+
+        parser.add_argument(
+            '--base-url',
+            type=str,
+            default=None,
+            help='Benchmark a running server using the same database '
+                 '(defaults to an in-process threaded server)'
+        )
+
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for the synthetic data and the sampled IDs'
+        )
+
+        parser.add_argument(
+            '--output',
+            type=str,
+            default='benchmark_results.json',
+            help='JSON report path'
+        )
+
+        parser.add_argument(
+            '--compare',
+            type=str,
+            default=None,
+            help='Earlier JSON report to print latency and throughput changes against'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            scales = [parse_scale(value) for value in options['scales'].split(',')]
+            levels = [int(value) for value in options['concurrency'].split(',')]
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['requests'] < 1 or min(levels) < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        endpoints = options['endpoint'] or ENDPOINTS
+        rng = np.random.default_rng(options['seed'])
+        results = []
+
+        server = nullcontext(options['base_url']) if options['base_url'] else serve_in_process()
+        with server as base_url:
+            for customers, loans in scales:
+                self.stdout.write(
+                    f'Growing the database to {customers} customers, {loans} loans...'
+                )
+                grow_to_scale(customers, loans, options['seed'])
+                scale = {'customers': customers, 'loans': loans}
+                # register and create_loan requests of earlier runs add rows too
+                rows = {'customers': Customer.objects.count(), 'loans': Loan.objects.count()}
+                customer_ids = sample_ids(Customer, 1000, rng)
+                loan_ids = sample_ids(Loan, 1000, rng)
+                factories = endpoint_requests(customer_ids, loan_ids)
+
+                for endpoint in endpoints:
+                    for level in levels:
+                        stats = summarize(*asyncio.run(run_load(
+                            base_url, factories[endpoint], options['requests'], level
+                        )))
+                        result = {
+                            'scale': scale,
+                            'rows': rows,
+                            'endpoint': endpoint,
+                            'concurrency': level,
+                            'requests': options['requests'],
+                            'rps': round(stats['rps'], 1),
+                            'p50_ms': round(stats['p50'], 2),
+                            'p95_ms': round(stats['p95'], 2),
+                            'p99_ms': round(stats['p99'], 2),
+                            'errors': stats['errors'],
+                        }
+                        results.append(result)
+                        self.write_result(result)
+
+        report = {
+            'commit': current_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'target': options['base_url'] or 'in-process',
+            'results': results,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+
+        if baseline:
+            self.write_comparison(results, baseline)
+
+    def write_result(self, result):
+        style = self.style.WARNING if result['errors'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"  {result['endpoint']:<18} c={result['concurrency']:<4} "
+            f"{result['rps']:>8.1f} req/s  p50 {result['p50_ms']:>8.2f} ms  "
+            f"p95 {result['p95_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  "
+            f"errors {result['errors']}"
+        ))
+
+    def write_comparison(self, results, baseline):
+        self.stdout.write(f"Compared with {baseline.get('commit') or 'baseline'}:")
+        for result, previous in compare_results(results, baseline):
+            rps_change = (result['rps'] / previous['rps'] - 1) * 100 if previous['rps'] else 0.0
+            p95_change = (
+                (result['p95_ms'] / previous['p95_ms'] - 1) * 100 if previous['p95_ms'] else 0.0
+            )
+            # Slower p95 by more than 10% is flagged
+            style = self.style.ERROR if p95_change > 10 else self.style.SUCCESS
+            self.stdout.write(style(
+                f"  {result['scale']['loans']:>9} loans {result['endpoint']:<18} "
+                f"c={result['concurrency']:<4} req/s {rps_change:+6.1f}%  p95 {p95_change:+6.1f}%"
+            ))
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from pathlib import Path
+import io
+import pstats
+import time
+
+
+class Command(BaseCommand):
+    help = 'Merge the cProfile files in the profiling spool and print the hottest functions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--spool-dir',
+            type=str,
+            default=None,
+            help='Spool directory to read (defaults to PROFILING_SPOOL_DIR)'
+        )
+
+        parser.add_argument(
+            '--label',
+            type=str,
+            default=None,
+            help='Only merge profiles of this URL name or task, e.g. check_eligibility'
+        )
+
+        parser.add_argument(
+            '--since',
+            type=int,
+            default=None,
+            help='Only merge profiles written in the last N minutes'
+        )
+
+        parser.add_argument(
+            '--sort',
+            type=str,
+            choices=['cumulative', 'tottime', 'ncalls'],
+            default='cumulative',
+            help='Order of the merged function table'
+        )
+
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=30,
+            help='Number of functions printed'
+        )
+
+        parser.add_argument(
+            '--output',
+            type=str,
+            default=None,
+            help='Also write the merged profile to this .prof file (for snakeviz etc.)'
+        )
+
+    def handle(self, *args, **options):
+        spool = Path(options['spool_dir'] or settings.PROFILING_SPOOL_DIR)
+        if not spool.is_dir():
+            raise CommandError(f'Spool directory {spool} does not exist')
+
+        paths = sorted(spool.glob('*.prof'))
+        if options['label']:
+            # Files are named <time>-<label>-<pid>-<id>.prof
+            paths = [path for path in paths
+                     if path.stem.split('-', 1)[1].rsplit('-', 2)[0] == options['label']]
+        if options['since']:
+            cutoff = time.time() - options['since'] * 60
+            paths = [path for path in paths if path.stat().st_mtime >= cutoff]
+
+        if not paths:
+            self.stdout.write(self.style.WARNING('No matching profiles in the spool'))
+            return
+
+        stream = io.StringIO()
+        stats = pstats.Stats(str(paths[0]), stream=stream)
+        for path in paths[1:]:
+            stats.add(str(path))
+
+        self.stdout.write(f'Merged {len(paths)} profiles from {spool}')
+        stats.sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(stream.getvalue())
+
+        if options['output']:
+            stats.dump_stats(options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Merged profile written to {options['output']}"))
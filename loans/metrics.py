@@ -0,0 +1,132 @@
+import logging
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest,
+    multiprocess
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from .credit import credit_profile_cache_stats
+
+logger = logging.getLogger(__name__)
+
+# Metric values are kept in memory-mapped files under this directory when it
+# is set, so web and Celery processes sharing it are scraped as one
+MULTIPROC_DIR_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+
+REQUESTS = Counter(
+    'credit_http_requests_total',
+    'HTTP requests by URL name, method and status',
+    ['view', 'method', 'status']
+)
+
+REQUEST_LATENCY = Histogram(
+    'credit_http_request_duration_seconds',
+    'Time spent handling a request, by URL name',
+    ['view'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+REQUEST_QUERIES = Histogram(
+    'credit_http_request_db_queries',
+    'Database queries issued per request, by URL name',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+)
+
+LOAN_DECISIONS = Counter(
+    'credit_loan_decisions_total',
+    'create-loan decisions by outcome and the rule that decided them',
+    ['decision', 'reason']
+)
+
+LOAN_RESPONSE_CACHE = Counter(
+    'credit_loan_response_cache_total',
+    'view-loan/view-loans lookups answered with 304 (not_modified), from the '
+    'response cache (hit) or from the database (miss)',
+    ['result']
+)
+
+INGESTED_ROWS = Counter(
+    'credit_ingestion_rows_total',
+    'Data file rows processed by ingestion, by outcome',
+    ['data_type', 'outcome']
+)
+
+INGESTION_BATCH_DURATION = Histogram(
+    'credit_ingestion_batch_duration_seconds',
+    'Time to normalize and upsert one ingestion batch',
+    ['data_type'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+
+def observe_request(view, method, status, seconds, queries):
+    REQUESTS.labels(view, method, str(status)).inc()
+    REQUEST_LATENCY.labels(view).observe(seconds)
+    REQUEST_QUERIES.labels(view).observe(queries)
+
+
+def record_loan_decision(decision, reason):
+    LOAN_DECISIONS.labels(decision, reason).inc()
+
+
+def record_response_cache(result):
+    LOAN_RESPONSE_CACHE.labels(result).inc()
+
+
+def record_ingestion_batch(data_type, rows, result, seconds):
+    """Count the rows of one upserted batch by outcome; rows the upsert never saw failed"""
+    inserted, updated, skipped = (
+        result['inserted_count'], result['updated_count'], result['skipped_count']
+    )
+    for outcome, count in (('inserted', inserted), ('updated', updated),
+                           ('unchanged', skipped),
+                           ('failed', max(rows - inserted - updated - skipped, 0))):
+        if count:
+            INGESTED_ROWS.labels(data_type, outcome).inc(count)
+    INGESTION_BATCH_DURATION.labels(data_type).observe(seconds)
+
+
+class CreditProfileCacheCollector:
+    """
+    Hit/miss counters of the credit profile cache, read at scrape time
+    from the shared cache where every process already adds them up.
+    """
+
+    def collect(self):
+        stats = credit_profile_cache_stats()
+
+        lookups = CounterMetricFamily(
+            'credit_profile_cache_lookups',
+            'Credit profile cache lookups by result',
+            labels=['result']
+        )
+        lookups.add_metric(['hit'], stats['hits'])
+        lookups.add_metric(['miss'], stats['misses'])
+        yield lookups
+
+        yield GaugeMetricFamily(
+            'credit_profile_cache_hit_ratio',
+            'Fraction of credit profile lookups served from the cache',
+            value=stats['hit_ratio']
+        )
+
+
+def render_metrics():
+    """
+    Return (body, content_type) of the Prometheus text exposition.
+    With PROMETHEUS_MULTIPROC_DIR set, the samples of every process
+    writing to that directory are merged.
+    """
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    scrape_time = CollectorRegistry()
+    scrape_time.register(CreditProfileCacheCollector())
+
+    return generate_latest(registry) + generate_latest(scrape_time), CONTENT_TYPE_LATEST
@@ -0,0 +1,125 @@
+from contextvars import ContextVar
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .metrics import observe_request
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Number of queries of one request and the time spent in them"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Stats of the request being handled; sync_to_async copies the context, so
+# queries of async views made from worker threads are counted too
+_request_stats = ContextVar('request_query_stats', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper adding each query to the current request's QueryStats"""
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.seconds += time.perf_counter() - started
+        stats.count += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    """
+    Add record_query to a connection's execute wrappers.
+    Connected to connection_created, since connections are per thread.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Count the database queries and time of each request and report them
+    in a Server-Timing header and one log line tagged with the URL name,
+    and feed the per-view request metrics exposed at /metrics.
+    Only work done before the view returns is measured, so rows read
+    while a streaming response is being sent are not included.
+    Disabled with REQUEST_METRICS_ENABLED=False, in which case Django
+    drops the middleware from the stack at startup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+        connection_created.connect(install_query_recorder)
+        for connection in connections.all():
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self.report(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        self.report(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def report(self, request, response, stats, seconds):
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unresolved'
+        db_ms = stats.seconds * 1000
+        total_ms = seconds * 1000
+
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.2f};desc="{stats.count} queries", '
+            f'app;dur={max(total_ms - db_ms, 0):.2f}, '
+            f'total;dur={total_ms:.2f}'
+        )
+        observe_request(view, request.method, response.status_code, seconds, stats.count)
+        logger.info(
+            f"view={view} method={request.method} status={response.status_code} "
+            f"queries={stats.count} db_ms={db_ms:.2f} total_ms={total_ms:.2f}",
+            extra={
+                'view': view,
+                'method': request.method,
+                'status': response.status_code,
+                'queries': stats.count,
+                'db_ms': round(db_ms, 2),
+                'total_ms': round(total_ms, 2),
+            }
+        )
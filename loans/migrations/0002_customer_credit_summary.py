@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerCreditSummary',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='credit_summary', serialize=False, to='loans.customer')),
+                ('loan_count', models.IntegerField(default=0)),
+                ('on_time_count', models.IntegerField(default=0, help_text='Number of loans with every EMI paid on time')),
+                ('total_volume', models.DecimalField(decimal_places=2, default=0, help_text='Sum of all loan amounts', max_digits=18)),
+                ('current_emi_sum', models.DecimalField(decimal_places=2, default=0, help_text='Sum of monthly repayments of current loans', max_digits=18)),
+                ('current_principal_sum', models.DecimalField(decimal_places=2, default=0, help_text='Sum of loan amounts of current loans', max_digits=18)),
+                ('yearly_activity', models.JSONField(default=dict, help_text='Number of loans started per calendar year')),
+            ],
+            options={
+                'db_table': 'customer_credit_summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0002_customer_credit_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerCreditScore',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='credit_score', serialize=False, to='loans.customer')),
+                ('credit_score', models.IntegerField(help_text='Score from calculate_credit_score (0-100)')),
+                ('approval_slab', models.CharField(blank=True, help_text='Approval slab from apply_approval_rules, if computed', max_length=20, null=True)),
+                ('scored_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'customer_credit_scores',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0003_customer_credit_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionCheckpoint',
+            fields=[
+                ('data_type', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('file_path', models.CharField(max_length=500)),
+                ('file_hash', models.CharField(help_text='SHA-256 of the file contents', max_length=64)),
+                ('row_count', models.IntegerField(default=0)),
+                ('error_count', models.IntegerField(default=0)),
+                ('ingested_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'ingestion_checkpoints',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0004_ingestion_checkpoints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdBlockCounter',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'id_block_counters',
+            },
+        ),
+    ]
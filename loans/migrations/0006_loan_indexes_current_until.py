@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:06
+
+import datetime
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def mark_summaries_stale(apps, schema_editor):
+    """
+    Existing summaries counted every loan as current; mark their current
+    sums stale so they are recomputed, and stored, on their next read.
+    """
+    CustomerCreditSummary = apps.get_model('loans', 'CustomerCreditSummary')
+    CustomerCreditSummary.objects.update(current_until=datetime.date.min)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0005_id_block_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customercreditsummary',
+            name='current_until',
+            field=models.DateField(blank=True, help_text='Earliest end date of the current loans; the current sums are stale once it has passed', null=True),
+        ),
+        migrations.RunPython(mark_summaries_stale, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'end_date'], name='loans_customer_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'start_date'], name='loans_customer_start_idx'),
+        ),
+        migrations.AlterField(
+            model_name='loan',
+            name='customer',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='loans', to='loans.customer'),
+        ),
+    ]
@@ -1,4 +1,8 @@
+from datetime import date
+
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
 from django.core.validators import MinValueValidator
 
 
@@ -48,6 +52,18 @@ class Customer(models.Model):
         return f"{self.first_name} {self.last_name}"
 
 
+class LoanQuerySet(models.QuerySet):
+    def current(self, today=None):
+        """Loans that have not ended yet (end_date on or after today)"""
+        return self.filter(end_date__gte=today or date.today())
+
+    def with_repayments_left(self):
+        """Annotate remaining_repayments, Loan.repayments_left computed by the database"""
+        return self.annotate(
+            remaining_repayments=Greatest(F('tenure') - F('emis_paid_on_time'), Value(0))
+        )
+
+
 class Loan(models.Model):
     """
     Loan model based on PRD specifications
@@ -55,7 +71,8 @@ class Loan(models.Model):
     customer = models.ForeignKey(
         Customer,
         on_delete=models.CASCADE,
-        related_name='loans'
+        related_name='loans',
+        db_index=False  # Covered by the (customer, end_date) index
     )
     loan_id = models.IntegerField(primary_key=True, unique=True)
     loan_amount = models.DecimalField(
@@ -87,9 +104,15 @@ class Loan(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
 
+    objects = LoanQuerySet.as_manager()
+
     class Meta:
         db_table = 'loans'
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['customer', 'end_date'], name='loans_customer_end_idx'),
+            models.Index(fields=['customer', 'start_date'], name='loans_customer_start_idx'),
+        ]
 
     def __str__(self):
         return f"Loan {self.loan_id} for {self.customer.name}"
@@ -99,3 +122,118 @@ class Loan(models.Model):
         """Calculate remaining repayments based on tenure and EMIs paid"""
         total_emis = self.tenure
         return max(0, total_emis - self.emis_paid_on_time)
+
+
+class CustomerCreditSummary(models.Model):
+    """
+    Denormalized running totals of a customer's loan history.
+    Maintained incrementally by create_loan and the ingest tasks so that
+    eligibility checks do not need to scan the loans table.
+    """
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='credit_summary'
+    )
+    loan_count = models.IntegerField(default=0)
+    on_time_count = models.IntegerField(
+        default=0,
+        help_text="Number of loans with every EMI paid on time"
+    )
+    total_volume = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of all loan amounts"
+    )
+    current_emi_sum = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of monthly repayments of current loans"
+    )
+    current_principal_sum = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=0,
+        help_text="Sum of loan amounts of current loans"
+    )
+    current_until = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Earliest end date of the current loans; the current sums "
+                  "are stale once it has passed"
+    )
+    yearly_activity = models.JSONField(
+        default=dict,
+        help_text="Number of loans started per calendar year"
+    )
+
+    class Meta:
+        db_table = 'customer_credit_summaries'
+
+    def __str__(self):
+        return f"Credit summary for customer {self.customer_id}"
+
+
+class CustomerCreditScore(models.Model):
+    """
+    Credit score snapshot written by the portfolio rescoring job.
+    """
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='credit_score'
+    )
+    credit_score = models.IntegerField(help_text="Score from calculate_credit_score (0-100)")
+    approval_slab = models.CharField(
+        max_length=20,
+        null=True,
+        blank=True,
+        help_text="Approval slab from apply_approval_rules, if computed"
+    )
+    scored_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'customer_credit_scores'
+
+    def __str__(self):
+        return f"Credit score {self.credit_score} for customer {self.customer_id}"
+
+
+class IngestionCheckpoint(models.Model):
+    """
+    Content hash of the last file ingested for each data type.
+    Lets a re-run skip a file that has not changed since the last clean run.
+    """
+    data_type = models.CharField(max_length=20, primary_key=True)
+    file_path = models.CharField(max_length=500)
+    file_hash = models.CharField(max_length=64, help_text="SHA-256 of the file contents")
+    row_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    ingested_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'ingestion_checkpoints'
+
+    def __str__(self):
+        return f"Checkpoint for {self.data_type}: {self.file_hash[:12]}"
+
+
+
+class IdBlockCounter(models.Model):
+    """
+    High-water mark of an ID allocator.
+    Each process reserves a block of IDs by advancing next_value, then
+    hands the block out from memory (see loans.ids).
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'id_block_counters'
+
+    def __str__(self):
+        return f"{self.name}: next block at {self.next_value}"
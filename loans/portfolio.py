@@ -0,0 +1,191 @@
+from datetime import date, datetime
+from itertools import islice
+import logging
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Customer, CustomerCreditScore, Loan
+
+logger = logging.getLogger(__name__)
+
+# Approval slabs, mirroring the branches of views.apply_approval_rules
+SLAB_APPROVE_ANY = 'approve_any'
+SLAB_MIN_RATE_12 = 'min_rate_12'
+SLAB_MIN_RATE_16 = 'min_rate_16'
+SLAB_REJECT = 'reject'
+
+
+def _iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_loan_columns(chunk_size=50000):
+    """
+    Load the whole loans table into columnar NumPy arrays.
+    Loan amounts are kept as integer paise so that per-customer sums are exact,
+    end dates as proleptic Gregorian ordinals.
+    """
+    columns = {
+        'customer_id': [],
+        'amount_paise': [],
+        'tenure': [],
+        'emis_paid_on_time': [],
+        'start_year': [],
+        'end_ordinal': [],
+    }
+
+    rows = Loan.objects.order_by().values_list(
+        'customer_id', 'loan_amount', 'tenure', 'emis_paid_on_time', 'start_date', 'end_date'
+    ).iterator(chunk_size=chunk_size)
+
+    for chunk in _iter_chunks(rows, chunk_size):
+        customer_ids, amounts, tenures, emis_paid, start_dates, end_dates = zip(*chunk)
+        columns['customer_id'].append(np.array(customer_ids, dtype=np.int64))
+        columns['amount_paise'].append(
+            np.array([int(amount * 100) for amount in amounts], dtype=np.int64)
+        )
+        columns['tenure'].append(np.array(tenures, dtype=np.int64))
+        columns['emis_paid_on_time'].append(np.array(emis_paid, dtype=np.int64))
+        columns['start_year'].append(
+            np.array([start_date.year for start_date in start_dates], dtype=np.int64)
+        )
+        columns['end_ordinal'].append(
+            np.array([end_date.toordinal() for end_date in end_dates], dtype=np.int64)
+        )
+
+    return {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        for name, parts in columns.items()
+    }
+
+
+def aggregate_loan_columns(customer_ids, loans, current_year=None, today=None):
+    """
+    Group-by reduction of loan columns onto a sorted customer_ids array.
+    Returns per-customer arrays of the CreditProfile factors; loans of
+    customers missing from customer_ids are ignored.
+    """
+    if current_year is None:
+        current_year = datetime.now().year
+    today = today or date.today()
+
+    n = len(customer_ids)
+    index = np.searchsorted(customer_ids, loans['customer_id'])
+    known = index < n
+    known[known] = customer_ids[index[known]] == loans['customer_id'][known]
+    index = index[known]
+
+    def group_count(mask):
+        return np.bincount(index, weights=mask[known], minlength=n).astype(np.int64)
+
+    def group_sum(values):
+        # Paise totals stay far below 2**53, so float64 accumulation is exact
+        return np.bincount(index, weights=values[known], minlength=n).astype(np.int64)
+
+    return {
+        'total_loans': np.bincount(index, minlength=n).astype(np.int64),
+        'paid_on_time': group_count(loans['emis_paid_on_time'] == loans['tenure']),
+        'loans_current_year': group_count(loans['start_year'] == current_year),
+        'volume_paise': group_sum(loans['amount_paise']),
+        'current_paise': group_sum(
+            np.where(loans['end_ordinal'] >= today.toordinal(), loans['amount_paise'], 0)
+        ),
+    }
+
+
+def score_profiles(total_loans, paid_on_time, loans_current_year, volume_paise):
+    """
+    Vectorized views.calculate_credit_score.
+    Performs the same float64 operations in the same order as the scalar
+    function, so scores are identical.
+    """
+    has_loans = total_loans > 0
+    ratio = np.divide(
+        paid_on_time, total_loans,
+        out=np.zeros(len(total_loans), dtype=np.float64),
+        where=has_loans
+    )
+    total_loan_volume = volume_paise / 100
+
+    score = ratio * 40
+    score = score + np.minimum(total_loans * 5, 20)
+    score = score + np.minimum(loans_current_year * 4, 20)
+    score = score + np.minimum(total_loan_volume / 100000, 20)
+
+    score = np.clip(np.rint(score), 0, 100).astype(np.int64)
+    return np.where(has_loans, score, 25)
+
+
+def approval_slabs(credit_scores):
+    """
+    Vectorized approval slab of views.apply_approval_rules for each score.
+    """
+    return np.select(
+        [credit_scores > 50, credit_scores > 30, credit_scores > 10],
+        [SLAB_APPROVE_ANY, SLAB_MIN_RATE_12, SLAB_MIN_RATE_16],
+        default=SLAB_REJECT
+    )
+
+
+def rescore_portfolio(with_slab=False, batch_size=5000, current_year=None):
+    """
+    Recompute the credit score of every customer from columnar loan data
+    and write the CustomerCreditScore table in bulk.
+    Slabs use the effective score, which is 0 when the customer's current
+    loans exceed the approved limit (as in the eligibility checks).
+    Returns run statistics.
+    """
+    logger.info("Starting portfolio rescoring...")
+
+    customers = list(
+        Customer.objects.order_by('customer_id').values_list('customer_id', 'approved_limit')
+    )
+    customer_ids = np.array([row[0] for row in customers], dtype=np.int64)
+
+    loans = load_loan_columns(chunk_size=batch_size)
+    profiles = aggregate_loan_columns(customer_ids, loans, current_year)
+    scores = score_profiles(
+        profiles['total_loans'], profiles['paid_on_time'],
+        profiles['loans_current_year'], profiles['volume_paise']
+    )
+
+    slabs = None
+    if with_slab:
+        limit_paise = np.array([int(row[1] * 100) for row in customers], dtype=np.int64)
+        effective_scores = np.where(profiles['current_paise'] > limit_paise, 0, scores)
+        slabs = approval_slabs(effective_scores)
+
+    scored_at = timezone.now()
+    with transaction.atomic():
+        CustomerCreditScore.objects.all().delete()
+        for start in range(0, len(customer_ids), batch_size):
+            stop = start + batch_size
+            CustomerCreditScore.objects.bulk_create([
+                CustomerCreditScore(
+                    customer_id=int(customer_id),
+                    credit_score=int(score),
+                    approval_slab=str(slabs[start + offset]) if slabs is not None else None,
+                    scored_at=scored_at,
+                )
+                for offset, (customer_id, score) in enumerate(
+                    zip(customer_ids[start:stop], scores[start:stop])
+                )
+            ], batch_size=batch_size)
+
+    logger.info(
+        f"Portfolio rescoring completed. Customers: {len(customer_ids)}, "
+        f"Loans: {len(loans['customer_id'])}"
+    )
+
+    return {
+        'customers_scored': len(customer_ids),
+        'loans_processed': len(loans['customer_id']),
+        'mean_score': float(scores.mean()) if len(scores) else 0.0,
+    }
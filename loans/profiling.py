@@ -0,0 +1,185 @@
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+
+# Only one cProfile profiler can be active per thread
+_active = threading.local()
+
+# Profilers of the Celery tasks currently running, by task id
+_task_profilers = {}
+
+
+def _start_profiler():
+    """Enable and return a profiler, or None if this thread is already profiling"""
+    if getattr(_active, 'profiling', False):
+        return None
+    profiler = cProfile.Profile()
+    _active.profiling = True
+    profiler.enable()
+    return profiler
+
+
+def _stop_profiler(profiler):
+    profiler.disable()
+    _active.profiling = False
+
+
+def _rotate_spool(spool):
+    """Delete the oldest profiles (and their summaries) beyond PROFILING_MAX_FILES"""
+    profiles = sorted(spool.glob('*.prof'), key=lambda path: path.stat().st_mtime)
+    for path in profiles[:max(len(profiles) - settings.PROFILING_MAX_FILES, 0)]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.txt').unlink(missing_ok=True)
+
+
+def write_profile(profiler, label, description, seconds):
+    """
+    Write a profile to the spool directory as <time>-<label>-<pid>-<id>.prof
+    with a .txt summary of its top PROFILING_TOP_N functions by cumulative
+    time, then rotate the spool. Returns the .prof path, or None on failure.
+    """
+    spool = Path(settings.PROFILING_SPOOL_DIR)
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{label}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    path = spool / f"{name}.prof"
+
+    try:
+        spool.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+
+        summary = io.StringIO()
+        summary.write(f"{description}\nwall time: {seconds * 1000:.1f} ms\n\n")
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(
+            settings.PROFILING_TOP_N
+        )
+        path.with_suffix('.txt').write_text(summary.getvalue())
+
+        _rotate_spool(spool)
+    except OSError as e:
+        logger.warning(f"Could not write profile {path}: {str(e)}")
+        return None
+
+    logger.info(f"Profiled {description} in {seconds * 1000:.1f} ms: {path}")
+    return path
+
+
+class ProfilingMiddleware:
+    """
+    Profile a sample of requests with cProfile and spool the results.
+    A request is profiled when it carries PROFILING_HEADER_TOKEN in the
+    X-Profile header, or with probability PROFILING_SAMPLE_RATE when its
+    URL name is in PROFILING_VIEWS (any view when empty).
+    Removed from the stack at startup unless PROFILING_ENABLED.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.views = set(settings.PROFILING_VIEWS)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def sampled_view(self, request):
+        """URL name of a request chosen for profiling, or None"""
+        token = settings.PROFILING_HEADER_TOKEN
+        header = request.headers.get(PROFILE_HEADER, '')
+        forced = bool(token) and hmac.compare_digest(header.encode(), token.encode())
+        if not forced and random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return None
+
+        try:
+            view = resolve(request.path_info).url_name or 'unnamed'
+        except Resolver404:
+            return None
+        if forced or not self.views or view in self.views:
+            return view
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        view = self.sampled_view(request)
+        profiler = _start_profiler() if view else None
+        if profiler is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _stop_profiler(profiler)
+        self.save(profiler, view, request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        # Only the event loop thread is profiled: queries run in
+        # sync_to_async threads show up as waiting, and other requests
+        # served by the loop meanwhile are included
+        view = self.sampled_view(request)
+        profiler = _start_profiler() if view else None
+        if profiler is None:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stop_profiler(profiler)
+        self.save(profiler, view, request, response, time.perf_counter() - started)
+        return response
+
+    def save(self, profiler, view, request, response, seconds):
+        write_profile(
+            profiler, view,
+            f"{request.method} {request.path} ({view}) -> {response.status_code}", seconds
+        )
+
+
+@task_prerun.connect
+def start_task_profile(task_id=None, task=None, **kwargs):
+    """Start profiling a sampled run of a task listed in PROFILING_TASKS"""
+    if not settings.PROFILING_ENABLED or task.name not in settings.PROFILING_TASKS:
+        return
+    if random.random() >= settings.PROFILING_TASK_SAMPLE_RATE:
+        return
+
+    profiler = _start_profiler()
+    if profiler is not None:
+        _task_profilers[task_id] = (profiler, time.perf_counter())
+
+
+@task_postrun.connect
+def finish_task_profile(task_id=None, task=None, state=None, **kwargs):
+    """Stop and spool the profile of a task started by start_task_profile"""
+    entry = _task_profilers.pop(task_id, None)
+    if entry is None:
+        return
+
+    profiler, started = entry
+    _stop_profiler(profiler)
+    label = task.name.rsplit('.', 1)[-1]
+    write_profile(
+        profiler, label, f"task {task.name}[{task_id}] -> {state}", time.perf_counter() - started
+    )
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+import time
+from urllib.parse import urlencode
+
+from django.test import Client
+
+from .benchmarking import send_request, server_address, summarize
+
+logger = logging.getLogger(__name__)
+
+
+def read_traffic_log(path, views=None, limit=None):
+    """
+    The records of a capture log in time order, optionally only those of
+    the given URL names and at most `limit` of them. Unreadable lines are
+    skipped.
+    """
+    records = []
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipping malformed line {number} of {path}")
+                continue
+            if views and record.get('view') not in views:
+                continue
+            records.append(record)
+    records.sort(key=lambda record: record['time'])
+    return records[:limit] if limit else records
+
+
+def record_target(record):
+    """(method, path with query string, body bytes) of a captured request"""
+    path = record['path']
+    if record.get('query'):
+        path = f"{path}?{urlencode(record['query'])}"
+    body = json.dumps(record['body']).encode() if record.get('body') is not None else b''
+    return record['method'], path, body
+
+
+def http_sender(base_url):
+    """
+    Send records to a running server, over TLS for https URLs; returns an
+    async (status, seconds) callable.
+    """
+    host, port, use_tls = server_address(base_url)
+
+    async def send(record):
+        return await send_request(host, port, *record_target(record), use_tls=use_tls)
+    return send
+
+
+def client_sender(executor):
+    """
+    Send records through the Django test client on the threads of
+    executor, against the configured database; returns an async
+    (status, seconds) callable.
+    """
+    def send_sync(record):
+        method, path, body = record_target(record)
+        client = Client(raise_request_exception=False)
+        started = time.perf_counter()
+        response = client.generic(method, path, data=body, content_type='application/json')
+        if response.streaming:
+            # Drain streamed responses so their queries are timed too
+            b''.join(response.streaming_content)
+        return response.status_code, time.perf_counter() - started
+
+    async def send(record):
+        return await asyncio.get_running_loop().run_in_executor(executor, send_sync, record)
+    return send
+
+
+async def replay(records, send, speedup=1.0, concurrency=16):
+    """
+    Send records with their recorded spacing divided by speedup (all at
+    once when speedup is 0), at most `concurrency` in flight.
+    Returns (results, elapsed seconds), where each result is
+    (view, recorded status, replayed status, seconds); the replayed
+    status is 0 when the request could not be sent.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    first = records[0]['time'] if records else 0
+    results = []
+    started = time.perf_counter()
+
+    async def one(record):
+        if speedup:
+            delay = (record['time'] - first) / speedup - (time.perf_counter() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with semaphore:
+            try:
+                status, seconds = await send(record)
+            except OSError:
+                status, seconds = 0, 0.0
+        results.append((record['view'], record.get('status'), status, seconds))
+
+    await asyncio.gather(*(one(record) for record in records))
+    return results, time.perf_counter() - started
+
+
+def replay_report(results, elapsed):
+    """
+    Per-endpoint throughput, latency percentiles (milliseconds) and
+    status code mismatches of replay results, by URL name.
+    """
+    report = {}
+    for view in sorted({result[0] for result in results}):
+        rows = [result for result in results if result[0] == view]
+        latencies = [seconds for _, _, status, seconds in rows if status]
+        mismatched = [(recorded, status) for _, recorded, status, _ in rows
+                      if status and status != recorded]
+        stats = summarize(latencies, len(rows) - len(latencies), elapsed)
+        report[view] = {
+            'requests': len(rows),
+            'rps': stats['rps'],
+            'p50_ms': stats['p50'],
+            'p95_ms': stats['p95'],
+            'p99_ms': stats['p99'],
+            'max_ms': max(latencies) * 1000 if latencies else 0.0,
+            'errors': stats['errors'],
+            'mismatches': len(mismatched),
+            'mismatched_statuses': sorted({f'{recorded}->{status}' for recorded, status in mismatched}),
+        }
+    return report
@@ -0,0 +1,147 @@
+import math
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from .emi import calculate_emi, calculate_emi_many
+from .models import Loan
+
+# Columns of a schedule row, in CSV order
+SCHEDULE_COLUMNS = (
+    'month', 'due_date', 'payment', 'interest', 'principal', 'balance', 'paid_on_time'
+)
+
+# Loan fields a schedule is built from
+LOAN_COLUMNS = (
+    'loan_id', 'loan_amount', 'interest_rate', 'tenure', 'start_date', 'emis_paid_on_time'
+)
+
+# Days between instalments, as used for loan end dates
+DAYS_PER_INSTALMENT = 30
+
+
+def to_paise(amount):
+    """Round an amount in rupees to whole paise, halves up"""
+    return math.floor(amount * 100 + 0.5)
+
+
+def schedule_installment(loan_amount, interest_rate, tenure):
+    """
+    The calculate_emi instalment a schedule is built on, rounded to the
+    paisa; it may differ from a loan's stored monthly_repayment.
+    """
+    return to_paise(calculate_emi(loan_amount, interest_rate, tenure)) / 100
+
+
+def iter_schedule(loan_amount, interest_rate, tenure, start_date, emis_paid_on_time=0):
+    """
+    Yield the month-by-month compound interest schedule of a loan, one
+    dict per instalment, without holding the schedule in memory.
+
+    Amounts are kept in whole paise: each month's interest is the
+    outstanding balance times the monthly rate, rounded; the rest of the
+    calculate_emi instalment repays principal, and the last instalment
+    clears what is left. The first emis_paid_on_time instalments are
+    marked as paid on time. Loans without instalments (tenure below 1)
+    have an empty schedule. schedule_frame computes the same rows for
+    many loans at once.
+    """
+    if tenure < 1:
+        return
+
+    monthly_rate = float(interest_rate) / (12 * 100)
+    emi = to_paise(calculate_emi(loan_amount, interest_rate, tenure))
+    balance = to_paise(float(loan_amount))
+
+    for month in range(1, tenure + 1):
+        interest = math.floor(balance * monthly_rate + 0.5)
+        principal = balance if month == tenure else min(max(emi - interest, 0), balance)
+        balance -= principal
+        yield {
+            'month': month,
+            'due_date': start_date + timedelta(days=DAYS_PER_INSTALMENT * month),
+            'payment': (principal + interest) / 100,
+            'interest': interest / 100,
+            'principal': principal / 100,
+            'balance': balance / 100,
+            'paid_on_time': month <= emis_paid_on_time,
+        }
+
+
+def schedule_frame(loans):
+    """
+    Schedules of many loans at once, for exports: a frame with loan_id
+    and SCHEDULE_COLUMNS, one row per instalment, ordered by loan and
+    month. loans is a frame with loan_id, loan_amount, interest_rate,
+    tenure, start_date and emis_paid_on_time columns. Rows equal those
+    of iter_schedule to the paisa; each month is computed for every loan
+    still repaying, so memory grows with loans x longest tenure. Loans
+    without instalments (tenure below 1) are left out.
+    """
+    loans = loans[loans['tenure'].astype(np.int64) >= 1] if not loans.empty else loans
+    if loans.empty:
+        return pd.DataFrame(columns=('loan_id',) + SCHEDULE_COLUMNS)
+
+    amounts = loans['loan_amount'].astype(float).to_numpy()
+    rates = loans['interest_rate'].astype(float).to_numpy()
+    tenures = loans['tenure'].astype(np.int64).to_numpy()
+    paid = loans['emis_paid_on_time'].astype(np.int64).to_numpy()
+    loan_ids = loans['loan_id'].to_numpy()
+    start_dates = pd.to_datetime(loans['start_date']).to_numpy()
+
+    monthly_rate = rates / (12 * 100)
+    emi = np.floor(calculate_emi_many(amounts, rates, tenures) * 100 + 0.5).astype(np.int64)
+    balance = np.floor(amounts * 100 + 0.5).astype(np.int64)
+
+    months = []
+    for month in range(1, int(tenures.max()) + 1):
+        active = tenures >= month
+        interest = np.floor(balance[active] * monthly_rate[active] + 0.5).astype(np.int64)
+        outstanding = balance[active]
+        principal = np.where(
+            tenures[active] == month,
+            outstanding,
+            np.minimum(np.maximum(emi[active] - interest, 0), outstanding)
+        )
+        balance[active] = outstanding - principal
+        months.append(pd.DataFrame({
+            'loan_id': loan_ids[active],
+            'month': month,
+            'due_date': start_dates[active] + np.timedelta64(DAYS_PER_INSTALMENT * month, 'D'),
+            'payment': (principal + interest) / 100,
+            'interest': interest / 100,
+            'principal': principal / 100,
+            'balance': balance[active] / 100,
+            'paid_on_time': paid[active] >= month,
+        }))
+
+    frame = pd.concat(months, ignore_index=True)
+    frame['due_date'] = frame['due_date'].dt.date
+    return frame.sort_values(['loan_id', 'month'], kind='stable', ignore_index=True)
+
+
+def export_schedules(output, customer_id=None, batch_size=2000):
+    """
+    Write the schedules of every loan (or of one customer's loans) as CSV
+    to the text file output, batch_size loans per schedule_frame call.
+    Loans without instalments (tenure below 1) are skipped.
+    Returns (loans exported, schedule rows written).
+    """
+    loans = Loan.objects.filter(tenure__gte=1).order_by('loan_id')
+    if customer_id is not None:
+        loans = loans.filter(customer_id=customer_id)
+    rows = loans.values_list(*LOAN_COLUMNS).iterator(chunk_size=batch_size)
+
+    output.write(','.join(('loan_id',) + SCHEDULE_COLUMNS) + '\n')
+    loan_count = row_count = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        frame = schedule_frame(pd.DataFrame.from_records(batch, columns=LOAN_COLUMNS))
+        frame.to_csv(output, header=False, index=False, lineterminator='\n')
+        loan_count += len(batch)
+        row_count += len(frame)
+    return loan_count, row_count
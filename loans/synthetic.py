@@ -0,0 +1,186 @@
+import io
+import logging
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import ids
+from .emi import calculate_emi_many
+from .models import Customer, IdBlockCounter, Loan
+from .versions import bump_customer_list_versions
+
+logger = logging.getLogger(__name__)
+
+FIRST_NAMES = np.array([
+    'Aarav', 'Aditi', 'Arjun', 'Diya', 'Ishaan', 'Kavya', 'Meera', 'Nikhil', 'Priya', 'Rahul',
+    'Riya', 'Rohan', 'Saanvi', 'Sanjay', 'Sneha', 'Tanvi', 'Varun', 'Vikram', 'Zoya', 'Anil',
+])
+LAST_NAMES = np.array([
+    'Agarwal', 'Bose', 'Chopra', 'Das', 'Gupta', 'Iyer', 'Jain', 'Kapoor', 'Khan', 'Kumar',
+    'Menon', 'Nair', 'Patel', 'Rao', 'Reddy', 'Shah', 'Sharma', 'Singh', 'Verma', 'Yadav',
+])
+
+# Loan tenures in months and how often each is taken
+TENURES = np.array([6, 12, 18, 24, 36, 48, 60])
+TENURE_WEIGHTS = np.array([0.05, 0.25, 0.10, 0.25, 0.20, 0.10, 0.05])
+
+# Loans start up to this many days before the reference date
+LOAN_HISTORY_DAYS = 8 * 365
+
+
+def next_free_id(allocator):
+    """
+    Lowest ID above every existing row of the allocator's model and every
+    block it has reserved, so generated rows collide neither with stored
+    rows nor with IDs that running processes hand out from memory.
+    """
+    model = allocator.model
+    highest = model.objects.aggregate(highest=Max(model._meta.pk.attname))['highest']
+    reserved = IdBlockCounter.objects.filter(name=allocator.name).values_list(
+        'next_value', flat=True
+    ).first()
+    return max(allocator.first_id, (highest or 0) + 1, reserved or 0)
+
+
+def generate_customers(count, first_id, rng):
+    """
+    A frame of `count` customers with IDs from first_id, keyed by column name.
+    Salaries are log-normal around 50,000 and approved limits follow the
+    register rule (36 x salary, rounded to the nearest lakh).
+    """
+    salary = np.clip(np.round(rng.lognormal(np.log(50000), 0.6, count), -3), 10000, 2000000)
+    return pd.DataFrame({
+        'customer_id': np.arange(first_id, first_id + count),
+        'first_name': rng.choice(FIRST_NAMES, count),
+        'last_name': rng.choice(LAST_NAMES, count),
+        'phone_number': rng.integers(6000000000, 9999999999, count).astype(str),
+        'monthly_salary': salary,
+        'approved_limit': np.round(36 * salary / 100000) * 100000,
+        'current_debt': np.zeros(count),
+        'age': np.clip(np.round(rng.normal(38, 10, count)), 21, 70).astype(int),
+        'monthly_income': salary,
+    })
+
+
+def generate_loans(count, first_id, customer_ids, salaries, rng, as_of=None):
+    """
+    A frame of `count` loans with IDs from first_id, owned by customer_ids.
+    Borrowing is skewed (a few customers hold many loans), amounts scale
+    with salary, EMIs come from calculate_emi_many,
+    and ended loans were mostly repaid on time.
+    """
+    as_of = as_of or date.today()
+
+    # Log-normal borrowing propensity gives a long tail of heavy borrowers
+    propensity = rng.lognormal(0, 1.2, len(customer_ids))
+    owners = rng.choice(len(customer_ids), count, p=propensity / propensity.sum())
+
+    tenure = rng.choice(TENURES, count, p=TENURE_WEIGHTS)
+    rate = np.round(np.clip(rng.normal(12, 3, count), 6, 24), 2)
+    amount = np.round(salaries[owners] * rng.uniform(2, 20, count), -3)
+
+    emi = np.round(calculate_emi_many(amount, rate, tenure), 2)
+
+    start = pd.Timestamp(as_of) - pd.to_timedelta(rng.integers(0, LOAN_HISTORY_DAYS, count), 'D')
+    end = start + pd.to_timedelta(30 * tenure, 'D')
+
+    # EMIs due so far; ended loans were repaid on time 80% of the time
+    elapsed = np.minimum((pd.Timestamp(as_of) - start).days.to_numpy() // 30, tenure)
+    on_time = np.where(
+        rng.random(count) < 0.8, elapsed, rng.binomial(elapsed, 0.7)
+    )
+
+    frame = pd.DataFrame({
+        'customer_id': customer_ids[owners],
+        'loan_amount': amount,
+        'tenure': tenure,
+        'interest_rate': rate,
+        'monthly_repayment': emi,
+        'emis_paid_on_time': on_time,
+        'start_date': start.strftime('%Y-%m-%d'),
+        'end_date': end.strftime('%Y-%m-%d'),
+    })
+
+    # Number each customer's loans consecutively, oldest first, so the
+    # primary key and (customer, ...) indexes are filled in order on insert
+    frame = frame.sort_values(['customer_id', 'start_date'], kind='stable', ignore_index=True)
+    frame['loan_id'] = np.arange(first_id, first_id + count)
+    return frame
+
+
+def bulk_insert_frame(model, frame, batch_size):
+    """
+    Insert every row of frame into model's table, bypassing model
+    instances: COPY on PostgreSQL, executemany elsewhere.
+    Frame columns are the table's column names.
+    """
+    quote = connection.ops.quote_name
+    columns = [field.column for field in model._meta.concrete_fields]
+    table = quote(model._meta.db_table)
+    column_list = ', '.join(quote(column) for column in columns)
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(frame), batch_size):
+            batch = frame.iloc[start:start + batch_size][columns]
+            if connection.vendor == 'postgresql':
+                buffer = io.StringIO()
+                batch.to_csv(buffer, header=False, index=False)
+                buffer.seek(0)
+                cursor.cursor.copy_expert(
+                    f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            else:
+                placeholders = ', '.join(['%s'] * len(columns))
+                cursor.executemany(
+                    f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})",
+                    batch.astype(object).itertuples(index=False, name=None)
+                )
+
+
+def generate_synthetic_data(customers, loans, seed=0, batch_size=50000, as_of=None):
+    """
+    Add `customers` new customers and `loans` new loans spread over them
+    (or over the existing customers when customers is 0), reproducibly for
+    a given seed and as_of date. IDs start above the stored rows and the
+    ID allocators' reserved blocks, and existing customers given new loans
+    get new loan list versions. Returns (new customer IDs, new loan IDs)
+    as ranges.
+    """
+    rng = np.random.default_rng(seed)
+
+    with transaction.atomic():
+        first_customer_id = next_free_id(ids.customer_ids)
+        customer_frame = generate_customers(customers, first_customer_id, rng)
+        bulk_insert_frame(Customer, customer_frame, batch_size)
+        logger.info(f"Inserted {customers} synthetic customers")
+
+        first_loan_id = next_free_id(ids.loan_ids)
+        if loans:
+            if customers:
+                owner_ids = customer_frame['customer_id'].to_numpy()
+                salaries = customer_frame['monthly_salary'].to_numpy()
+            else:
+                owners = pd.DataFrame.from_records(
+                    Customer.objects.order_by('customer_id').values_list(
+                        'customer_id', 'monthly_salary'
+                    ),
+                    columns=['customer_id', 'monthly_salary']
+                )
+                if owners.empty:
+                    raise ValueError('Loans need customers; generate some first')
+                owner_ids = owners['customer_id'].to_numpy()
+                salaries = owners['monthly_salary'].astype(float).to_numpy()
+
+            loan_frame = generate_loans(loans, first_loan_id, owner_ids, salaries, rng, as_of)
+            bulk_insert_frame(Loan, loan_frame, batch_size)
+            logger.info(f"Inserted {loans} synthetic loans")
+
+            # Existing customers' loan lists changed
+            if not customers:
+                bump_customer_list_versions(np.unique(loan_frame['customer_id']).tolist())
+
+    return (range(first_customer_id, first_customer_id + customers),
+            range(first_loan_id, first_loan_id + loans))
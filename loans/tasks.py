@@ -1,77 +1,165 @@
-import pandas as pd
-from celery import shared_task
+from celery import chain, chord, shared_task
+from django.conf import settings
 from django.db import transaction
-from django.core.exceptions import ValidationError
-from .models import Customer, Loan
+from .credit import rebuild_credit_summaries
+from .ingestion import (
+    count_data_rows, file_digest, iter_row_batches, normalize_customer_frame,
+    normalize_loan_frame, plan_row_ranges, save_checkpoint, split_into_chunk_files,
+    unchanged_checkpoint, upsert_customers, upsert_loans
+)
+from .metrics import record_ingestion_batch
+from .portfolio import rescore_portfolio
+from .versions import bump_customer_versions
+from pathlib import Path
 import logging
+import shutil
+import tempfile
+import time
 
 logger = logging.getLogger(__name__)
 
 
+# Number of error messages kept in the returned stats
+MAX_REPORTED_ERRORS = 10
+
+
+def _new_stats():
+    return {
+        'total_processed': 0,
+        'success_count': 0,
+        'error_count': 0,
+        'inserted_count': 0,
+        'updated_count': 0,
+        'skipped_count': 0,  # Unchanged or duplicate rows
+        'errors': []  # First 10 errors for review
+    }
+
+
+# Per-row delta counters summed across batches and chunks
+DELTA_COUNTERS = ('inserted_count', 'updated_count', 'skipped_count')
+
+
+def _record_errors(stats, new_errors):
+    """Log every error but keep only the first few in the stats dict"""
+    for error_msg in new_errors:
+        logger.error(error_msg)
+    errors = stats['errors']
+    errors.extend(new_errors[:max(0, MAX_REPORTED_ERRORS - len(errors))])
+    stats['error_count'] += len(new_errors)
+
+
+def _log_completion(data_type, stats):
+    logger.info(
+        f"{data_type} ingestion completed. "
+        f"Success: {stats['success_count']}, Errors: {stats['error_count']}, "
+        f"Inserted: {stats['inserted_count']}, Updated: {stats['updated_count']}, "
+        f"Skipped: {stats['skipped_count']}"
+    )
+
+    if stats['errors']:
+        logger.warning(f"Errors encountered: {stats['errors'][:5]}...")  # Show first 5 errors
+
+
+def _add_batch_result(stats, result, batch_errors):
+    """Fold the result of one upsert_* call into the running stats"""
+    stats['success_count'] += result['success_count']
+    for counter in DELTA_COUNTERS:
+        stats[counter] += result[counter]
+    _record_errors(stats, batch_errors + result['errors'])
+
+
+def _ingest_rows(data_type, normalize, upsert, path, batch_size, start, stop, engine, full):
+    stats = _new_stats()
+    touched_customer_ids = set()
+
+    for df in iter_row_batches(path, batch_size, start, stop):
+        stats['total_processed'] += len(df)
+
+        started = time.perf_counter()
+        frame, batch_errors = normalize(df)
+        result = upsert(frame, batch_size, engine, full)
+        record_ingestion_batch(data_type, len(df), result, time.perf_counter() - started)
+
+        _add_batch_result(stats, result, batch_errors)
+        touched_customer_ids.update(result['customer_ids'])
+
+    return stats, touched_customer_ids
+
+
+def _ingest_customer_rows(path, batch_size, start=0, stop=None, engine='orm', full=False):
+    """
+    Upsert the new and changed customer rows [start, stop) of a data file,
+    batch by batch (every row when full).
+    Returns (stats, touched_customer_ids).
+    """
+    return _ingest_rows(
+        'customers', normalize_customer_frame, upsert_customers,
+        path, batch_size, start, stop, engine, full
+    )
+
+
+def _ingest_loan_rows(path, batch_size, start=0, stop=None, engine='orm', full=False):
+    """
+    Upsert the new and changed loan rows [start, stop) of a data file,
+    batch by batch (every row when full).
+    Returns (stats, touched_customer_ids), including the previous owners
+    of re-assigned loans.
+    """
+    return _ingest_rows(
+        'loans', normalize_loan_frame, upsert_loans,
+        path, batch_size, start, stop, engine, full
+    )
+
+
+def _skipped_file_stats(data_type, checkpoint):
+    """Stats of a run whose file is unchanged since the last clean ingestion"""
+    logger.info(
+        f"{data_type} file unchanged since {checkpoint.ingested_at}, skipping "
+        f"{checkpoint.row_count} rows"
+    )
+    stats = _new_stats()
+    stats['total_processed'] = checkpoint.row_count
+    stats['skipped_count'] = checkpoint.row_count
+    return stats
+
+
 @shared_task
-def ingest_customer_data():
+def ingest_customer_data(batch_size=None, path=None, engine='orm', full=False):
     """
     Ingest customer data from customer_data.xlsx into the database.
+    The file is streamed in batches of batch_size rows, each converted
+    column-wise and bulk upserted, so memory use is bounded by the batch.
+    engine='copy' writes through PostgreSQL COPY (see ingestion.copy_upsert).
+    Only rows that are new or differ from the table are written, and a file
+    identical to the last clean run is skipped outright; full=True rewrites
+    every row.
     """
     try:
         logger.info("Starting customer data ingestion...")
+        batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        path = path or settings.CUSTOMER_DATA_FILE
 
-        # Read Excel file
-        df = pd.read_excel('customer_data.xlsx')
+        file_hash = file_digest(path)
+        checkpoint = None if full else unchanged_checkpoint('customers', file_hash)
+        if checkpoint:
+            return _skipped_file_stats('Customer', checkpoint)
 
-        # Track ingestion stats
-        total_rows = len(df)
-        success_count = 0
-        error_count = 0
-        errors = []
-
-        logger.info(f"Processing {total_rows} customer records...")
+        logger.info(f"Processing customer records from {path}...")
 
         with transaction.atomic():
-            for index, row in df.iterrows():
-                try:
-                    # Map Excel columns to model fields
-                    customer_data = {
-                        'customer_id': int(row['Customer ID']),
-                        'first_name': str(row['First Name']).strip(),
-                        'last_name': str(row['Last Name']).strip(),
-                        'age': int(row['Age']),
-                        'phone_number': str(row['Phone Number']).strip(),
-                        'monthly_salary': float(row['Monthly Salary']),
-                        'approved_limit': float(row['Approved Limit']),
-                        'current_debt': 0,  # Default value as per PRD
-                        'monthly_income': float(row['Monthly Salary']),  # Same as monthly_salary
-                    }
-
-                    # Create or update customer
-                    customer, created = Customer.objects.update_or_create(
-                        customer_id=customer_data['customer_id'],
-                        defaults=customer_data
-                    )
-
-                    success_count += 1
-                    if created:
-                        logger.debug(f"Created customer: {customer}")
-                    else:
-                        logger.debug(f"Updated customer: {customer}")
-
-                except Exception as e:
-                    error_count += 1
-                    error_msg = f"Row {index + 2}: {str(e)}"
-                    errors.append(error_msg)
-                    logger.error(error_msg)
-
-        logger.info(f"Customer ingestion completed. Success: {success_count}, Errors: {error_count}")
-
-        if errors:
-            logger.warning(f"Errors encountered: {errors[:5]}...")  # Show first 5 errors
+            stats, touched_customer_ids = _ingest_customer_rows(
+                path, batch_size, engine=engine, full=full
+            )
 
-        return {
-            'total_processed': total_rows,
-            'success_count': success_count,
-            'error_count': error_count,
-            'errors': errors[:10]  # Return first 10 errors for review
-        }
+            # Refresh credit summaries, cached profiles and loan versions of
+            # every ingested customer
+            rebuild_credit_summaries(touched_customer_ids)
+            bump_customer_versions(touched_customer_ids)
+
+            save_checkpoint('customers', path, file_hash, stats)
+
+        _log_completion('Customer', stats)
+        return stats
 
     except Exception as e:
         logger.error(f"Critical error in customer ingestion: {str(e)}")
@@ -79,82 +167,42 @@ def ingest_customer_data():
 
 
 @shared_task
-def ingest_loan_data():
+def ingest_loan_data(batch_size=None, path=None, engine='orm', full=False):
     """
     Ingest loan data from loan_data.xlsx into the database.
+    The file is streamed in batches of batch_size rows, each converted
+    column-wise and bulk upserted, so memory use is bounded by the batch.
+    engine='copy' writes through PostgreSQL COPY (see ingestion.copy_upsert).
+    Only rows that are new or differ from the table are written, and a file
+    identical to the last clean run is skipped outright; full=True rewrites
+    every row.
     """
     try:
         logger.info("Starting loan data ingestion...")
+        batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        path = path or settings.LOAN_DATA_FILE
 
-        # Read Excel file
-        df = pd.read_excel('loan_data.xlsx')
+        file_hash = file_digest(path)
+        checkpoint = None if full else unchanged_checkpoint('loans', file_hash)
+        if checkpoint:
+            return _skipped_file_stats('Loan', checkpoint)
 
-        # Track ingestion stats
-        total_rows = len(df)
-        success_count = 0
-        error_count = 0
-        errors = []
-
-        logger.info(f"Processing {total_rows} loan records...")
+        logger.info(f"Processing loan records from {path}...")
 
         with transaction.atomic():
-            for index, row in df.iterrows():
-                try:
-                    # Map Excel columns to model fields
-                    loan_data = {
-                        'loan_id': int(row['Loan ID']),
-                        'loan_amount': float(row['Loan Amount']),
-                        'tenure': int(row['Tenure']),
-                        'interest_rate': float(row['Interest Rate']),
-                        'monthly_repayment': float(row['Monthly payment']),
-                        'emis_paid_on_time': int(row['EMIs paid on Time']),
-                        'start_date': pd.to_datetime(row['Date of Approval']).date(),
-                        'end_date': pd.to_datetime(row['End Date']).date(),
-                    }
-
-                    # Get customer reference
-                    customer_id = int(row['Customer ID'])
-                    try:
-                        customer = Customer.objects.get(customer_id=customer_id)
-                    except Customer.DoesNotExist:
-                        error_count += 1
-                        error_msg = f"Row {index + 2}: Customer ID {customer_id} not found"
-                        errors.append(error_msg)
-                        logger.error(error_msg)
-                        continue
-
-                    # Create or update loan
-                    loan, created = Loan.objects.update_or_create(
-                        loan_id=loan_data['loan_id'],
-                        defaults={
-                            **loan_data,
-                            'customer': customer
-                        }
-                    )
-
-                    success_count += 1
-                    if created:
-                        logger.debug(f"Created loan: {loan}")
-                    else:
-                        logger.debug(f"Updated loan: {loan}")
-
-                except Exception as e:
-                    error_count += 1
-                    error_msg = f"Row {index + 2}: {str(e)}"
-                    errors.append(error_msg)
-                    logger.error(error_msg)
-
-        logger.info(f"Loan ingestion completed. Success: {success_count}, Errors: {error_count}")
-
-        if errors:
-            logger.warning(f"Errors encountered: {errors[:5]}...")  # Show first 5 errors
+            stats, touched_customer_ids = _ingest_loan_rows(
+                path, batch_size, engine=engine, full=full
+            )
 
-        return {
-            'total_processed': total_rows,
-            'success_count': success_count,
-            'error_count': error_count,
-            'errors': errors[:10]  # Return first 10 errors for review
-        }
+            # Refresh credit summaries, cached profiles and loan versions of
+            # every customer whose loans changed
+            rebuild_credit_summaries(touched_customer_ids)
+            bump_customer_versions(touched_customer_ids)
+
+            save_checkpoint('loans', path, file_hash, stats)
+
+        _log_completion('Loan', stats)
+        return stats
 
     except Exception as e:
         logger.error(f"Critical error in loan ingestion: {str(e)}")
@@ -162,7 +210,178 @@ def ingest_loan_data():
 
 
 @shared_task
-def ingest_all_data():
+def ingest_customer_chunk(path, start, stop, batch_size=None, engine='orm', full=False):
+    """
+    Ingest the customer rows [start, stop) of a file.
+    One task of a parallel ingestion; credit summaries are refreshed by
+    merge_ingestion_results once every chunk has committed.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+
+    with transaction.atomic():
+        stats, touched_customer_ids = _ingest_customer_rows(
+            path, batch_size, start, stop, engine, full
+        )
+
+    stats['customer_ids'] = sorted(touched_customer_ids)
+    return stats
+
+
+@shared_task
+def ingest_loan_chunk(path, start, stop, batch_size=None, engine='orm', full=False):
+    """
+    Ingest the loan rows [start, stop) of a file.
+    One task of a parallel ingestion; credit summaries are refreshed by
+    merge_ingestion_results once every chunk has committed.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+
+    with transaction.atomic():
+        stats, touched_customer_ids = _ingest_loan_rows(
+            path, batch_size, start, stop, engine, full
+        )
+
+    stats['customer_ids'] = sorted(touched_customer_ids)
+    return stats
+
+
+@shared_task
+def merge_ingestion_results(chunk_results, data_type, customer_result=None, chunk_dir=None):
+    """
+    Chord callback of a parallel ingestion phase: merge the chunk stats
+    and refresh the credit summaries and loan versions of every touched
+    customer, then remove the phase's chunk_dir, if any.
+    When customer_result is given (loan phase of a full ingestion) the
+    result has the same shape as ingest_all_data.
+    """
+    stats = _new_stats()
+    touched_customer_ids = set()
+
+    for result in chunk_results:
+        stats['total_processed'] += result['total_processed']
+        stats['success_count'] += result['success_count']
+        stats['error_count'] += result['error_count']
+        for counter in DELTA_COUNTERS:
+            stats[counter] += result[counter]
+        stats['errors'].extend(
+            result['errors'][:max(0, MAX_REPORTED_ERRORS - len(stats['errors']))]
+        )
+        touched_customer_ids.update(result.get('customer_ids', []))
+
+    with transaction.atomic():
+        rebuild_credit_summaries(touched_customer_ids)
+        bump_customer_versions(touched_customer_ids)
+
+    _log_completion(data_type, stats)
+    if chunk_dir:
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+
+    if customer_result is not None:
+        return {
+            'customer_result': customer_result,
+            'loan_result': stats,
+            'overall_success': True
+        }
+    return stats
+
+
+def _chunk_signatures(chunk_task, path, batch_size, chunk_rows, engine, full):
+    """
+    Immutable chunk task signatures covering every data row of path, and
+    the directory of the chunk files they read (None for csv files).
+    CSV chunks read their row range of path directly; an xlsx file is
+    split into per-chunk CSV files under INGEST_CHUNK_DIR in one pass.
+    """
+    if Path(path).suffix.lower() != '.xlsx':
+        signatures = [
+            chunk_task.si(path, start, stop, batch_size, engine, full)
+            for start, stop in plan_row_ranges(count_data_rows(path), chunk_rows)
+        ]
+        return signatures, None
+
+    Path(settings.INGEST_CHUNK_DIR).mkdir(parents=True, exist_ok=True)
+    chunk_dir = tempfile.mkdtemp(prefix=f'{Path(path).stem}-', dir=settings.INGEST_CHUNK_DIR)
+    signatures = [
+        chunk_task.si(chunk_path, 0, None, batch_size, engine, full)
+        for chunk_path in split_into_chunk_files(path, chunk_rows, chunk_dir)
+    ]
+    return signatures, chunk_dir
+
+
+def _ingestion_phase(chunk_task, path, batch_size, chunk_rows, engine, full, data_type,
+                     customer_result=None):
+    """Chord of the chunk tasks of path and their merge_ingestion_results callback"""
+    signatures, chunk_dir = _chunk_signatures(
+        chunk_task, path, batch_size, chunk_rows, engine, full
+    )
+    return chord(
+        signatures,
+        merge_ingestion_results.s(
+            data_type, customer_result=customer_result, chunk_dir=chunk_dir
+        )
+    )
+
+
+@shared_task(bind=True)
+def start_loan_ingestion_phase(self, customer_result, path, batch_size=None, chunk_rows=None,
+                               engine='orm', full=False):
+    """
+    Fan out the loan chunk tasks once the customer phase has completed,
+    since loans reference customers.
+    The task is replaced by the loan phase, so its result (and that of
+    the whole workflow) is the merged ingest_all_data-shaped result.
+    """
+    chunk_rows = chunk_rows or settings.INGEST_CHUNK_ROWS
+    loan_phase = _ingestion_phase(
+        ingest_loan_chunk, path, batch_size, chunk_rows, engine, full, 'Loan',
+        customer_result=customer_result
+    )
+    if self.request.is_eager:
+        # Eager chords cannot take over a task ID without a result backend
+        return loan_phase.apply().get()
+    return self.replace(loan_phase)
+
+
+def ingest_parallel(data_type='all', batch_size=None, chunk_rows=None,
+                    customer_path=None, loan_path=None, engine='orm', full=False):
+    """
+    Split the data files into row ranges of chunk_rows and ingest them
+    with a group of chunk tasks per phase, followed by a merge callback.
+    The loan phase starts only after the customer phase has finished.
+    Returns the AsyncResult of the dispatched workflow, whose result is
+    the merged stats (shaped like ingest_all_data for data_type='all').
+
+    Chunks commit independently, so when a customer or loan ID appears in
+    rows of more than one chunk, the row of whichever chunk commits last
+    is kept, not necessarily the last row of the file as in a sequential
+    ingestion. Ingest files that repeat IDs sequentially.
+    """
+    chunk_rows = chunk_rows or settings.INGEST_CHUNK_ROWS
+    customer_path = customer_path or settings.CUSTOMER_DATA_FILE
+    loan_path = loan_path or settings.LOAN_DATA_FILE
+
+    if data_type == 'loans':
+        workflow = _ingestion_phase(
+            ingest_loan_chunk, loan_path, batch_size, chunk_rows, engine, full, 'Loan'
+        )
+        return workflow.apply_async()
+
+    customer_phase = _ingestion_phase(
+        ingest_customer_chunk, customer_path, batch_size, chunk_rows, engine, full, 'Customer'
+    )
+    if data_type == 'customers':
+        return customer_phase.apply_async()
+
+    workflow = chain(
+        customer_phase,
+        start_loan_ingestion_phase.s(loan_path, batch_size, chunk_rows, engine, full)
+    )
+    return workflow.apply_async()
+
+
+@shared_task
+def ingest_all_data(batch_size=None, customer_path=None, loan_path=None, engine='orm',
+                    full=False):
     """
     Ingest both customer and loan data sequentially.
     """
@@ -170,10 +389,10 @@ def ingest_all_data():
 
     try:
         # Ingest customers first
-        customer_result = ingest_customer_data()
+        customer_result = ingest_customer_data(batch_size, customer_path, engine, full)
 
         # Then ingest loans (which depend on customers)
-        loan_result = ingest_loan_data()
+        loan_result = ingest_loan_data(batch_size, loan_path, engine, full)
 
         logger.info("Full data ingestion completed successfully")
 
@@ -189,3 +408,15 @@ def ingest_all_data():
             'error': str(e),
             'overall_success': False
         }
+
+
+@shared_task
+def rescore_portfolio_task(with_slab=False, batch_size=5000):
+    """
+    Recompute credit scores for the whole loan book (nightly risk run).
+    """
+    try:
+        return rescore_portfolio(with_slab=with_slab, batch_size=batch_size)
+    except Exception as e:
+        logger.error(f"Critical error in portfolio rescoring: {str(e)}")
+        raise
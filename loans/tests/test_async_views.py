@@ -0,0 +1,134 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.core.cache import cache
+from loans.models import Customer, CustomerCreditSummary, Loan
+from loans.credit import rebuild_credit_summaries
+from datetime import date, timedelta
+import json
+
+
+class AsyncReadEndpointTest(TestCase):
+    def setUp(self):
+        """Create a customer with current and ended loans"""
+        cache.clear()
+        self.customer = Customer.objects.create(
+            customer_id=5301,
+            first_name="Async",
+            last_name="Reader",
+            age=33,
+            phone_number="9876500301",
+            monthly_salary=120000,
+            approved_limit=4300000,
+            current_debt=0
+        )
+        today = date.today()
+        for i in range(6):
+            Loan.objects.create(
+                loan_id=9301 + i,
+                customer=self.customer,
+                loan_amount=75000 + i * 1000,
+                tenure=18,
+                interest_rate=12.5,
+                monthly_repayment=4500,
+                emis_paid_on_time=i * 3,
+                start_date=today - timedelta(days=400 - i * 60),
+                end_date=today + timedelta(days=(i - 2) * 90)
+            )
+        rebuild_credit_summaries()
+
+    async def assertSameResponse(self, sync_name, async_name, method='get', data=None, **kwargs):
+        sync_url = reverse(sync_name, kwargs=kwargs or None)
+        async_url = reverse(async_name, kwargs=kwargs or None)
+        responses = []
+        for url in (sync_url, async_url):
+            # Each view must load the credit profile itself
+            await cache.aclear()
+            if method == 'get':
+                responses.append(await self.async_client.get(url, data))
+            else:
+                responses.append(await self.async_client.post(
+                    url, json.dumps(data), content_type='application/json'
+                ))
+        sync_response, async_response = responses
+
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response.json(), sync_response.json())
+        return async_response
+
+    async def test_view_loan_matches_sync(self):
+        """Test async view-loan returns the same body as the sync view"""
+        await self.assertSameResponse('view_loan', 'async_view_loan', loan_id=9302)
+        await self.assertSameResponse('view_loan', 'async_view_loan', loan_id=1)
+
+    async def test_view_loans_matches_sync(self):
+        """Test async view-loans returns the same list and pages as the sync view"""
+        response = await self.assertSameResponse(
+            'view_loans', 'async_view_loans', customer_id=5301
+        )
+        self.assertEqual(len(response.json()), 4)
+
+        page = await self.assertSameResponse(
+            'view_loans', 'async_view_loans', data={'limit': 3}, customer_id=5301
+        )
+        await self.assertSameResponse(
+            'view_loans', 'async_view_loans',
+            data={'limit': 3, 'cursor': page.json()['next_cursor']}, customer_id=5301
+        )
+        await self.assertSameResponse('view_loans', 'async_view_loans', customer_id=1)
+
+    async def test_view_loans_stream(self):
+        """Test async streaming writes the same JSON array"""
+        url = reverse('async_view_loans', kwargs={'customer_id': 5301})
+        response = await self.async_client.get(url, {'stream': 'true'})
+
+        self.assertTrue(response.streaming)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        expected = await self.async_client.get(url)
+        self.assertEqual(json.loads(body), expected.json())
+
+    async def test_check_eligibility_matches_sync(self):
+        """Test async check-eligibility matches the sync view on every profile path"""
+        application = {
+            'customer_id': 5301, 'loan_amount': 200000, 'interest_rate': 11, 'tenure': 24
+        }
+        await self.assertSameResponse(
+            'check_eligibility', 'async_check_eligibility', 'post', application
+        )
+
+        # Stale current sums and a missing summary take the other DB paths
+        await CustomerCreditSummary.objects.filter(customer_id=5301).aupdate(
+            current_until=date.min
+        )
+        await self.assertSameResponse(
+            'check_eligibility', 'async_check_eligibility', 'post', application
+        )
+        await CustomerCreditSummary.objects.filter(customer_id=5301).adelete()
+        await self.assertSameResponse(
+            'check_eligibility', 'async_check_eligibility', 'post', application
+        )
+
+        await self.assertSameResponse(
+            'check_eligibility', 'async_check_eligibility', 'post',
+            {**application, 'customer_id': 1}
+        )
+
+    async def test_check_eligibility_requires_post(self):
+        """Test the async eligibility check only accepts POST"""
+        response = await self.async_client.get(reverse('async_check_eligibility'))
+        self.assertEqual(response.status_code, 405)
+
+    async def test_conditional_get(self):
+        """Test the async views share ETags and answer If-None-Match with 304"""
+        for sync_name, async_name, kwargs in (
+            ('view_loan', 'async_view_loan', {'loan_id': 9302}),
+            ('view_loans', 'async_view_loans', {'customer_id': 5301}),
+        ):
+            sync_response = await self.async_client.get(reverse(sync_name, kwargs=kwargs))
+            async_url = reverse(async_name, kwargs=kwargs)
+            async_response = await self.async_client.get(async_url)
+            self.assertEqual(async_response['ETag'], sync_response['ETag'])
+
+            revalidated = await self.async_client.get(
+                async_url, headers={'if-none-match': async_response['ETag']}
+            )
+            self.assertEqual(revalidated.status_code, 304)
@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.test import TransactionTestCase, Client, skipUnlessDBFeature
+from django.urls import reverse
+from django.db import connection
+from loans.models import Customer, CustomerCreditSummary, Loan
+from loans.credit import rebuild_credit_summaries
+from loans.views import calculate_emi
+from datetime import date
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+MONTHLY_SALARY = 40000
+LOAN_REQUEST = {'loan_amount': 50000, 'interest_rate': 18, 'tenure': 12}
+
+
+def apply_for_loan(customer_id):
+    """POST one loan application from a worker thread"""
+    try:
+        response = Client().post(
+            reverse('create_loan'),
+            data=json.dumps({'customer_id': customer_id, **LOAN_REQUEST}),
+            content_type='application/json'
+        )
+        return response.status_code, response.json()
+    finally:
+        connection.close()
+
+
+def run_concurrently(customer_ids, workers=8):
+    """Submit one application per entry of customer_ids; returns (results, per second)"""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(apply_for_loan, customer_ids))
+    elapsed = time.perf_counter() - started
+    return results, len(customer_ids) / elapsed
+
+
+class ConcurrentLoanCreationTest(TransactionTestCase):
+    def setUp(self):
+        """Create well-scored customers whose salary allows only a few more loans"""
+        self.customers = []
+        for customer_id in range(7001, 7009):
+            customer = Customer.objects.create(
+                customer_id=customer_id,
+                first_name="Parallel",
+                last_name=f"Applicant{customer_id}",
+                age=35,
+                phone_number="9876500000",
+                monthly_salary=MONTHLY_SALARY,
+                approved_limit=5000000,
+                current_debt=0
+            )
+            # A clean, finished repayment history keeps the credit score
+            # above 50, so only the EMI limit can reject applications
+            for offset in range(4):
+                Loan.objects.create(
+                    loan_id=customer_id * 10 + offset,
+                    customer=customer,
+                    loan_amount=600000,
+                    tenure=12,
+                    interest_rate=10,
+                    monthly_repayment=1000,
+                    emis_paid_on_time=12,
+                    start_date=date(2015, 1, 1),
+                    end_date=date(2016, 1, 1)
+                )
+            self.customers.append(customer)
+        rebuild_credit_summaries([customer.customer_id for customer in self.customers])
+
+        emi = calculate_emi(LOAN_REQUEST['loan_amount'], LOAN_REQUEST['interest_rate'],
+                            LOAN_REQUEST['tenure'])
+        self.allowed_loans = int(0.5 * MONTHLY_SALARY // emi)
+
+    def assertNotOverApproved(self, customer, results):
+        approved = [
+            body for status, body in results
+            if status == 201 and body['customer_id'] == customer.customer_id
+        ]
+        loans = Loan.objects.filter(customer=customer).current()
+
+        self.assertEqual(len(approved), self.allowed_loans)
+        self.assertEqual(loans.count(), self.allowed_loans)
+        self.assertEqual(
+            CustomerCreditSummary.objects.get(customer=customer).loan_count,
+            4 + self.allowed_loans
+        )
+        self.assertLessEqual(
+            sum(float(loan.monthly_repayment) for loan in loans), 0.5 * MONTHLY_SALARY
+        )
+
+    def test_parallel_applications_do_not_over_approve(self):
+        """Test concurrent applications never push EMIs past 50% of salary"""
+        customer = self.customers[0]
+
+        results, throughput = run_concurrently([customer.customer_id] * 16)
+        logger.info(f"Same-customer applications: {throughput:.1f}/s")
+
+        self.assertTrue(all(status in (200, 201) for status, _ in results))
+        self.assertNotOverApproved(customer, results)
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_different_customers_proceed_in_parallel(self):
+        """Test applications of different customers are not serialized together"""
+        applications = [customer.customer_id for customer in self.customers] * 6
+
+        results, throughput = run_concurrently(applications)
+        logger.info(f"Mixed-customer applications: {throughput:.1f}/s")
+
+        self.assertTrue(all(status in (200, 201) for status, _ in results))
+        for customer in self.customers:
+            self.assertNotOverApproved(customer, results)
@@ -0,0 +1,96 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.cache import cache
+from loans.models import Customer, Loan
+from loans.credit import (
+    credit_profile_cache_stats, rebuild_credit_summaries, load_customer_profile
+)
+import json
+from datetime import date
+
+
+class CreditProfileCacheTest(TestCase):
+    def setUp(self):
+        """Create a customer with one loan and an empty cache"""
+        self.client = Client()
+        cache.clear()
+
+        self.customer = Customer.objects.create(
+            customer_id=8501,
+            first_name="Cached",
+            last_name="Customer",
+            age=29,
+            phone_number="9876522222",
+            monthly_salary=80000,
+            approved_limit=2900000,
+            current_debt=0
+        )
+        Loan.objects.create(
+            loan_id=9501,
+            customer=self.customer,
+            loan_amount=200000,
+            tenure=24,
+            interest_rate=11,
+            monthly_repayment=9321.77,
+            emis_paid_on_time=24,
+            start_date=date(2019, 3, 1),
+            end_date=date(2021, 3, 1)
+        )
+        rebuild_credit_summaries()
+
+    def check_eligibility(self):
+        return self.client.post(
+            reverse('check_eligibility'),
+            data=json.dumps({
+                'customer_id': 8501,
+                'loan_amount': 100000,
+                'interest_rate': 12,
+                'tenure': 12
+            }),
+            content_type='application/json'
+        )
+
+    def test_repeat_quote_served_from_cache(self):
+        """Test repeat eligibility checks do not touch the database"""
+        with self.assertNumQueries(1):
+            first = self.check_eligibility()
+        with self.assertNumQueries(0):
+            second = self.check_eligibility()
+
+        self.assertEqual(first.json(), second.json())
+        stats = credit_profile_cache_stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_create_loan_invalidates_cache(self):
+        """Test a new loan drops the customer's cached profile"""
+        load_customer_profile(8501)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('create_loan'),
+                data=json.dumps({
+                    'customer_id': 8501,
+                    'loan_amount': 50000,
+                    'interest_rate': 12,
+                    'tenure': 12
+                }),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 201)
+
+        with self.assertNumQueries(1):
+            customer, profile = load_customer_profile(8501)
+        self.assertEqual(profile.total_loans, 2)
+
+    def test_rebuild_invalidates_cache(self):
+        """Test ingestion-driven summary rebuilds drop cached profiles"""
+        load_customer_profile(8501)
+        Customer.objects.filter(customer_id=8501).update(approved_limit=100000)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rebuild_credit_summaries([8501])
+
+        customer, profile = load_customer_profile(8501)
+        self.assertEqual(float(customer.approved_limit), 100000.0)
@@ -0,0 +1,246 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from loans.models import Customer, CustomerCreditSummary, Loan
+from loans.credit import (
+    load_customer_profile, load_customer_profiles, rebuild_credit_summaries, record_new_loan,
+    verify_credit_summaries
+)
+from decimal import Decimal
+from io import StringIO
+import json
+from datetime import date, timedelta
+
+
+class CustomerCreditSummaryTest(TestCase):
+    def setUp(self):
+        """Create a customer with some loan history"""
+        self.client = Client()
+        cache.clear()
+
+        self.customer = Customer.objects.create(
+            customer_id=8001,
+            first_name="Summary",
+            last_name="Customer",
+            age=35,
+            phone_number="9876511111",
+            monthly_salary=100000,
+            approved_limit=3600000,
+            current_debt=0
+        )
+
+        # The last loan is still running
+        self.current_end = date.today() + timedelta(days=365)
+        for i in range(3):
+            Loan.objects.create(
+                loan_id=9001 + i,
+                customer=self.customer,
+                loan_amount=100000,
+                tenure=12,
+                interest_rate=10,
+                monthly_repayment=8791.59,
+                emis_paid_on_time=12 if i else 6,
+                start_date=date(2020 + i, 6, 1),
+                end_date=date(2021 + i, 6, 1) if i < 2 else self.current_end
+            )
+
+    def test_rebuild_credit_summaries(self):
+        """Test summaries are rebuilt from the loans table"""
+        self.assertEqual(rebuild_credit_summaries(), 1)
+
+        summary = CustomerCreditSummary.objects.get(customer_id=8001)
+        self.assertEqual(summary.loan_count, 3)
+        self.assertEqual(summary.on_time_count, 2)
+        self.assertEqual(summary.total_volume, Decimal('300000'))
+        self.assertEqual(summary.current_principal_sum, Decimal('100000'))
+        self.assertEqual(summary.current_emi_sum, Decimal('8791.59'))
+        self.assertEqual(summary.current_until, self.current_end)
+        self.assertEqual(summary.yearly_activity, {'2020': 1, '2021': 1, '2022': 1})
+        self.assertEqual(verify_credit_summaries(), [])
+
+    def test_create_loan_updates_summary(self):
+        """Test create_loan keeps the summary in step with the loans table"""
+        rebuild_credit_summaries()
+
+        data = {
+            'customer_id': 8001,
+            'loan_amount': 50000,
+            'interest_rate': 14,
+            'tenure': 7
+        }
+        response = self.client.post(
+            reverse('create_loan'),
+            data=json.dumps(data),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        summary = CustomerCreditSummary.objects.get(customer_id=8001)
+        self.assertEqual(summary.loan_count, 4)
+        self.assertEqual(summary.yearly_activity[str(date.today().year)], 1)
+        self.assertEqual(verify_credit_summaries(), [])
+
+    def test_recorded_loan_uses_stored_amounts(self):
+        """Test half-paisa amounts are added to the summary as the database stored them"""
+        rebuild_credit_summaries()
+
+        loan = Loan.objects.create(
+            loan_id=9010,
+            customer=self.customer,
+            loan_amount=Decimal('20000.125'),
+            tenure=12,
+            interest_rate=10,
+            monthly_repayment=Decimal('1758.325'),
+            emis_paid_on_time=0,
+            start_date=date.today(),
+            end_date=self.current_end
+        )
+        # Round ties away from zero, as PostgreSQL's numeric does
+        Loan.objects.filter(loan_id=9010).update(
+            loan_amount=Decimal('20000.13'), monthly_repayment=Decimal('1758.33')
+        )
+        record_new_loan(loan)
+
+        summary = CustomerCreditSummary.objects.get(customer_id=8001)
+        self.assertEqual(summary.current_principal_sum, Decimal('120000.13'))
+        self.assertEqual(summary.current_emi_sum, Decimal('10549.92'))
+        self.assertEqual(verify_credit_summaries(), [])
+
+    def test_create_loan_stores_whole_paise(self):
+        """Test create-loan quantizes amounts itself, leaving no rounding to the backend"""
+        rebuild_credit_summaries()
+        response = self.client.post(
+            reverse('create_loan'),
+            data=json.dumps({
+                'customer_id': 8001, 'loan_amount': 20000.125, 'interest_rate': 14, 'tenure': 7
+            }),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        loan = Loan.objects.get(loan_id=response.json()['loan_id'])
+        self.assertEqual(loan.loan_amount, Decimal('20000.12'))
+        self.assertEqual(verify_credit_summaries(), [])
+
+    def test_register_creates_empty_summary(self):
+        """Test registration creates an all-zero summary"""
+        data = {
+            'first_name': 'Fresh',
+            'last_name': 'Customer',
+            'age': 22,
+            'monthly_income': 40000,
+            'phone_number': 9000000000
+        }
+        response = self.client.post(
+            reverse('register'),
+            data=json.dumps(data),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        summary = CustomerCreditSummary.objects.get(
+            customer_id=response.json()['customer_id']
+        )
+        self.assertEqual(summary.loan_count, 0)
+        self.assertEqual(summary.yearly_activity, {})
+
+    def test_check_eligibility_single_lookup(self):
+        """Test eligibility check is one primary-key lookup with a summary"""
+        rebuild_credit_summaries()
+
+        data = {
+            'customer_id': 8001,
+            'loan_amount': 100000,
+            'interest_rate': 10,
+            'tenure': 12
+        }
+
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse('check_eligibility'),
+                data=json.dumps(data),
+                content_type='application/json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_rebuild_command_detects_stale_summary(self):
+        """Test the management command verifies and repairs summaries"""
+        rebuild_credit_summaries()
+        CustomerCreditSummary.objects.filter(customer_id=8001).update(loan_count=99)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_credit_summary', '--verify-only', stdout=StringIO())
+
+        call_command('rebuild_credit_summary', stdout=StringIO())
+        self.assertEqual(verify_credit_summaries(), [])
+
+    def test_stale_summary_uses_current_loans(self):
+        """Test current sums are recomputed once a summarized loan has ended"""
+        rebuild_credit_summaries()
+        # Pretend the summary was built while the second loan still ran
+        CustomerCreditSummary.objects.filter(customer_id=8001).update(
+            current_principal_sum=200000, current_until=date(2022, 6, 1)
+        )
+
+        customer, profile = load_customer_profile(8001, use_cache=False)
+
+        self.assertEqual(profile.current_loans_sum, 100000.0)
+        self.assertEqual(profile.current_emis_sum, 8791.59)
+
+        # The repaired sums are stored, so later reads skip the loans table
+        summary = CustomerCreditSummary.objects.get(customer_id=8001)
+        self.assertEqual(summary.current_principal_sum, Decimal('100000'))
+        self.assertEqual(summary.current_until, self.current_end)
+        self.assertEqual(verify_credit_summaries(), [])
+        with self.assertNumQueries(1):
+            load_customer_profile(8001, use_cache=False)
+
+    def test_stale_summaries_are_stored_in_one_update(self):
+        """Test a batch of stale summaries is repaired with a constant number of queries"""
+        customer_ids = [8001]
+        for i in range(1, 6):
+            customer = Customer.objects.create(
+                customer_id=8001 + i,
+                first_name="Stale",
+                last_name=f"Customer{i}",
+                age=35,
+                phone_number="9876511111",
+                monthly_salary=100000,
+                approved_limit=3600000,
+                current_debt=0
+            )
+            Loan.objects.create(
+                loan_id=9100 + i,
+                customer=customer,
+                loan_amount=1000 * i,
+                tenure=12,
+                interest_rate=10,
+                monthly_repayment=100 * i,
+                emis_paid_on_time=0,
+                start_date=date(2025, 1, 1),
+                end_date=self.current_end
+            )
+            customer_ids.append(customer.customer_id)
+        rebuild_credit_summaries()
+        CustomerCreditSummary.objects.update(
+            current_principal_sum=999999, current_until=date(2022, 6, 1)
+        )
+        # A rebuild that lands first is not overwritten by the stale refresh
+        CustomerCreditSummary.objects.filter(customer_id=8005).update(current_until=None)
+
+        with self.assertNumQueries(3):
+            profiles = load_customer_profiles(customer_ids)
+
+        self.assertEqual(profiles[8001][1].current_loans_sum, 100000.0)
+        self.assertEqual(profiles[8004][1].current_emis_sum, 300.0)
+        stored = {
+            summary.customer_id: summary for summary in CustomerCreditSummary.objects.all()
+        }
+        self.assertEqual(stored[8004].current_principal_sum, Decimal('3000'))
+        self.assertEqual(stored[8004].current_emi_sum, Decimal('300'))
+        self.assertEqual(stored[8004].current_until, self.current_end)
+        self.assertEqual(stored[8005].current_principal_sum, Decimal('999999'))
+        self.assertIsNone(stored[8005].current_until)
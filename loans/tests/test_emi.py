@@ -0,0 +1,68 @@
+from django.test import SimpleTestCase
+from loans.emi import (
+    ANNUITY_FACTOR_CACHE_SIZE, _annuity_terms, annuity_factor, calculate_emi, calculate_emi_many
+)
+from decimal import Decimal
+import numpy as np
+
+
+def reference_emi(principal, annual_rate, tenure_months):
+    """The compound interest formula, evaluated directly"""
+    if annual_rate == 0:
+        return principal / tenure_months
+    monthly_rate = annual_rate / 1200
+    return principal * (monthly_rate * (1 + monthly_rate) ** tenure_months) / \
+        ((1 + monthly_rate) ** tenure_months - 1)
+
+
+class EmiTest(SimpleTestCase):
+    def setUp(self):
+        _annuity_terms.cache_clear()
+
+    def test_scalar_matches_formula(self):
+        """Test calculate_emi is exactly the compound interest formula"""
+        for principal, rate, tenure in [
+            (100000, 12, 12), (250000.5, 8.75, 36), (5000000, 16, 360), (90000, 0, 9),
+            (1, 24, 6),
+        ]:
+            self.assertEqual(
+                calculate_emi(principal, rate, tenure), reference_emi(principal, rate, tenure)
+            )
+        self.assertEqual(calculate_emi(90000, 0, 9), 10000)
+        self.assertAlmostEqual(annuity_factor(12, 12) * 100000, calculate_emi(100000, 12, 12))
+
+    def test_factors_are_memoized(self):
+        """Test equal rates given as int, float or Decimal share one bounded cache entry"""
+        calculate_emi(100000, 12, 24)
+        calculate_emi(50000, 12.0, 24)
+        calculate_emi(Decimal('75000'), Decimal('12'), 24)
+        annuity_factor(12, 24.0)
+
+        info = _annuity_terms.cache_info()
+        self.assertEqual((info.hits, info.misses), (3, 1))
+        self.assertEqual(info.maxsize, ANNUITY_FACTOR_CACHE_SIZE)
+
+    def test_vectorized_matches_scalar_exactly(self):
+        """Test calculate_emi_many returns exactly the scalar EMIs"""
+        rng = np.random.default_rng(7)
+        count = 20000
+        principals = np.round(rng.uniform(1000, 10000000, count), 2)
+        rates = np.round(rng.choice([0, 6, 10.5, 12, 14, 16, 18.25, 24], count), 2)
+        tenures = rng.choice([1, 6, 12, 24, 36, 60, 120, 240, 360], count)
+
+        emis = calculate_emi_many(principals, rates, tenures)
+
+        self.assertEqual(emis.shape, (count,))
+        for principal, rate, tenure, emi in zip(
+            principals.tolist(), rates.tolist(), tenures.tolist(), emis.tolist()
+        ):
+            self.assertEqual(emi, calculate_emi(principal, rate, tenure))
+            self.assertEqual(round(emi, 2), round(reference_emi(principal, rate, tenure), 2))
+
+    def test_vectorized_accepts_lists_and_empty_input(self):
+        """Test calculate_emi_many takes plain sequences, including empty ones"""
+        self.assertEqual(
+            calculate_emi_many([100000, 200000], [12, 12], [12, 12]).tolist(),
+            [calculate_emi(100000, 12, 12), calculate_emi(200000, 12, 12)]
+        )
+        self.assertEqual(calculate_emi_many([], [], []).shape, (0,))
@@ -0,0 +1,97 @@
+from django.test import TestCase, TransactionTestCase, Client
+from django.urls import reverse
+from django.db import transaction
+from loans.models import Customer, IdBlockCounter
+from loans.ids import BlockIdAllocator, create_with_id
+from unittest import mock
+import json
+
+
+def make_customer(customer_id):
+    return Customer.objects.create(
+        customer_id=customer_id,
+        first_name="Block",
+        last_name="Allocated",
+        age=30,
+        phone_number="9000000000",
+        monthly_salary=50000,
+        approved_limit=1800000
+    )
+
+
+class BlockIdAllocatorTest(TestCase):
+    def test_ids_come_from_reserved_blocks(self):
+        """Test IDs are handed out from memory, one counter update per block"""
+        allocator = BlockIdAllocator('test_id', Customer, first_id=1, block_size=3)
+
+        self.assertEqual(allocator.next_id(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual([allocator.next_id(), allocator.next_id()], [2, 3])
+
+        self.assertEqual(allocator.next_id(), 4)
+        self.assertEqual(IdBlockCounter.objects.get(name='test_id').next_value, 7)
+
+    def test_blocks_do_not_overlap(self):
+        """Test two allocators sharing a counter receive disjoint IDs"""
+        first = BlockIdAllocator('test_id', Customer, block_size=5)
+        second = BlockIdAllocator('test_id', Customer, block_size=5)
+
+        ids = [first.next_id(), second.next_id(), first.next_id(), second.next_id()]
+
+        self.assertEqual(ids, [1, 6, 2, 7])
+
+    def test_blocks_start_above_imported_ids(self):
+        """Test a new block starts past the highest ID already in the table"""
+        make_customer(250)
+        allocator = BlockIdAllocator('test_id', Customer, block_size=10)
+
+        self.assertEqual(allocator.next_id(), 251)
+
+    def test_collision_reserves_new_block(self):
+        """Test an ID imported after its block was reserved is skipped"""
+        allocator = BlockIdAllocator('test_id', Customer, block_size=10)
+        self.assertEqual(allocator.next_id(), 1)
+        make_customer(2)  # e.g. loaded from a data file meanwhile
+
+        customer = create_with_id(allocator, make_customer)
+
+        self.assertEqual(customer.customer_id, 11)
+
+
+class AutocommitReservationTest(TransactionTestCase):
+    def test_reservation_survives_rollback(self):
+        """Test a block reserved inside a rolled back transaction is not handed out again"""
+        first = BlockIdAllocator('test_id', Customer, block_size=10)
+        second = BlockIdAllocator('test_id', Customer, block_size=10)
+
+        with mock.patch('loans.ids.SINGLE_WRITER_VENDORS', set()):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    self.assertEqual(first.next_id(), 1)
+                    raise RuntimeError("rolled back")
+            self.assertEqual(IdBlockCounter.objects.get(name='test_id').next_value, 11)
+
+            make_customer(40)
+            with transaction.atomic():
+                self.assertEqual(second.next_id(), 41)
+        self.assertEqual(IdBlockCounter.objects.get(name='test_id').next_value, 51)
+
+
+class RegisterIdTest(TestCase):
+    def test_register_assigns_unique_ids(self):
+        """Test consecutive registrations get distinct customer IDs"""
+        client = Client()
+        payload = {
+            'first_name': 'New', 'last_name': 'Customer', 'age': 30,
+            'monthly_income': 50000, 'phone_number': '9000000000'
+        }
+
+        ids = {
+            client.post(
+                reverse('register'), data=json.dumps(payload), content_type='application/json'
+            ).json()['customer_id']
+            for _ in range(5)
+        }
+
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(Customer.objects.filter(customer_id__in=ids).count(), 5)
@@ -0,0 +1,483 @@
+from django.test import TestCase, override_settings
+from django.db import connection
+from loans.models import Customer, Loan
+from loans.ingestion import (
+    copy_upsert, iter_row_batches, normalize_customer_frame, normalize_loan_frame,
+    upsert_customers, upsert_loans
+)
+from loans.models import CustomerCreditSummary
+from loans.tasks import (
+    ingest_customer_data, ingest_loan_data, ingest_customer_chunk, ingest_loan_chunk,
+    merge_ingestion_results, ingest_parallel, start_loan_ingestion_phase
+)
+from loans.ingestion import count_data_rows, plan_row_ranges, split_into_chunk_files
+from credit_approval.celery import app
+from decimal import Decimal
+from datetime import date
+from openpyxl import Workbook
+from unittest import mock
+import os
+import shutil
+import tempfile
+import pandas as pd
+
+
+def customer_rows(*rows):
+    return pd.DataFrame(rows, columns=[
+        'Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number',
+        'Monthly Salary', 'Approved Limit'
+    ])
+
+
+def loan_rows(*rows):
+    return pd.DataFrame(rows, columns=[
+        'Customer ID', 'Loan ID', 'Loan Amount', 'Tenure', 'Interest Rate',
+        'Monthly payment', 'EMIs paid on Time', 'Date of Approval', 'End Date'
+    ])
+
+
+class BulkIngestionTest(TestCase):
+    def test_customer_upsert(self):
+        """Test customers are inserted, updated and validated per row"""
+        Customer.objects.create(
+            customer_id=1, first_name="Old", last_name="Name", age=40,
+            phone_number="9000000001", monthly_salary=1000, approved_limit=36000
+        )
+        df = customer_rows(
+            [1, ' New ', 'Name', 41, 9000000001, 50000, 1800000],
+            [2, 'Second', 'Customer', 'unknown', 9000000002, 60000, 2200000],
+            [3, 'Third', 'Customer', 30, 9000000003, 70000, 2500000],
+        )
+
+        frame, errors = normalize_customer_frame(df)
+        result = upsert_customers(frame, batch_size=1)
+
+        self.assertEqual(result['success_count'], 2)
+        self.assertEqual(errors, ["Row 3: Invalid value for 'Age'"])
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(result['customer_ids'], {1, 3})
+        self.assertEqual(result['inserted_count'], 1)
+        self.assertEqual(result['updated_count'], 1)
+
+        customer = Customer.objects.get(customer_id=1)
+        self.assertEqual(customer.first_name, 'New')
+        self.assertEqual(customer.monthly_income, Decimal('50000'))
+        self.assertFalse(Customer.objects.filter(customer_id=2).exists())
+
+    def test_loan_upsert(self):
+        """Test loans keep the last duplicate row and report missing customers"""
+        Customer.objects.create(
+            customer_id=1, first_name="Loan", last_name="Owner", age=40,
+            phone_number="9000000001", monthly_salary=50000, approved_limit=1800000
+        )
+        df = loan_rows(
+            [1, 100, 50000, 12, 10.5, 4400, 12, '2020-01-15', '2021-01-15'],
+            [1, 100, 70000, 24, 11.5, 3300, 5, '2021-02-01', '2023-02-01'],
+            [2, 101, 80000, 12, 12, 7100, 3, '2020-03-01', '2021-03-01'],
+            [1, 102, 90000, 12, 12, 8000, 0, 'not a date', '2021-03-01'],
+        )
+
+        frame, errors = normalize_loan_frame(df)
+        result = upsert_loans(frame, batch_size=1000)
+
+        self.assertEqual(result['success_count'], 2)
+        self.assertEqual(errors, ["Row 5: Invalid value for 'Date of Approval'"])
+        self.assertEqual(result['errors'], ["Row 4: Customer ID 2 not found"])
+        self.assertEqual(result['customer_ids'], {1})
+        self.assertEqual(result['skipped_count'], 1)
+
+        loan = Loan.objects.get(loan_id=100)
+        self.assertEqual(loan.loan_amount, Decimal('70000'))
+        self.assertEqual(loan.tenure, 24)
+        self.assertEqual(loan.start_date, date(2021, 2, 1))
+        self.assertEqual(Loan.objects.count(), 1)
+
+    def test_loan_upsert_resolves_customers_in_bulk(self):
+        """Test customer lookups do not grow with the number of loan rows"""
+        Customer.objects.create(
+            customer_id=1, first_name="Loan", last_name="Owner", age=40,
+            phone_number="9000000001", monthly_salary=50000, approved_limit=1800000
+        )
+        df = loan_rows(*[
+            [1 if i % 4 else 9, 200 + i, 50000, 12, 10.5, 4400, 12, '2020-01-15', '2021-01-15']
+            for i in range(40)
+        ])
+        frame, errors = normalize_loan_frame(df)
+
+        # Customer and existing loan lookups, and one upsert statement
+        # inside a savepoint
+        with self.assertNumQueries(5):
+            result = upsert_loans(frame, batch_size=1000)
+
+        self.assertEqual(result['success_count'], 30)
+        self.assertEqual(len(result['errors']), 10)
+        self.assertEqual(result['errors'][0], "Row 2: Customer ID 9 not found")
+
+
+
+class CopyUpsertTest(TestCase):
+    def setUp(self):
+        """Stand in a PostgreSQL connection whose raw cursor records COPY input"""
+        self.copied = []
+        self.cursor = mock.MagicMock()
+        self.cursor.cursor.copy_expert.side_effect = (
+            lambda sql, buffer: self.copied.append((sql, buffer.getvalue()))
+        )
+        postgres = mock.MagicMock(vendor='postgresql', ops=connection.ops)
+        postgres.Database.Error = connection.Database.Error
+        postgres.cursor.return_value.__enter__.return_value = self.cursor
+        patcher = mock.patch('loans.ingestion.connection', postgres)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def customers(self, *rows):
+        return [
+            (row_number, Customer(
+                customer_id=customer_id, first_name=first_name, last_name='Copy', age=30,
+                phone_number='9000000000', monthly_salary=50000, approved_limit=1800000,
+                current_debt=0, monthly_income=50000
+            ))
+            for row_number, customer_id, first_name in rows
+        ]
+
+    def executed(self):
+        return [call.args[0] for call in self.cursor.execute.call_args_list]
+
+    def test_copy_and_merge(self):
+        """Test each chunk is copied into the staging table and merged on the primary key"""
+        result = copy_upsert(
+            Customer, self.customers((2, 1, 'First'), (3, 2, 'Second'), (4, 3, 'Third')), 2
+        )
+
+        self.assertEqual(result, (3, [], set()))
+        self.assertEqual(len(self.copied), 2)
+        sql, data = self.copied[0]
+        self.assertIn('COPY "customers_staging"', sql)
+        self.assertEqual(data.splitlines()[0].split(',')[:2], ['1', 'First'])
+        self.assertEqual(len(data.splitlines()), 2)
+
+        executed = self.executed()
+        self.assertTrue(executed[0].startswith('CREATE TEMPORARY TABLE IF NOT EXISTS "customers_staging"'))
+        merges = [sql for sql in executed if sql.startswith('INSERT INTO "customers"')]
+        self.assertEqual(len(merges), 2)
+        self.assertIn('ON CONFLICT ("customer_id") DO UPDATE SET', merges[0])
+        self.assertIn('"first_name" = EXCLUDED."first_name"', merges[0])
+
+    def test_duplicate_keys_keep_last_row(self):
+        """Test a key repeated in a chunk is copied once, with its last row"""
+        result = copy_upsert(
+            Customer, self.customers((2, 1, 'Old'), (3, 2, 'Second'), (4, 1, 'New')), 10
+        )
+
+        self.assertEqual(result, (3, [], set()))
+        rows = self.copied[0][1].splitlines()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual([row.split(',')[1] for row in rows], ['New', 'Second'])
+
+    def test_failed_chunk_falls_back_to_bulk_upsert(self):
+        """Test a chunk the COPY path rejects is retried through bulk_upsert"""
+        self.cursor.cursor.copy_expert.side_effect = connection.Database.Error('bad row')
+        objects = self.customers((2, 1, 'First'), (3, 2, 'Second'))
+
+        with mock.patch(
+            'loans.ingestion.bulk_upsert', return_value=(1, ['Row 3: bad row'], {3})
+        ) as bulk_upsert:
+            result = copy_upsert(Customer, objects, 10)
+
+        bulk_upsert.assert_called_once_with(Customer, objects, 10)
+        self.assertEqual(result, (1, ['Row 3: bad row'], {3}))
+        self.assertFalse(any(sql.startswith('INSERT INTO') for sql in self.executed()))
+
+
+class StreamingReaderTest(TestCase):
+    def setUp(self):
+        """Write small customer and loan files to a temporary directory"""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append([
+            'Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number',
+            'Monthly Salary', 'Approved Limit'
+        ])
+        for customer_id in range(1, 6):
+            sheet.append([
+                customer_id, 'Stream', f'Customer{customer_id}', 30 + customer_id,
+                9000000000 + customer_id, 50000, 1800000
+            ])
+        sheet.append([6, 'Bad', 'Age', 'n/a', 9000000006, 50000, 1800000])
+        self.customer_file = os.path.join(self.directory, 'customers.xlsx')
+        workbook.save(self.customer_file)
+
+        self.loan_file = os.path.join(self.directory, 'loans.csv')
+        loan_rows(
+            [1, 100, 50000, 12, 10.5, 4400, 12, '2020-01-15', '2021-01-15'],
+            [2, 101, 60000, 12, 10.5, 5300, 6, '2020-02-15', '2021-02-15'],
+            [7, 102, 70000, 12, 10.5, 6200, 6, '2020-03-15', '2021-03-15'],
+        ).to_csv(self.loan_file, index=False)
+
+    def test_xlsx_batches_keep_row_offsets(self):
+        """Test xlsx batches are bounded and indexed by row offset"""
+        batches = list(iter_row_batches(self.customer_file, 4))
+
+        self.assertEqual([len(batch) for batch in batches], [4, 2])
+        self.assertEqual(list(batches[1].index), [4, 5])
+        self.assertEqual(batches[0]['Customer ID'].tolist(), [1, 2, 3, 4])
+
+    def test_copy_engine_falls_back_on_sqlite(self):
+        """Test the COPY engine uses the bulk ORM path outside PostgreSQL"""
+        customer_result = ingest_customer_data(
+            batch_size=2, path=self.customer_file, engine='copy'
+        )
+        loan_result = ingest_loan_data(batch_size=2, path=self.loan_file, engine='copy')
+
+        self.assertEqual(customer_result['success_count'], 5)
+        self.assertEqual(loan_result['success_count'], 2)
+        self.assertEqual(Loan.objects.get(loan_id=100).loan_amount, Decimal('50000'))
+
+    def test_unsupported_file_type(self):
+        """Test only xlsx and csv files are accepted"""
+        with self.assertRaises(ValueError):
+            iter_row_batches(os.path.join(self.directory, 'data.json'), 10)
+
+    def test_streamed_ingestion(self):
+        """Test the ingest tasks read configurable files batch by batch"""
+        customer_result = ingest_customer_data(batch_size=2, path=self.customer_file)
+        self.assertEqual(customer_result['total_processed'], 6)
+        self.assertEqual(customer_result['success_count'], 5)
+        self.assertEqual(customer_result['errors'], ["Row 7: Invalid value for 'Age'"])
+
+        loan_result = ingest_loan_data(batch_size=2, path=self.loan_file)
+        self.assertEqual(loan_result['total_processed'], 3)
+        self.assertEqual(loan_result['success_count'], 2)
+        self.assertEqual(loan_result['errors'], ["Row 4: Customer ID 7 not found"])
+
+        self.assertEqual(Customer.objects.count(), 5)
+        self.assertEqual(Loan.objects.get(loan_id=101).start_date, date(2020, 2, 15))
+
+
+class ParallelIngestionTest(TestCase):
+    def setUp(self):
+        """Write a customer workbook and a loan CSV with a few rows each"""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append([
+            'Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number',
+            'Monthly Salary', 'Approved Limit'
+        ])
+        for customer_id in range(1, 8):
+            sheet.append([
+                customer_id, 'Chunk', f'Customer{customer_id}', 30,
+                9000000000 + customer_id, 50000, 1800000
+            ])
+        self.customer_file = os.path.join(self.directory, 'customers.xlsx')
+        workbook.save(self.customer_file)
+
+        self.loan_file = os.path.join(self.directory, 'loans.csv')
+        loan_rows(*[
+            [loan_id % 9 + 1, loan_id, 50000, 12, 10.5, 4400, 12, '2020-01-15', '2021-01-15']
+            for loan_id in range(100, 120)
+        ]).to_csv(self.loan_file, index=False)
+
+    def test_plan_row_ranges(self):
+        """Test files are split into contiguous row ranges"""
+        self.assertEqual(count_data_rows(self.customer_file), 7)
+        self.assertEqual(count_data_rows(self.loan_file), 20)
+        self.assertEqual(plan_row_ranges(7, 3), [(0, 3), (3, 6), (6, 7)])
+        self.assertEqual(plan_row_ranges(0, 3), [])
+
+    def test_chunks_merge_to_full_result(self):
+        """Test chunk results merge into the same stats as a serial run"""
+        customer_chunks = [
+            ingest_customer_chunk(self.customer_file, start, stop, 2)
+            for start, stop in plan_row_ranges(7, 3)
+        ]
+        customer_result = merge_ingestion_results(customer_chunks, 'Customer')
+        self.assertEqual(customer_result['total_processed'], 7)
+        self.assertEqual(customer_result['success_count'], 7)
+
+        loan_chunks = [
+            ingest_loan_chunk(self.loan_file, start, stop, 4)
+            for start, stop in plan_row_ranges(20, 6)
+        ]
+        result = merge_ingestion_results(loan_chunks, 'Loan', customer_result=customer_result)
+
+        self.assertTrue(result['overall_success'])
+        self.assertEqual(result['loan_result']['total_processed'], 20)
+        self.assertEqual(result['loan_result']['success_count'], 16)
+        self.assertEqual(result['loan_result']['error_count'], 4)
+        self.assertIn("Row 8: Customer ID 8 not found", result['loan_result']['errors'])
+        self.assertEqual(Loan.objects.count(), 16)
+        self.assertEqual(CustomerCreditSummary.objects.count(), 7)
+
+    def test_parallel_workflow(self):
+        """Test the chord workflow runs customer chunks before loan chunks"""
+        app.conf.task_always_eager = True
+        self.addCleanup(setattr, app.conf, 'task_always_eager', False)
+        chunk_dir = os.path.join(self.directory, 'chunks')
+
+        with override_settings(INGEST_CHUNK_DIR=chunk_dir):
+            result = ingest_parallel(
+                'all', batch_size=2, chunk_rows=3,
+                customer_path=self.customer_file, loan_path=self.loan_file
+            ).get()
+
+        self.assertEqual(Customer.objects.count(), 7)
+        self.assertEqual(Loan.objects.count(), 16)
+        self.assertEqual(CustomerCreditSummary.objects.get(customer_id=2).loan_count, 3)
+        # The workflow result is the merged result of both phases
+        self.assertTrue(result['overall_success'])
+        self.assertEqual(result['customer_result']['success_count'], 7)
+        self.assertEqual(result['loan_result']['success_count'], 16)
+        # The xlsx chunk files are removed once merged
+        self.assertEqual(os.listdir(chunk_dir), [])
+
+    def test_loan_phase_replaces_its_task(self):
+        """Test the loan phase replaces its starting task, so the workflow ID yields the merged result"""
+        with mock.patch.object(start_loan_ingestion_phase, 'replace', return_value='merged') as replace:
+            result = start_loan_ingestion_phase({'success_count': 7}, self.loan_file, 4, 6)
+
+        self.assertEqual(result, 'merged')
+        loan_phase, = replace.call_args.args
+        self.assertEqual(len(loan_phase.tasks), 4)
+        self.assertEqual(loan_phase.body.kwargs['customer_result'], {'success_count': 7})
+
+    def test_xlsx_is_split_into_chunk_files(self):
+        """Test chunk files split from an xlsx file keep row offsets and cell text"""
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['Customer ID', 'First Name', 'Last Name', 'Age', 'Phone Number',
+                      'Monthly Salary', 'Approved Limit'])
+        sheet.append([1, 'Split', 'Customer1', 30, '0900000001', 50000, 1800000])
+        sheet.append([None] * 7)
+        sheet.append([3, 'Split', 'Customer3', 'n/a', '0900000003', 50000, 1800000])
+        sheet.append([4, 'Split', 'Customer4', 30, '0900000004', 50000, 1800000])
+        path = os.path.join(self.directory, 'split.xlsx')
+        workbook.save(path)
+
+        paths = split_into_chunk_files(path, 2, self.directory)
+
+        self.assertEqual(len(paths), 2)
+        batch, = iter_row_batches(paths[1], 10)
+        self.assertEqual(list(batch.index), [2, 3])
+        self.assertEqual(batch['Phone Number'].tolist(), ['0900000003', '0900000004'])
+
+        result = ingest_customer_chunk(paths[1], 0, None, 10)
+        self.assertEqual(result['success_count'], 1)
+        self.assertEqual(result['errors'], ["Row 4: Invalid value for 'Age'"])
+        self.assertEqual(Customer.objects.get(customer_id=4).phone_number, '0900000004')
+
+
+class DeltaIngestionTest(TestCase):
+    def setUp(self):
+        """Write a customer CSV and a loan CSV to a temporary directory"""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.customer_file = os.path.join(self.directory, 'customers.csv')
+        self.customers = [
+            [customer_id, 'Delta', f'Customer{customer_id}', 30,
+             9000000000 + customer_id, 50000, 1800000]
+            for customer_id in range(1, 5)
+        ]
+        customer_rows(*self.customers).to_csv(self.customer_file, index=False)
+
+        self.loan_file = os.path.join(self.directory, 'loans.csv')
+        loan_rows(
+            [1, 100, 50000, 12, 10.5, 4400, 12, '2020-01-15', '2021-01-15'],
+            [2, 101, 60000, 12, 10.5, 5300, 6, '2020-02-15', '2021-02-15'],
+        ).to_csv(self.loan_file, index=False)
+
+    def test_unchanged_file_is_skipped(self):
+        """Test a second run over the same files writes nothing"""
+        ingest_customer_data(path=self.customer_file)
+        ingest_loan_data(path=self.loan_file)
+
+        # Only the checkpoint lookup runs
+        with self.assertNumQueries(1):
+            customer_result = ingest_customer_data(path=self.customer_file)
+        loan_result = ingest_loan_data(path=self.loan_file)
+
+        self.assertEqual(customer_result['skipped_count'], 4)
+        self.assertEqual(customer_result['success_count'], 0)
+        self.assertEqual(loan_result['skipped_count'], 2)
+        self.assertEqual(loan_result['inserted_count'], 0)
+
+    def test_only_changed_rows_are_written(self):
+        """Test only rows that are new or differ from the table are written"""
+        first = ingest_customer_data(path=self.customer_file)
+        self.assertEqual(first['inserted_count'], 4)
+
+        self.customers[1][5] = 65000
+        self.customers.append([5, 'Delta', 'Customer5', 30, 9000000005, 50000, 1800000])
+        customer_rows(*self.customers).to_csv(self.customer_file, index=False)
+        Customer.objects.filter(customer_id=3).update(first_name='Edited')
+
+        result = ingest_customer_data(path=self.customer_file)
+
+        self.assertEqual(result['total_processed'], 5)
+        self.assertEqual(result['inserted_count'], 1)
+        self.assertEqual(result['updated_count'], 2)
+        self.assertEqual(result['skipped_count'], 2)
+        self.assertEqual(Customer.objects.get(customer_id=2).monthly_income, Decimal('65000'))
+        # Rows edited in the database are restored from the file
+        self.assertEqual(Customer.objects.get(customer_id=3).first_name, 'Delta')
+
+    def test_deleted_rows_are_restored(self):
+        """Test rows deleted from the database, also by cascade, are inserted again"""
+        ingest_customer_data(path=self.customer_file)
+        ingest_loan_data(path=self.loan_file)
+
+        # Deleting customer 1 cascades to loan 100
+        Customer.objects.filter(customer_id=1).delete()
+        Loan.objects.filter(loan_id=101).delete()
+        self.customers[1][5] = 65000
+        customer_rows(*self.customers).to_csv(self.customer_file, index=False)
+        loan_rows(
+            [1, 100, 50000, 12, 10.5, 4400, 12, '2020-01-15', '2021-01-15'],
+            [2, 101, 60000, 12, 10.5, 5300, 6, '2020-02-15', '2021-02-15'],
+            [3, 102, 70000, 12, 10.5, 6200, 3, '2020-03-15', '2021-03-15'],
+        ).to_csv(self.loan_file, index=False)
+
+        customers = ingest_customer_data(path=self.customer_file)
+        loans = ingest_loan_data(path=self.loan_file)
+
+        self.assertEqual(customers['inserted_count'], 1)
+        self.assertEqual(customers['updated_count'], 1)
+        self.assertEqual(customers['skipped_count'], 2)
+        self.assertEqual(loans['inserted_count'], 3)
+        self.assertEqual(loans['skipped_count'], 0)
+        self.assertEqual(Loan.objects.count(), 3)
+
+    def test_full_run_rewrites_every_row(self):
+        """Test full=True ignores checkpoints and rewrites unchanged rows"""
+        ingest_customer_data(path=self.customer_file)
+        Customer.objects.filter(customer_id=3).update(first_name='Edited')
+
+        result = ingest_customer_data(path=self.customer_file, full=True)
+
+        self.assertEqual(result['updated_count'], 4)
+        self.assertEqual(result['skipped_count'], 0)
+        self.assertEqual(Customer.objects.get(customer_id=3).first_name, 'Delta')
+
+    def test_rejected_rows_are_retried(self):
+        """Test loans rejected for a missing customer are retried on the next run"""
+        os.remove(self.customer_file)
+        customer_rows(*self.customers[:1]).to_csv(self.customer_file, index=False)
+        ingest_customer_data(path=self.customer_file)
+
+        first = ingest_loan_data(path=self.loan_file)
+        self.assertEqual(first['error_count'], 1)
+
+        customer_rows(*self.customers).to_csv(self.customer_file, index=False)
+        ingest_customer_data(path=self.customer_file)
+        second = ingest_loan_data(path=self.loan_file)
+
+        self.assertEqual(second['error_count'], 0)
+        self.assertEqual(second['inserted_count'], 1)
+        self.assertEqual(second['skipped_count'], 1)
+        self.assertEqual(CustomerCreditSummary.objects.get(customer_id=2).loan_count, 1)
@@ -0,0 +1,153 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.cache import cache
+from prometheus_client import REGISTRY
+from loans.models import Customer, Loan
+from loans.metrics import record_ingestion_batch
+from credit_approval.celery import mark_pool_process_dead
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+
+# Increments LOAN_DECISIONS once in a separate process
+CHILD_SCRIPT = """
+import django
+django.setup()
+from loans.metrics import record_loan_decision
+record_loan_decision('approved', 'requested_rate')
+"""
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsEndpointTest(TestCase):
+    def setUp(self):
+        """Create a customer with a clean loan history"""
+        self.client = Client()
+        cache.clear()
+        customer = Customer.objects.create(
+            customer_id=6501,
+            first_name="Capacity",
+            last_name="Planner",
+            age=41,
+            phone_number="9876500601",
+            monthly_salary=100000,
+            approved_limit=3600000,
+            current_debt=0
+        )
+        Loan.objects.create(
+            loan_id=8501,
+            customer=customer,
+            loan_amount=200000,
+            tenure=12,
+            interest_rate=10,
+            monthly_repayment=17583,
+            emis_paid_on_time=12,
+            start_date=date.today() - timedelta(days=400),
+            end_date=date.today() - timedelta(days=35)
+        )
+
+    def apply(self, loan_amount):
+        return self.client.post(
+            reverse('create_loan'),
+            data=json.dumps({
+                'customer_id': 6501, 'loan_amount': loan_amount, 'interest_rate': 14, 'tenure': 12
+            }),
+            content_type='application/json'
+        )
+
+    def test_request_metrics(self):
+        """Test requests are counted and timed per URL name"""
+        before = sample('credit_http_requests_total', view='view_loan', method='GET', status='200')
+        timed = sample('credit_http_request_duration_seconds_count', view='view_loan')
+
+        self.client.get(reverse('view_loan', kwargs={'loan_id': 8501}))
+
+        self.assertEqual(
+            sample('credit_http_requests_total', view='view_loan', method='GET', status='200'),
+            before + 1
+        )
+        self.assertEqual(
+            sample('credit_http_request_duration_seconds_count', view='view_loan'), timed + 1
+        )
+
+    def test_loan_decisions_by_reason(self):
+        """Test create-loan outcomes are counted by the rule that decided them"""
+        approved = sample('credit_loan_decisions_total', decision='approved', reason='requested_rate')
+        emi_cap = sample('credit_loan_decisions_total', decision='rejected', reason='emi_cap')
+
+        self.assertEqual(self.apply(100000).status_code, 201)
+        self.assertFalse(self.apply(10000000).json()['loan_approved'])
+
+        self.assertEqual(
+            sample('credit_loan_decisions_total', decision='approved', reason='requested_rate'),
+            approved + 1
+        )
+        self.assertEqual(
+            sample('credit_loan_decisions_total', decision='rejected', reason='emi_cap'),
+            emi_cap + 1
+        )
+
+    def test_ingestion_rows(self):
+        """Test ingestion batches are counted by row outcome"""
+        failed = sample('credit_ingestion_rows_total', data_type='loans', outcome='failed')
+        record_ingestion_batch(
+            'loans', 10,
+            {'inserted_count': 6, 'updated_count': 2, 'skipped_count': 1}, 0.2
+        )
+        self.assertEqual(
+            sample('credit_ingestion_rows_total', data_type='loans', outcome='failed'), failed + 1
+        )
+
+    def test_exposition(self):
+        """Test /metrics serves the text format including cache hit ratios"""
+        self.client.get(reverse('view_loans', kwargs={'customer_id': 6501}))
+        self.client.get(reverse('view_loans', kwargs={'customer_id': 6501}))
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('credit_http_request_duration_seconds_bucket{', body)
+        self.assertIn('credit_loan_response_cache_total{result="hit"}', body)
+        self.assertIn('credit_profile_cache_hit_ratio', body)
+
+    def test_multiprocess_aggregation(self):
+        """Test samples written by separate processes are summed"""
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory}
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, '-c', CHILD_SCRIPT], env=env, check=True,
+                    cwd=Path(__file__).resolve().parents[2]
+                )
+
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}):
+                body = self.client.get('/metrics').content.decode()
+
+        self.assertIn(
+            'credit_loan_decisions_total{decision="approved",reason="requested_rate"} 2.0', body
+        )
+
+    def test_exited_workers_are_marked_dead(self):
+        """Test gunicorn and Celery pool processes drop their files when they exit"""
+        config = runpy.run_path(str(Path(__file__).resolve().parents[2] / 'gunicorn.conf.py'))
+        worker = mock.Mock(pid=4242)
+
+        with mock.patch('prometheus_client.multiprocess.mark_process_dead') as mark_dead:
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': '/tmp/metrics'}):
+                config['child_exit'](None, worker)
+                mark_pool_process_dead(pid=4343)
+            with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': ''}):
+                config['child_exit'](None, worker)
+
+        self.assertEqual([call.args for call in mark_dead.call_args_list], [(4242,), (4343,)])
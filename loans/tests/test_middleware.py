@@ -0,0 +1,82 @@
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.core.cache import cache
+from django.db import connection
+from loans.models import Customer, Loan
+from datetime import date, timedelta
+import re
+
+SERVER_TIMING = re.compile(
+    r'db;dur=(?P<db>[\d.]+);desc="(?P<queries>\d+) queries", '
+    r'app;dur=(?P<app>[\d.]+), total;dur=(?P<total>[\d.]+)'
+)
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        """Create a customer with one loan"""
+        self.client = Client()
+        cache.clear()
+        customer = Customer.objects.create(
+            customer_id=6401,
+            first_name="Metered",
+            last_name="Customer",
+            age=29,
+            phone_number="9876500501",
+            monthly_salary=80000,
+            approved_limit=2900000,
+            current_debt=0
+        )
+        Loan.objects.create(
+            loan_id=8401,
+            customer=customer,
+            loan_amount=60000,
+            tenure=12,
+            interest_rate=12,
+            monthly_repayment=5330,
+            emis_paid_on_time=2,
+            start_date=date.today() - timedelta(days=60),
+            end_date=date.today() + timedelta(days=300)
+        )
+
+    def test_server_timing_counts_queries(self):
+        """Test Server-Timing reports the queries the view ran"""
+        url = reverse('view_loans', kwargs={'customer_id': 6401})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        match = SERVER_TIMING.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertEqual(int(match['queries']), len(context.captured_queries))
+        self.assertGreaterEqual(float(match['total']), float(match['db']))
+
+    def test_log_line_tagged_with_url_name(self):
+        """Test each request logs one line tagged with its URL name"""
+        with self.assertLogs('loans.middleware', level='INFO') as logs:
+            self.client.get(reverse('view_loan', kwargs={'loan_id': 8401}))
+            self.client.get('/api/no-such-endpoint/')
+
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(logs.records[0].view, 'view_loan')
+        self.assertEqual(logs.records[0].status, 200)
+        self.assertIn('view=view_loan method=GET status=200 queries=', logs.output[0])
+        self.assertEqual(logs.records[1].view, 'unresolved')
+
+    async def test_async_views_are_measured(self):
+        """Test queries issued by async views through sync_to_async are counted"""
+        response = await self.async_client.get(
+            reverse('async_view_loans', kwargs={'customer_id': 6401})
+        )
+
+        match = SERVER_TIMING.fullmatch(response['Server-Timing'])
+        self.assertIsNotNone(match, response['Server-Timing'])
+        self.assertGreater(int(match['queries']), 0)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_disabled(self):
+        """Test the middleware removes itself when disabled"""
+        response = Client().get(reverse('view_loan', kwargs={'loan_id': 8401}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Server-Timing'))
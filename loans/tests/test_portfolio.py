@@ -0,0 +1,73 @@
+from django.test import TestCase
+from django.core.management import call_command
+from loans.models import Customer, CustomerCreditScore, Loan
+from loans.portfolio import rescore_portfolio, SLAB_REJECT
+from loans.views import calculate_credit_score, apply_approval_rules
+from io import StringIO
+from datetime import date
+import random
+
+
+class PortfolioRescoringTest(TestCase):
+    def setUp(self):
+        """Create a random portfolio with reproducible loan histories"""
+        rng = random.Random(42)
+        current_year = date.today().year
+
+        loan_id = 20001
+        loans = []
+        for customer_id in range(10001, 10061):
+            customer = Customer.objects.create(
+                customer_id=customer_id,
+                first_name="Portfolio",
+                last_name=f"Customer{customer_id}",
+                age=rng.randint(21, 65),
+                phone_number=f"9{customer_id:09d}",
+                monthly_salary=rng.randint(20, 200) * 1000,
+                approved_limit=rng.randint(5, 80) * 100000,
+                current_debt=0
+            )
+            for _ in range(rng.choice([0, 1, 2, 3, 5, 8])):
+                tenure = rng.choice([6, 12, 24, 36])
+                start_year = rng.randint(current_year - 6, current_year)
+                loans.append(Loan(
+                    loan_id=loan_id,
+                    customer=customer,
+                    loan_amount=rng.randint(10000, 2500000) + rng.randint(0, 99) / 100,
+                    tenure=tenure,
+                    interest_rate=rng.randint(800, 1800) / 100,
+                    monthly_repayment=rng.randint(1000, 90000),
+                    emis_paid_on_time=rng.choice([tenure, rng.randint(0, tenure)]),
+                    start_date=date(start_year, rng.randint(1, 12), 1),
+                    end_date=date(start_year + 3, 1, 1)
+                ))
+                loan_id += 1
+        Loan.objects.bulk_create(loans)
+
+    def test_vectorized_scores_match_scalar(self):
+        """Test rescoring produces the same score as calculate_credit_score"""
+        result = rescore_portfolio(with_slab=True)
+        self.assertEqual(result['customers_scored'], 60)
+
+        scores = {row.customer_id: row for row in CustomerCreditScore.objects.all()}
+        for customer in Customer.objects.all():
+            expected = calculate_credit_score(customer)
+            self.assertEqual(scores[customer.customer_id].credit_score, expected)
+
+            loans_sum = sum(float(loan.loan_amount) for loan in customer.loans.current())
+            effective = 0 if loans_sum > float(customer.approved_limit) else expected
+            approval, corrected_rate = apply_approval_rules(effective, 0, 0)
+            slab = scores[customer.customer_id].approval_slab
+            self.assertEqual(slab == SLAB_REJECT, not approval)
+            if approval and corrected_rate:
+                self.assertEqual(slab, f'min_rate_{int(corrected_rate)}')
+
+    def test_rescore_command_replaces_scores(self):
+        """Test the management command rewrites the score table"""
+        call_command('rescore_portfolio', '--sync', stdout=StringIO())
+        call_command('rescore_portfolio', '--sync', '--batch-size', '7', stdout=StringIO())
+
+        self.assertEqual(CustomerCreditScore.objects.count(), 60)
+        self.assertFalse(
+            CustomerCreditScore.objects.filter(approval_slab__isnull=False).exists()
+        )
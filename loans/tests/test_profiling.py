@@ -0,0 +1,110 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.core.cache import cache
+from django.core.management import call_command
+from loans.models import Customer
+from loans.tasks import rescore_portfolio_task
+from io import StringIO
+from pathlib import Path
+import json
+import tempfile
+
+
+class ProfilingTest(TestCase):
+    def setUp(self):
+        """Create a customer and an empty spool directory"""
+        cache.clear()
+        Customer.objects.create(
+            customer_id=6601,
+            first_name="Profiled",
+            last_name="Customer",
+            age=36,
+            phone_number="9876500701",
+            monthly_salary=70000,
+            approved_limit=2500000,
+            current_debt=0
+        )
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        self.spool = Path(spool.name)
+        self.settings = override_settings(
+            PROFILING_ENABLED=True,
+            PROFILING_SAMPLE_RATE=0.0,
+            PROFILING_VIEWS=['check_eligibility'],
+            PROFILING_HEADER_TOKEN='let-me-profile',
+            PROFILING_SPOOL_DIR=str(self.spool),
+            PROFILING_MAX_FILES=3,
+        )
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        # The middleware reads PROFILING_ENABLED when the client's handler loads
+        self.client = Client()
+
+    def check_eligibility(self, **headers):
+        return self.client.post(
+            reverse('check_eligibility'),
+            data=json.dumps({
+                'customer_id': 6601, 'loan_amount': 50000, 'interest_rate': 14, 'tenure': 12
+            }),
+            content_type='application/json',
+            headers=headers
+        )
+
+    def test_trusted_header_forces_profile(self):
+        """Test only requests with the trusted token are profiled at a zero sample rate"""
+        self.check_eligibility()
+        self.check_eligibility(**{'X-Profile': 'wrong'})
+        self.assertEqual(list(self.spool.glob('*.prof')), [])
+
+        self.assertEqual(self.check_eligibility(**{'X-Profile': 'let-me-profile'}).status_code, 200)
+        profiles = list(self.spool.glob('*.prof'))
+        self.assertEqual(len(profiles), 1)
+        self.assertIn('-check_eligibility-', profiles[0].name)
+
+        summary = profiles[0].with_suffix('.txt').read_text()
+        self.assertIn('POST /api/check-eligibility/ (check_eligibility) -> 200', summary)
+        self.assertIn('cumulative', summary)
+
+    def test_sampling_limited_to_configured_views(self):
+        """Test sampled profiling skips views outside PROFILING_VIEWS and rotates the spool"""
+        with override_settings(PROFILING_SAMPLE_RATE=1.0):
+            client = Client()
+            client.get(reverse('view_loans', kwargs={'customer_id': 6601}))
+            self.assertEqual(list(self.spool.glob('*.prof')), [])
+
+            for _ in range(5):
+                client.post(
+                    reverse('check_eligibility'),
+                    data=json.dumps({'customer_id': 6601, 'loan_amount': 50000,
+                                     'interest_rate': 14, 'tenure': 12}),
+                    content_type='application/json'
+                )
+
+        self.assertEqual(len(list(self.spool.glob('*.prof'))), 3)
+        self.assertEqual(len(list(self.spool.glob('*.txt'))), 3)
+
+    def test_disabled_by_default(self):
+        """Test the middleware is not installed without PROFILING_ENABLED"""
+        with override_settings(PROFILING_ENABLED=False):
+            client = Client()
+            client.get(
+                reverse('view_loans', kwargs={'customer_id': 6601}),
+                headers={'X-Profile': 'let-me-profile'}
+            )
+        self.assertEqual(list(self.spool.glob('*.prof')), [])
+
+    def test_celery_task_profile_and_summary(self):
+        """Test sampled task runs are spooled and the command merges the spool"""
+        with override_settings(PROFILING_TASK_SAMPLE_RATE=1.0,
+                               PROFILING_TASKS=['loans.tasks.rescore_portfolio_task']):
+            rescore_portfolio_task.apply()
+        self.check_eligibility(**{'X-Profile': 'let-me-profile'})
+        self.check_eligibility(**{'X-Profile': 'let-me-profile'})
+
+        task_profiles = list(self.spool.glob('*-rescore_portfolio_task-*.prof'))
+        self.assertEqual(len(task_profiles), 1)
+
+        out = StringIO()
+        call_command('summarize_profiles', label='check_eligibility', limit=5, stdout=out)
+        self.assertIn('Merged 2 profiles', out.getvalue())
+        self.assertIn('function calls', out.getvalue())
@@ -0,0 +1,274 @@
+from contextlib import contextmanager
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.core.cache import cache
+from django.db import connection
+from loans.models import Customer, CustomerCreditSummary, Loan
+from loans.credit import rebuild_credit_summaries
+from loans.ids import customer_ids, loan_ids
+from loans.tasks import ingest_customer_chunk, ingest_loan_chunk, merge_ingestion_results
+from loans.tests.test_ingestion import customer_rows, loan_rows
+from datetime import date, timedelta
+import json
+import os
+import shutil
+import tempfile
+
+# Loans held by the customer each endpoint is measured against
+HISTORY_SIZES = (0, 1, 100, 10000)
+
+# Most queries one request or task may issue, whatever the customer's
+# history size. Counts include savepoints, and the first ID block
+# reservation (counter row included) of register and create_loan.
+QUERY_BUDGETS = {
+    'register': 12,
+    'check_eligibility': 1,
+    'check_eligibility_batch': 1,
+    'check_eligibility_stale': 3,
+    'check_eligibility_batch_stale': 3,
+    'create_loan': 17,
+    'view_loan': 1,
+    'view_loans': 2,
+    'view_loans_page': 2,
+    'loan_schedule': 1,
+    'ingest_customer_chunk': 10,
+    'ingest_loan_chunk': 12,
+    'merge_ingestion_results': 9,
+}
+
+# Rows per ingestion chunk measured, upserted in two batches
+CHUNK_ROWS = 50
+CHUNK_BATCH_SIZE = 25
+
+
+def history_customer_id(size):
+    return 7100 + HISTORY_SIZES.index(size)
+
+
+class QueryBudgetTestCase(TestCase):
+    """Customers of every history size, and the budget assertions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Create one customer per history size, holding that many current loans"""
+        today = date.today()
+        next_loan_id = 200001
+        for size in HISTORY_SIZES:
+            customer = Customer.objects.create(
+                customer_id=history_customer_id(size),
+                first_name="Budget",
+                last_name=f"History{size}",
+                age=40,
+                phone_number="9876500801",
+                monthly_salary=500000,
+                approved_limit=18000000,
+                current_debt=0
+            )
+            Loan.objects.bulk_create([
+                Loan(
+                    loan_id=next_loan_id + i,
+                    customer=customer,
+                    loan_amount=100,
+                    tenure=12,
+                    interest_rate=10,
+                    monthly_repayment=1,
+                    emis_paid_on_time=12,
+                    start_date=today - timedelta(days=i % 300),
+                    end_date=today + timedelta(days=30 + i % 300)
+                )
+                for i in range(size)
+            ], batch_size=2000)
+            next_loan_id += size
+        rebuild_credit_summaries()
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+        # Measure the worst case: register and create_loan reserve a new ID block
+        customer_ids.discard_block()
+        loan_ids.discard_block()
+
+    @contextmanager
+    def assertQueryBudget(self, name, label):
+        """Fail with every captured SQL statement when name's budget is exceeded"""
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        queries = context.captured_queries
+        if len(queries) > QUERY_BUDGETS[name]:
+            self.fail(self.describe(
+                f"{label} ran {len(queries)} queries, over the budget of {QUERY_BUDGETS[name]}",
+                queries
+            ))
+
+    def describe(self, message, queries):
+        statements = '\n'.join(
+            f"  {number}. {query['sql']}" for number, query in enumerate(queries, 1)
+        )
+        return f"{message}:\n{statements}"
+
+    def make_summaries_stale(self):
+        """Date every credit summary's current sums before a loan that has since ended"""
+        CustomerCreditSummary.objects.update(current_until=date.today() - timedelta(days=1))
+
+    def assertFlatAcrossHistory(self, name, measure, stale=False):
+        """
+        Run measure(size) inside the budget for every history size and
+        check the query count does not grow with the size. With stale,
+        every credit summary is made stale before each measurement.
+        """
+        counts = {}
+        captured = {}
+        for size in HISTORY_SIZES:
+            cache.clear()
+            if stale:
+                self.make_summaries_stale()
+            with self.assertQueryBudget(name, f"{name} with {size} loans") as context:
+                measure(size)
+            counts[size] = len(context.captured_queries)
+            captured[size] = context.captured_queries
+
+        largest = HISTORY_SIZES[-1]
+        smallest = min(counts, key=counts.get)
+        if counts[largest] > counts[smallest]:
+            self.fail(
+                f"{name} query count grows with history size {counts}\n"
+                + self.describe(f"{smallest} loans", captured[smallest]) + "\n"
+                + self.describe(f"{largest} loans", captured[largest])
+            )
+
+
+class EndpointQueryBudgetTest(QueryBudgetTestCase):
+    def post(self, name, payload):
+        return self.client.post(
+            reverse(name), data=json.dumps(payload), content_type='application/json'
+        )
+
+    def application(self, size):
+        return {
+            'customer_id': history_customer_id(size),
+            'loan_amount': 100000,
+            'interest_rate': 12,
+            'tenure': 12
+        }
+
+    def test_register(self):
+        """Test register stays within its budget"""
+        with self.assertQueryBudget('register', 'register'):
+            response = self.post('register', {
+                'first_name': 'Budget', 'last_name': 'Newcomer', 'age': 30,
+                'monthly_income': 50000, 'phone_number': '9876500899'
+            })
+        self.assertEqual(response.status_code, 201)
+
+    def test_check_eligibility(self):
+        """Test check-eligibility does not grow with loan history, stale summaries included"""
+        def measure(size):
+            self.assertEqual(self.post('check_eligibility', self.application(size)).status_code, 200)
+        self.assertFlatAcrossHistory('check_eligibility', measure)
+        self.assertFlatAcrossHistory('check_eligibility_stale', measure, stale=True)
+
+    def test_check_eligibility_batch(self):
+        """Test batch eligibility does not grow with loan history, batch size or stale summaries"""
+        def measure(size):
+            response = self.post('check_eligibility_batch', [
+                self.application(history_size) for history_size in HISTORY_SIZES
+                if history_size <= size
+            ])
+            self.assertEqual(response.status_code, 200)
+        self.assertFlatAcrossHistory('check_eligibility_batch', measure)
+        self.assertFlatAcrossHistory('check_eligibility_batch_stale', measure, stale=True)
+
+    def test_create_loan(self):
+        """Test create-loan does not grow with loan history"""
+        def measure(size):
+            loan_ids.discard_block()
+            response = self.post('create_loan', self.application(size))
+            self.assertEqual(response.status_code, 201, response.json())
+        self.assertFlatAcrossHistory('create_loan', measure)
+
+    def test_view_loan(self):
+        """Test view-loan is a single query"""
+        def measure(size):
+            loan = Loan.objects.filter(customer_id=history_customer_id(size)).first()
+            loan_id = loan.loan_id if loan else 1
+            cache.clear()
+            with self.assertQueryBudget('view_loan', f"view_loan of a customer with {size} loans"):
+                self.client.get(reverse('view_loan', kwargs={'loan_id': loan_id}))
+        for size in HISTORY_SIZES:
+            measure(size)
+
+    def test_loan_schedule(self):
+        """Test a streamed schedule is a single query"""
+        for size in HISTORY_SIZES[1:]:
+            loan_id = Loan.objects.filter(customer_id=history_customer_id(size)).first().loan_id
+            cache.clear()
+            with self.assertQueryBudget('loan_schedule', f"loan_schedule with {size} loans"):
+                response = self.client.get(reverse('loan_schedule', kwargs={'loan_id': loan_id}))
+                b''.join(response.streaming_content)
+
+    def test_view_loans(self):
+        """Test view-loans and its pages do not grow with loan history"""
+        def measure(size):
+            url = reverse('view_loans', kwargs={'customer_id': history_customer_id(size)})
+            response = self.client.get(url)
+            self.assertEqual(len(response.json()), size)
+        self.assertFlatAcrossHistory('view_loans', measure)
+
+        def measure_page(size):
+            url = reverse('view_loans', kwargs={'customer_id': history_customer_id(size)})
+            self.assertEqual(self.client.get(url, {'limit': 50}).status_code, 200)
+        self.assertFlatAcrossHistory('view_loans_page', measure_page)
+
+
+class IngestionQueryBudgetTest(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_customer_chunk(self, size):
+        """A chunk updating the history customer and adding new ones"""
+        path = os.path.join(self.directory, f'customers-{size}.csv')
+        customer_rows(*[
+            (history_customer_id(size) if i == 0 else 300000 + size * 100 + i,
+             'Chunk', f'Row{i}', 30, 9876500000 + i, 60000 + size, 2200000)
+            for i in range(CHUNK_ROWS)
+        ]).to_csv(path, index=False)
+        return path
+
+    def write_loan_chunk(self, size):
+        """A chunk of new loans for the history customer"""
+        path = os.path.join(self.directory, f'loans-{size}.csv')
+        loan_rows(*[
+            (history_customer_id(size), 900000 + size * 100 + i, 50000, 12, 10, 4400, 3,
+             '2025-01-01', '2026-01-01')
+            for i in range(CHUNK_ROWS)
+        ]).to_csv(path, index=False)
+        return path
+
+    def test_ingest_customer_chunk(self):
+        """Test a customer chunk does not grow with the loan history of its customers"""
+        def measure(size):
+            result = ingest_customer_chunk(self.write_customer_chunk(size), 0, CHUNK_ROWS, CHUNK_BATCH_SIZE)
+            self.assertEqual(result['success_count'], CHUNK_ROWS)
+        self.assertFlatAcrossHistory('ingest_customer_chunk', measure)
+
+    def test_ingest_loan_chunk(self):
+        """Test a loan chunk does not grow with the loan history of its customer"""
+        def measure(size):
+            result = ingest_loan_chunk(self.write_loan_chunk(size), 0, CHUNK_ROWS, CHUNK_BATCH_SIZE)
+            self.assertEqual(result['success_count'], CHUNK_ROWS)
+        self.assertFlatAcrossHistory('ingest_loan_chunk', measure)
+
+    def test_merge_ingestion_results(self):
+        """Test refreshing a touched customer does not grow with its loan history"""
+        results = {
+            size: ingest_loan_chunk(self.write_loan_chunk(size), 0, CHUNK_ROWS, CHUNK_BATCH_SIZE)
+            for size in HISTORY_SIZES
+        }
+
+        def measure(size):
+            with self.captureOnCommitCallbacks(execute=True):
+                merge_ingestion_results([results[size]], 'Loan')
+        self.assertFlatAcrossHistory('merge_ingestion_results', measure)
@@ -0,0 +1,139 @@
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.core.cache import cache
+from django.db import connection, transaction
+from loans.models import Customer, CustomerCreditSummary, Loan
+from loans.credit import rebuild_credit_summaries
+from datetime import date, timedelta
+import json
+
+# Tables whose full scans the endpoints must avoid
+INDEXED_TABLES = ('loans', 'customers', 'customer_credit_summaries')
+
+
+def full_table_scans(sql):
+    """
+    EXPLAIN a captured SELECT and return the plan lines that read a whole
+    table instead of searching an index.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Tables in tests are tiny; make the planner show index usage
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            lines = [row[0] for row in cursor.fetchall()]
+            return [
+                line for line in lines
+                if 'Seq Scan' in line and any(f' {table} ' in f'{line} ' for table in INDEXED_TABLES)
+            ]
+
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        lines = [row[-1] for row in cursor.fetchall()]
+        return [
+            line for line in lines
+            if line.startswith('SCAN') and line.split()[1] in INDEXED_TABLES
+        ]
+
+
+class EndpointQueryPlanTest(TestCase):
+    def setUp(self):
+        """Create customers with ended and running loans"""
+        self.client = Client()
+        cache.clear()
+
+        today = date.today()
+        loan_id = 6001
+        for customer_id in range(3001, 3011):
+            customer = Customer.objects.create(
+                customer_id=customer_id,
+                first_name="Plan",
+                last_name=f"Customer{customer_id}",
+                age=30,
+                phone_number="9876543210",
+                monthly_salary=90000,
+                approved_limit=3200000,
+                current_debt=0
+            )
+            for offset in range(4):
+                Loan.objects.create(
+                    loan_id=loan_id,
+                    customer=customer,
+                    loan_amount=100000,
+                    tenure=12,
+                    interest_rate=12,
+                    monthly_repayment=2000,
+                    emis_paid_on_time=12 if offset % 2 else 6,
+                    start_date=today - timedelta(days=700 - offset * 200),
+                    end_date=today - timedelta(days=335 - offset * 200)
+                )
+                loan_id += 1
+        rebuild_credit_summaries()
+
+    def assertIndexedQueries(self, method, name, payload=None, **kwargs):
+        url = reverse(name, kwargs=kwargs or None)
+        with CaptureQueriesContext(connection) as context:
+            if method == 'get':
+                response = self.client.get(url)
+            else:
+                response = self.client.post(
+                    url, data=json.dumps(payload), content_type='application/json'
+                )
+        self.assertLess(response.status_code, 400)
+
+        selects = [query['sql'] for query in context.captured_queries
+                   if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertEqual(full_table_scans(sql), [], sql)
+        return response
+
+    def test_view_loans_plan(self):
+        """Test view-loans reads current loans through the (customer, end_date) index"""
+        response = self.assertIndexedQueries('get', 'view_loans', customer_id=3001)
+        self.assertEqual(len(response.json()), 2)
+
+        plan = Loan.objects.filter(customer_id=3001).current().explain()
+        if connection.vendor == 'sqlite':
+            self.assertIn('loans_customer_end_idx', plan)
+
+    def test_view_loans_page_plan(self):
+        """Test a keyset page of view-loans avoids full scans"""
+        url = reverse('view_loans', kwargs={'customer_id': 3001})
+        first = self.client.get(url, {'limit': 1}).json()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {'limit': 1, 'cursor': first['next_cursor']})
+        self.assertEqual(len(response.json()['loans']), 1)
+        for query in context.captured_queries:
+            self.assertEqual(full_table_scans(query['sql']), [], query['sql'])
+
+    def test_view_loan_plan(self):
+        """Test view-loan is a primary-key lookup"""
+        self.assertIndexedQueries('get', 'view_loan', loan_id=6001)
+
+    def test_check_eligibility_plans(self):
+        """Test eligibility checks use indexes with fresh, stale and missing summaries"""
+        payload = {'customer_id': 3002, 'loan_amount': 50000, 'interest_rate': 14, 'tenure': 12}
+        self.assertIndexedQueries('post', 'check_eligibility', payload)
+
+        CustomerCreditSummary.objects.filter(customer_id=3003).update(current_until=date.min)
+        self.assertIndexedQueries('post', 'check_eligibility', {**payload, 'customer_id': 3003})
+
+        CustomerCreditSummary.objects.filter(customer_id=3004).delete()
+        self.assertIndexedQueries('post', 'check_eligibility', {**payload, 'customer_id': 3004})
+
+    def test_check_eligibility_batch_plan(self):
+        """Test batch eligibility resolves customers with index lookups"""
+        CustomerCreditSummary.objects.filter(customer_id__in=[3005, 3006]).delete()
+        payload = [
+            {'customer_id': customer_id, 'loan_amount': 50000, 'interest_rate': 14, 'tenure': 12}
+            for customer_id in range(3001, 3008)
+        ]
+        self.assertIndexedQueries('post', 'check_eligibility_batch', payload)
+
+    def test_create_loan_plan(self):
+        """Test create-loan locks, reads and updates one customer through indexes"""
+        payload = {'customer_id': 3007, 'loan_amount': 50000, 'interest_rate': 14, 'tenure': 12}
+        response = self.assertIndexedQueries('post', 'create_loan', payload)
+        self.assertTrue(response.json()['loan_approved'])
@@ -0,0 +1,210 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.core.cache import cache
+from django.core.management import call_command
+from loans.emi import calculate_emi
+from loans.models import Customer, Loan
+from loans.schedules import export_schedules, iter_schedule, schedule_frame
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+import csv
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+class ScheduleTest(TestCase):
+    def test_schedule_repays_the_loan(self):
+        """Test instalments follow calculate_emi and clear the balance exactly"""
+        rows = list(iter_schedule(100000, 12, 12, date(2025, 1, 1), emis_paid_on_time=4))
+        emi = round(calculate_emi(100000, 12, 12), 2)
+
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0]['interest'], 1000.0)
+        self.assertEqual(rows[0]['payment'], emi)
+        self.assertTrue(all(row['payment'] == emi for row in rows[:-1]))
+        self.assertAlmostEqual(rows[-1]['payment'], emi, delta=0.05)
+        self.assertEqual(sum(round(row['principal'] * 100) for row in rows), 10000000)
+        self.assertEqual(rows[-1]['balance'], 0)
+        self.assertEqual(rows[0]['due_date'], date(2025, 1, 31))
+        self.assertEqual([row['paid_on_time'] for row in rows].count(True), 4)
+        self.assertTrue(rows[3]['paid_on_time'])
+        self.assertFalse(rows[4]['paid_on_time'])
+
+    def test_zero_rate_schedule(self):
+        """Test an interest-free loan repays equal principal"""
+        rows = list(iter_schedule(Decimal('90000.00'), Decimal('0.00'), 9, date(2025, 1, 1)))
+        self.assertEqual({row['payment'] for row in rows}, {10000.0})
+        self.assertEqual({row['interest'] for row in rows}, {0.0})
+
+    def test_vectorized_schedules_match_generator(self):
+        """Test schedule_frame reproduces iter_schedule to the paisa for many loans"""
+        rng = np.random.default_rng(11)
+        count = 300
+        loans = pd.DataFrame({
+            'loan_id': np.arange(1, count + 1),
+            'loan_amount': [
+                Decimal(f'{amount:.2f}') for amount in rng.uniform(1000, 5000000, count)
+            ],
+            'interest_rate': [
+                Decimal(str(rate)) for rate in rng.choice([0, 8.5, 12, 15.75, 24], count)
+            ],
+            'tenure': rng.choice([1, 6, 12, 60, 360], count),
+            'start_date': [date(2024, 1, 1 + i % 28) for i in range(count)],
+            'emis_paid_on_time': rng.integers(0, 12, count),
+        })
+
+        frame = schedule_frame(loans)
+
+        expected = [
+            dict(loan_id=loan.loan_id, **row)
+            for loan in loans.itertuples()
+            for row in iter_schedule(
+                loan.loan_amount, loan.interest_rate, int(loan.tenure), loan.start_date,
+                int(loan.emis_paid_on_time)
+            )
+        ]
+        self.assertEqual(len(frame), len(expected))
+        self.assertEqual(frame.to_dict('records'), expected)
+
+    def test_loans_without_instalments(self):
+        """Test a zero tenure gives an empty schedule instead of dividing by zero"""
+        self.assertEqual(list(iter_schedule(100000, 12, 0, date(2025, 1, 1))), [])
+        loans = pd.DataFrame({
+            'loan_id': [1, 2],
+            'loan_amount': [Decimal('100000.00'), Decimal('5000.00')],
+            'interest_rate': [Decimal('12.00'), Decimal('0.00')],
+            'tenure': [0, 2],
+            'start_date': [date(2025, 1, 1)] * 2,
+            'emis_paid_on_time': [0, 0],
+        })
+        frame = schedule_frame(loans)
+        self.assertEqual(frame['loan_id'].tolist(), [2, 2])
+        self.assertTrue(schedule_frame(loans.iloc[:1]).empty)
+
+    def test_empty_frame(self):
+        """Test schedule_frame accepts no loans"""
+        self.assertTrue(schedule_frame(pd.DataFrame(columns=['loan_id'])).empty)
+
+
+class LoanScheduleEndpointTest(TestCase):
+    def setUp(self):
+        """Create a customer with a 30-year loan"""
+        self.client = Client()
+        cache.clear()
+        customer = Customer.objects.create(
+            customer_id=6801,
+            first_name="Schedule",
+            last_name="Customer",
+            age=45,
+            phone_number="9876501001",
+            monthly_salary=300000,
+            approved_limit=10800000,
+            current_debt=0
+        )
+        self.loan = Loan.objects.create(
+            loan_id=8801,
+            customer=customer,
+            loan_amount=5000000,
+            tenure=360,
+            interest_rate=9.5,
+            monthly_repayment=round(calculate_emi(5000000, 9.5, 360), 2),
+            emis_paid_on_time=24,
+            start_date=date(2024, 1, 1),
+            end_date=date(2053, 7, 5)
+        )
+        self.url = reverse('loan_schedule', kwargs={'loan_id': 8801})
+
+    def test_streamed_json_schedule(self):
+        """Test the JSON schedule is streamed one instalment at a time"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 362)
+        data = json.loads(b''.join(chunks))
+
+        self.assertEqual(data['loan_id'], 8801)
+        self.assertEqual(data['customer_id'], 6801)
+        self.assertEqual(data['monthly_installment'], float(self.loan.monthly_repayment))
+        self.assertEqual(data['schedule_installment'], round(calculate_emi(5000000, 9.5, 360), 2))
+        schedule = data['schedule']
+        self.assertEqual(len(schedule), 360)
+        self.assertEqual(schedule[0]['payment'], data['schedule_installment'])
+        self.assertEqual(schedule[0]['due_date'], '2024-01-31')
+        self.assertEqual(schedule[-1]['balance'], 0)
+        self.assertTrue(schedule[23]['paid_on_time'])
+        self.assertFalse(schedule[24]['paid_on_time'])
+
+    def test_csv_schedule_and_etag(self):
+        """Test the CSV format and that a matching If-None-Match is answered with 304"""
+        response = self.client.get(self.url, {'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('loan-8801-schedule.csv', response['Content-Disposition'])
+
+        lines = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(
+            lines[0],
+            ['month', 'due_date', 'payment', 'interest', 'principal', 'balance', 'paid_on_time']
+        )
+        self.assertEqual(len(lines), 361)
+        self.assertEqual(lines[-1][0], '360')
+
+        etag = response['ETag']
+        self.assertNotEqual(etag, self.client.get(self.url)['ETag'])
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url, {'format': 'csv'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+
+    def test_errors(self):
+        """Test unknown loans and formats are rejected"""
+        missing = self.client.get(reverse('loan_schedule', kwargs={'loan_id': 999999}))
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    def test_stored_repayment_is_labelled_apart(self):
+        """Test a stored repayment that differs from calculate_emi does not leak into the rows"""
+        Loan.objects.filter(loan_id=8801).update(monthly_repayment=12345)
+        data = json.loads(b''.join(self.client.get(self.url).streaming_content))
+        self.assertEqual(data['monthly_installment'], 12345.0)
+        self.assertEqual(data['schedule'][0]['payment'], data['schedule_installment'])
+        self.assertNotEqual(data['schedule_installment'], 12345.0)
+
+    def test_zero_tenure_loan(self):
+        """Test a loan without instalments is rejected by the endpoint and skipped by the export"""
+        Loan.objects.create(
+            loan_id=8802,
+            customer_id=6801,
+            loan_amount=1000,
+            tenure=0,
+            interest_rate=10,
+            monthly_repayment=0,
+            emis_paid_on_time=0,
+            start_date=date(2025, 1, 1),
+            end_date=date(2025, 1, 1)
+        )
+        response = self.client.get(reverse('loan_schedule', kwargs={'loan_id': 8802}))
+        self.assertEqual(response.status_code, 400)
+
+        output = StringIO()
+        self.assertEqual(export_schedules(output, customer_id=6801), (1, 360))
+        self.assertNotIn('\n8802,', output.getvalue())
+
+    def test_export_command(self):
+        """Test the export job writes the same rows as the endpoint"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'schedules.csv')
+            out = StringIO()
+            call_command('export_loan_schedules', output=output, batch_size=1, stdout=out)
+            exported = pd.read_csv(output)
+
+        self.assertIn('Exported 360 instalments of 1 loans', out.getvalue())
+        streamed = json.loads(b''.join(self.client.get(self.url).streaming_content))['schedule']
+        self.assertEqual(exported['payment'].tolist(), [row['payment'] for row in streamed])
+        self.assertEqual(exported['balance'].tolist(), [row['balance'] for row in streamed])
+        self.assertEqual(exported['due_date'].tolist(), [row['due_date'] for row in streamed])
@@ -0,0 +1,141 @@
+from django.test import TestCase, TransactionTestCase
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db.models import Count, Max
+from loans.models import Customer, CustomerCreditSummary, IdBlockCounter, Loan
+from loans.synthetic import generate_synthetic_data
+from loans.versions import customer_version
+from loans.benchmarking import compare_results, parse_scale, summarize
+from datetime import date
+from io import StringIO
+import json
+import os
+import tempfile
+
+AS_OF = date(2026, 1, 15)
+
+
+class SyntheticDataTest(TestCase):
+    def test_reproducible_for_a_seed(self):
+        """Test the same seed and date produce identical rows"""
+        generate_synthetic_data(50, 200, seed=7, as_of=AS_OF)
+        first = list(Loan.objects.order_by('loan_id').values())
+        Loan.objects.all().delete()
+        Customer.objects.all().delete()
+
+        generate_synthetic_data(50, 200, seed=7, as_of=AS_OF)
+        self.assertEqual(list(Loan.objects.order_by('loan_id').values()), first)
+
+    def test_rows_are_consistent(self):
+        """Test generated loans follow the rules the application assumes"""
+        customer_ids, loan_ids = generate_synthetic_data(300, 3000, seed=1, as_of=AS_OF)
+
+        self.assertEqual(Customer.objects.count(), 300)
+        self.assertEqual(Loan.objects.count(), 3000)
+        self.assertEqual(list(loan_ids), list(
+            Loan.objects.order_by('loan_id').values_list('loan_id', flat=True)
+        ))
+        for loan in Loan.objects.all()[:200]:
+            self.assertIn(loan.customer_id, customer_ids)
+            self.assertLessEqual(loan.emis_paid_on_time, loan.tenure)
+            self.assertLessEqual(loan.start_date, AS_OF)
+            self.assertGreater(loan.monthly_repayment * loan.tenure, loan.loan_amount)
+
+        # Borrowing is skewed: the heaviest borrower holds several times the mean of 10
+        heaviest = Customer.objects.annotate(count=Count('loans')).aggregate(Max('count'))
+        self.assertGreater(heaviest['count__max'], 30)
+
+    def test_appends_above_existing_ids(self):
+        """Test a second run adds new IDs and can spread loans over existing customers"""
+        generate_synthetic_data(10, 30, seed=1, as_of=AS_OF)
+        customer_ids, loan_ids = generate_synthetic_data(0, 40, seed=2, as_of=AS_OF)
+
+        self.assertEqual(len(customer_ids), 0)
+        self.assertEqual(loan_ids.start, 1001 + 30)
+        self.assertEqual(Loan.objects.count(), 70)
+
+    def test_starts_above_reserved_id_blocks(self):
+        """Test generated IDs skip blocks the ID allocators have already reserved"""
+        IdBlockCounter.objects.create(name='customer_id', next_value=500)
+        IdBlockCounter.objects.create(name='loan_id', next_value=9000)
+
+        customer_ids, loan_ids = generate_synthetic_data(5, 10, seed=1, as_of=AS_OF)
+
+        self.assertEqual(customer_ids.start, 500)
+        self.assertEqual(loan_ids.start, 9000)
+
+    def test_new_loans_bump_existing_customer_versions(self):
+        """Test loans spread over existing customers change their loan list versions"""
+        cache.clear()
+        generate_synthetic_data(3, 0, seed=1, as_of=AS_OF)
+        before = {customer.customer_id: customer_version(customer.customer_id)
+                  for customer in Customer.objects.all()}
+
+        with self.captureOnCommitCallbacks(execute=True):
+            generate_synthetic_data(0, 30, seed=2, as_of=AS_OF)
+
+        owners = set(Loan.objects.values_list('customer_id', flat=True))
+        self.assertTrue(owners)
+        for customer_id in owners:
+            self.assertNotEqual(customer_version(customer_id), before[customer_id])
+
+    def test_command_builds_summaries(self):
+        """Test the command inserts rows and builds credit summaries"""
+        out = StringIO()
+        call_command('generate_synthetic_data', customers=20, loans=60, seed=3, stdout=out)
+
+        self.assertIn('Inserted 20 customers and 60 loans', out.getvalue())
+        self.assertEqual(CustomerCreditSummary.objects.count(), 20)
+
+
+class BenchmarkHelpersTest(TestCase):
+    def test_summarize_percentiles(self):
+        """Test latency percentiles and throughput"""
+        stats = summarize([i / 1000 for i in range(1, 101)], 2, 2.0)
+
+        self.assertEqual(stats['rps'], 50)
+        self.assertAlmostEqual(stats['p50'], 50.5)
+        self.assertAlmostEqual(stats['p95'], 96)
+        self.assertAlmostEqual(stats['p99'], 100)
+        self.assertEqual(stats['errors'], 2)
+
+    def test_parse_scale(self):
+        """Test CUSTOMERSxLOANS parsing"""
+        self.assertEqual(parse_scale('1000x3000'), (1000, 3000))
+        for value in ('1000', 'ax3', '0x10'):
+            with self.assertRaises(ValueError):
+                parse_scale(value)
+
+    def test_compare_matches_scale_endpoint_and_concurrency(self):
+        """Test results are paired with the same benchmark of a baseline"""
+        def result(endpoint, concurrency, p95):
+            return {'scale': {'customers': 10, 'loans': 30}, 'endpoint': endpoint,
+                    'concurrency': concurrency, 'p95_ms': p95}
+
+        pairs = list(compare_results(
+            [result('view_loan', 8, 5.0), result('view_loans', 8, 6.0)],
+            {'results': [result('view_loan', 8, 4.0), result('view_loan', 1, 1.0)]}
+        ))
+        self.assertEqual(len(pairs), 1)
+        self.assertEqual(pairs[0][1]['p95_ms'], 4.0)
+
+
+class BenchmarkSuiteTest(TransactionTestCase):
+    def test_suite_writes_report(self):
+        """Test a tiny suite run against the in-process server writes a JSON report"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'report.json')
+            call_command(
+                'run_benchmarks', scales='20x60', concurrency='2', requests=10,
+                endpoint=['view_loan', 'view_loans', 'check_eligibility'],
+                output=output, stdout=StringIO()
+            )
+            with open(output) as f:
+                report = json.load(f)
+
+        self.assertEqual(len(report['results']), 3)
+        for result in report['results']:
+            self.assertEqual(result['scale'], {'customers': 20, 'loans': 60})
+            self.assertEqual(result['errors'], 0)
+            self.assertGreater(result['rps'], 0)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
@@ -0,0 +1,178 @@
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.urls import reverse
+from django.core.cache import cache
+from django.core.management import call_command
+from loans.models import Customer
+from loans.replay import http_sender, read_traffic_log
+from loans.traffic import sanitize_body
+from unittest import mock
+from io import StringIO
+from pathlib import Path
+import asyncio
+import json
+import tempfile
+
+
+def create_customer(customer_id):
+    return Customer.objects.create(
+        customer_id=customer_id,
+        first_name="Captured",
+        last_name="Customer",
+        age=33,
+        phone_number="9876500901",
+        monthly_salary=80000,
+        approved_limit=2900000,
+        current_debt=0
+    )
+
+
+class TrafficCaptureTest(TestCase):
+    def setUp(self):
+        """Create a customer and point the capture log at a temporary file"""
+        cache.clear()
+        create_customer(6701)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = Path(directory.name) / 'traffic.jsonl'
+        self.settings = override_settings(
+            TRAFFIC_CAPTURE_ENABLED=True,
+            TRAFFIC_CAPTURE_SAMPLE_RATE=1.0,
+            TRAFFIC_CAPTURE_FILE=str(self.log),
+        )
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        # The middleware reads TRAFFIC_CAPTURE_ENABLED when the client's handler loads
+        self.client = Client()
+
+    def post(self, name, payload):
+        return self.client.post(
+            reverse(name), data=json.dumps(payload), content_type='application/json'
+        )
+
+    def test_captures_sanitized_requests(self):
+        """Test captured endpoints are logged with personal details redacted"""
+        self.post('register', {
+            'first_name': 'Asha', 'last_name': 'Verma', 'age': 29, 'monthly_income': 43750,
+            'phone_number': 9812345678, 'password': 'secret'
+        })
+        self.post('check_eligibility', {
+            'customer_id': 6701, 'loan_amount': 90000, 'interest_rate': 13, 'tenure': 12,
+            'note': 'free text'
+        })
+        self.post('check_eligibility_batch', [{'customer_id': 6701}])
+        self.client.get(
+            reverse('view_loans', kwargs={'customer_id': 6701}), {'limit': 5, 'token': 'abc'}
+        )
+        self.client.post(reverse('create_loan'), data='not json', content_type='application/json')
+
+        records = read_traffic_log(self.log)
+        self.assertEqual(
+            [record['view'] for record in records],
+            ['register', 'check_eligibility', 'view_loans', 'create_loan']
+        )
+        register, eligibility, view_loans, create_loan = records
+
+        self.assertEqual(register['body'], {
+            'first_name': 'Replay', 'last_name': 'Customer', 'age': 25,
+            'monthly_income': 44000, 'phone_number': 9000000000
+        })
+        self.assertEqual(register['status'], 201)
+        self.assertNotIn('Asha', self.log.read_text())
+        self.assertNotIn('9812345678', self.log.read_text())
+        self.assertNotIn('43750', self.log.read_text())
+
+        self.assertEqual(eligibility['body'], {
+            'customer_id': 6701, 'loan_amount': 90000, 'interest_rate': 13, 'tenure': 12
+        })
+        self.assertEqual(view_loans['query'], {'limit': '5'})
+        self.assertEqual(view_loans['path'], '/api/view-loans/6701/')
+        self.assertIsNone(view_loans['body'])
+        self.assertIsNone(create_loan['body'])
+        self.assertEqual(create_loan['status'], 400)
+
+    def test_age_and_income_are_coarsened(self):
+        """Test ages fall into 5-year bands on the same side of 18 and incomes keep two digits"""
+        def sanitized(age, income):
+            body = sanitize_body('register', json.dumps({'age': age, 'monthly_income': income}))
+            return body['age'], body['monthly_income']
+
+        self.assertEqual(sanitized(19, 128499), (18, 130000))
+        self.assertEqual(sanitized(16, 999), (15, 1000))
+        self.assertEqual(sanitized(64, 50000.5), (60, 50000))
+        self.assertEqual(sanitized('n/a', 'lots'), ('n/a', 'lots'))
+
+    def test_disabled_by_default(self):
+        """Test the middleware is not installed without TRAFFIC_CAPTURE_ENABLED"""
+        with override_settings(TRAFFIC_CAPTURE_ENABLED=False):
+            Client().get(reverse('view_loans', kwargs={'customer_id': 6701}))
+        self.assertFalse(self.log.exists())
+
+    def test_sample_rate(self):
+        """Test a zero sample rate captures nothing"""
+        with override_settings(TRAFFIC_CAPTURE_SAMPLE_RATE=0.0):
+            self.client.get(reverse('view_loans', kwargs={'customer_id': 6701}))
+        self.assertFalse(self.log.exists())
+
+
+class TrafficReplayTest(TransactionTestCase):
+    def test_replay_reports_latencies_and_mismatches(self):
+        """Test replay keeps the recorded pacing and flags changed status codes"""
+        create_customer(6702)
+        records = [
+            {'time': 1000.0, 'view': 'check_eligibility', 'method': 'POST',
+             'path': '/api/check-eligibility/', 'query': {},
+             'body': {'customer_id': 6702, 'loan_amount': 50000, 'interest_rate': 14,
+                      'tenure': 12},
+             'status': 200},
+            {'time': 1000.2, 'view': 'view_loans', 'method': 'GET',
+             'path': '/api/view-loans/6702/', 'query': {'limit': '10'}, 'body': None,
+             'status': 200},
+            # The loan existed where the traffic was recorded
+            {'time': 1000.4, 'view': 'view_loan', 'method': 'GET',
+             'path': '/api/view-loan/999999/', 'query': {}, 'body': None, 'status': 200},
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            log = Path(directory) / 'traffic.jsonl'
+            output = Path(directory) / 'replay.json'
+            # Out of order, with a torn line, as concurrent writers may leave it
+            log.write_text(
+                '\n'.join(json.dumps(record) for record in reversed(records)) + '\n{"time": 10'
+            )
+            out = StringIO()
+            with self.assertLogs('loans.replay', 'WARNING') as logs:
+                call_command(
+                    'replay_traffic', str(log), speedup=2, concurrency=2, output=str(output),
+                    stdout=out
+                )
+            report = json.loads(output.read_text())
+
+        self.assertIn('Skipping malformed line 4', logs.output[0])
+        self.assertIn('Replaying 3 requests', out.getvalue())
+        self.assertGreaterEqual(report['elapsed_s'], 0.2)
+        endpoints = report['endpoints']
+        self.assertEqual(set(endpoints), {'check_eligibility', 'view_loans', 'view_loan'})
+        for stats in endpoints.values():
+            self.assertEqual(stats['requests'], 1)
+            self.assertEqual(stats['errors'], 0)
+            self.assertGreater(stats['p50_ms'], 0)
+        self.assertEqual(endpoints['check_eligibility']['mismatches'], 0)
+        self.assertEqual(endpoints['view_loans']['mismatches'], 0)
+        self.assertEqual(endpoints['view_loan']['mismatches'], 1)
+        self.assertEqual(endpoints['view_loan']['mismatched_statuses'], ['200->404'])
+
+    def test_http_sender_uses_the_url_scheme_and_port(self):
+        """Test https targets are sent over TLS, to the given port or the scheme's default"""
+        record = {'method': 'GET', 'path': '/api/view-loan/1/', 'query': {}, 'body': None}
+        cases = [
+            ('https://replay.example', 443, True),
+            ('https://replay.example:8443', 8443, True),
+            ('http://replay.example', 80, False),
+            ('http://replay.example:8000', 8000, False),
+        ]
+        for base_url, port, use_tls in cases:
+            with mock.patch('loans.replay.send_request', return_value=(200, 0.1)) as send:
+                self.assertEqual(asyncio.run(http_sender(base_url)(record)), (200, 0.1))
+            send.assert_called_once_with(
+                'replay.example', port, 'GET', '/api/view-loan/1/', b'', use_tls=use_tls
+            )
@@ -1,15 +1,18 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
+from django.core.cache import cache
 from loans.models import Customer, Loan
 from decimal import Decimal
+from unittest import mock
 import json
-from datetime import date
+from datetime import date, timedelta
 
 
 class APITestCase(TestCase):
     def setUp(self):
         """Set up test data"""
         self.client = Client()
+        cache.clear()
 
         # Create test customer
         self.customer = Customer.objects.create(
@@ -208,3 +211,438 @@ class APITestCase(TestCase):
 
         self.assertEqual(response.status_code, 404)
         self.assertIn('error', response.json())
+
+
+class CreditProfileTestCase(TestCase):
+    def setUp(self):
+        """Create a customer with a mixed loan history"""
+        self.client = Client()
+        cache.clear()
+
+        self.customer = Customer.objects.create(
+            customer_id=6001,
+            first_name="History",
+            last_name="Customer",
+            age=40,
+            phone_number="9876500000",
+            monthly_salary=200000,
+            approved_limit=5000000,
+            current_debt=0
+        )
+
+        for i in range(10):
+            Loan.objects.create(
+                loan_id=7001 + i,
+                customer=self.customer,
+                loan_amount=50000 + i * 10000,
+                tenure=12,
+                interest_rate=12,
+                monthly_repayment=1000,
+                emis_paid_on_time=12 if i % 3 else 4,
+                start_date=date(2015 + i, 1, 1),
+                end_date=date(2016 + i, 1, 1)
+            )
+
+    def test_credit_profile_aggregates(self):
+        """Test the aggregated profile matches the loan rows"""
+        from loans.credit import get_credit_profile
+
+        profile = get_credit_profile(self.customer, current_year=2020)
+
+        self.assertEqual(profile.total_loans, 10)
+        self.assertEqual(profile.paid_on_time, 6)
+        self.assertEqual(profile.loans_current_year, 1)
+        self.assertEqual(profile.total_loan_volume, 950000.0)
+        # Every loan has ended
+        self.assertEqual(profile.current_loans_sum, 0.0)
+        self.assertEqual(profile.current_emis_sum, 0.0)
+
+    def test_credit_score_unchanged(self):
+        """Test credit score matches the weighted formula"""
+        from loans.views import calculate_credit_score
+
+        # 6/10 on time -> 24, 10 loans -> 20, no current-year loans -> 0,
+        # 9.5 lakh volume -> 9.5; round(53.5) == 54
+        self.assertEqual(calculate_credit_score(self.customer), 54)
+
+    def test_credit_score_new_customer(self):
+        """Test customers without loans get the base score"""
+        from loans.views import calculate_credit_score
+
+        customer = Customer.objects.create(
+            customer_id=6002,
+            first_name="New",
+            last_name="Customer",
+            age=25,
+            phone_number="9876500001",
+            monthly_salary=30000,
+            approved_limit=1100000,
+            current_debt=0
+        )
+        self.assertEqual(calculate_credit_score(customer), 25)
+
+    def test_check_eligibility_query_count(self):
+        """Test eligibility check issues a fixed number of queries"""
+        data = {
+            'customer_id': 6001,
+            'loan_amount': 100000,
+            'interest_rate': 10,
+            'tenure': 12
+        }
+
+        # Summary lookup miss, customer lookup + one aggregated loan query
+        with self.assertNumQueries(3):
+            response = self.client.post(
+                reverse('check_eligibility'),
+                data=json.dumps(data),
+                content_type='application/json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['approval'])
+
+
+class BatchEligibilityTestCase(TestCase):
+    def setUp(self):
+        """Create customers with different loan histories"""
+        self.client = Client()
+        cache.clear()
+
+        for i in range(5):
+            customer = Customer.objects.create(
+                customer_id=6101 + i,
+                first_name="Batch",
+                last_name=f"Customer{i}",
+                age=30 + i,
+                phone_number=f"98765{i:05d}",
+                monthly_salary=20000 * (i + 1),
+                approved_limit=700000 * (i + 1),
+                current_debt=0
+            )
+            for j in range(i * 2):
+                Loan.objects.create(
+                    loan_id=7101 + i * 10 + j,
+                    customer=customer,
+                    loan_amount=60000 * (j + 1),
+                    tenure=12,
+                    interest_rate=10,
+                    monthly_repayment=1500 * (j + 1),
+                    emis_paid_on_time=12 if j % 2 else 3,
+                    start_date=date(2018 + j, 1, 1),
+                    end_date=date(2019 + j, 1, 1)
+                )
+
+        # Customers 6101 and 6102 are served from the summary table
+        from loans.credit import rebuild_credit_summaries
+        rebuild_credit_summaries([6101, 6102])
+
+    def test_batch_matches_single_endpoint(self):
+        """Test every batch result equals the single endpoint response"""
+        applications = [
+            {'customer_id': 6101 + i, 'loan_amount': amount, 'interest_rate': rate, 'tenure': tenure}
+            for i in range(5)
+            for amount, rate, tenure in [(50000, 8, 12), (400000, 14, 36), (90000, 0, 6)]
+        ]
+
+        response = self.client.post(
+            reverse('check_eligibility_batch'),
+            data=json.dumps(applications),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        self.assertEqual(len(results), len(applications))
+
+        cache.clear()
+        for application, result in zip(applications, results):
+            single = self.client.post(
+                reverse('check_eligibility'),
+                data=json.dumps(application),
+                content_type='application/json'
+            )
+            self.assertEqual(result, single.json())
+
+    def test_batch_query_count_is_constant(self):
+        """Test the batch loads all customers in a fixed number of queries"""
+        applications = [
+            {'customer_id': 6101 + i % 5, 'loan_amount': 10000, 'interest_rate': 12, 'tenure': 12}
+            for i in range(100)
+        ]
+
+        # Summary rows, remaining customers, grouped loan aggregates
+        with self.assertNumQueries(3):
+            response = self.client.post(
+                reverse('check_eligibility_batch'),
+                data=json.dumps(applications),
+                content_type='application/json'
+            )
+        self.assertEqual(len(response.json()), 100)
+
+    def test_batch_per_item_errors(self):
+        """Test invalid items and unknown customers fail individually"""
+        applications = [
+            {'customer_id': 6101, 'loan_amount': 10000, 'interest_rate': 12, 'tenure': 12},
+            {'customer_id': 6101, 'loan_amount': -5, 'interest_rate': 12, 'tenure': 12},
+            {'customer_id': 99999, 'loan_amount': 10000, 'interest_rate': 12, 'tenure': 12},
+            'not an application',
+        ]
+
+        response = self.client.post(
+            reverse('check_eligibility_batch'),
+            data=json.dumps(applications),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+
+        self.assertIn('approval', results[0])
+        self.assertEqual(results[1], {'error': 'loan_amount must be positive', 'status': 400})
+        self.assertEqual(results[2], {'error': 'Customer not found', 'status': 404})
+        self.assertEqual(results[3], {'error': 'Invalid application format', 'status': 400})
+
+    def test_batch_requires_list(self):
+        """Test the batch endpoint rejects non-list bodies"""
+        response = self.client.post(
+            reverse('check_eligibility_batch'),
+            data=json.dumps({'customer_id': 6101}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class ViewLoansPaginationTestCase(TestCase):
+    def setUp(self):
+        """Create a customer with many current loans sharing start dates"""
+        self.client = Client()
+        cache.clear()
+        self.customer = Customer.objects.create(
+            customer_id=6201,
+            first_name="Corporate",
+            last_name="Borrower",
+            age=45,
+            phone_number="9876500001",
+            monthly_salary=900000,
+            approved_limit=32400000,
+            current_debt=0
+        )
+        today = date.today()
+        Loan.objects.bulk_create([
+            Loan(
+                loan_id=8001 + i,
+                customer=self.customer,
+                loan_amount=10000 + i,
+                tenure=24,
+                interest_rate=11,
+                monthly_repayment=500,
+                emis_paid_on_time=i % 24,
+                start_date=today - timedelta(days=i // 3),
+                end_date=today + timedelta(days=365)
+            )
+            for i in range(25)
+        ])
+        self.url = reverse('view_loans', kwargs={'customer_id': 6201})
+
+    def test_default_response_unchanged(self):
+        """Test the unpaginated response is still a plain list"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.json(), list)
+        self.assertEqual(len(response.json()), 25)
+
+    def test_keyset_pages_cover_every_loan_once(self):
+        """Test following next_cursor returns every loan once, newest first"""
+        loan_ids = []
+        cursor = None
+        pages = 0
+        while True:
+            params = {'limit': 10}
+            if cursor:
+                params['cursor'] = cursor
+            body = self.client.get(self.url, params).json()
+            loan_ids.extend(loan['loan_id'] for loan in body['loans'])
+            pages += 1
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(loan_ids, [loan['loan_id'] for loan in self.client.get(self.url).json()])
+        self.assertEqual(sorted(loan_ids), list(range(8001, 8026)))
+
+    def test_streamed_response(self):
+        """Test streaming mode writes the same list incrementally"""
+        response = self.client.get(self.url, {'stream': 'true'})
+
+        self.assertTrue(response.streaming)
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed, self.client.get(self.url).json())
+
+    def test_invalid_pagination_parameters(self):
+        """Test malformed cursors and out-of-range limits are rejected"""
+        for params in ({'limit': 0}, {'limit': 'ten'}, {'cursor': 'not-a-cursor'},
+                       {'limit': 5, 'stream': 'true'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+class ConditionalGetTestCase(TestCase):
+    def setUp(self):
+        """Create a customer with one current loan"""
+        self.client = Client()
+        cache.clear()
+        self.customer = Customer.objects.create(
+            customer_id=6301,
+            first_name="Dashboard",
+            last_name="Poller",
+            age=38,
+            phone_number="9876500401",
+            monthly_salary=150000,
+            approved_limit=5400000,
+            current_debt=0
+        )
+        today = date.today()
+        Loan.objects.create(
+            loan_id=8301,
+            customer=self.customer,
+            loan_amount=120000,
+            tenure=12,
+            interest_rate=10,
+            monthly_repayment=10550,
+            emis_paid_on_time=12,
+            start_date=today - timedelta(days=90),
+            end_date=today + timedelta(days=270)
+        )
+        self.loans_url = reverse('view_loans', kwargs={'customer_id': 6301})
+        self.loan_url = reverse('view_loan', kwargs={'loan_id': 8301})
+
+    def test_matching_etag_returns_304_without_queries(self):
+        """Test If-None-Match with the current ETag is answered without touching the database"""
+        for url in (self.loans_url, self.loan_url):
+            response = self.client.get(url)
+            etag = response['ETag']
+
+            with self.assertNumQueries(0):
+                revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(revalidated.status_code, 304)
+            self.assertEqual(revalidated['ETag'], etag)
+            self.assertEqual(revalidated.content, b'')
+
+    def test_response_cache_serves_unconditional_requests(self):
+        """Test a repeat request without If-None-Match is served from the response cache"""
+        first = self.client.get(self.loans_url, {'limit': 5})
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.loans_url, {'limit': 5})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        # Each page and format is a separate representation
+        self.assertNotEqual(self.client.get(self.loans_url)['ETag'], first['ETag'])
+
+    def test_create_loan_changes_etag(self):
+        """Test a new loan invalidates the view-loans ETag but not the other loans' ETags"""
+        before = self.client.get(self.loans_url)
+        loan_before = self.client.get(self.loan_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            created = self.client.post(
+                reverse('create_loan'),
+                data=json.dumps({
+                    'customer_id': 6301, 'loan_amount': 50000, 'interest_rate': 14, 'tenure': 12
+                }),
+                content_type='application/json'
+            )
+        self.assertEqual(created.status_code, 201)
+
+        after = self.client.get(self.loans_url, HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        self.assertEqual(len(after.json()), len(before.json()) + 1)
+
+        loan_after = self.client.get(self.loan_url, HTTP_IF_NONE_MATCH=loan_before['ETag'])
+        self.assertEqual(loan_after.status_code, 304)
+
+    def test_ingest_bump_changes_loan_etag(self):
+        """Test bumping a customer's versions, as ingestion does, re-reads their loans"""
+        from loans.versions import bump_customer_versions
+
+        before = self.client.get(self.loan_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Customer.objects.filter(customer_id=6301).update(first_name="Renamed")
+            bump_customer_versions([6301])
+
+        after = self.client.get(self.loan_url, HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.json()['customer']['first_name'], "Renamed")
+
+    def test_errors_are_not_tagged_or_cached(self):
+        """Test missing resources get no ETag and are looked up again"""
+        missing = self.client.get(reverse('view_loan', kwargs={'loan_id': 8399}))
+        self.assertEqual(missing.status_code, 404)
+        self.assertFalse(missing.has_header('ETag'))
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse('view_loans', kwargs={'customer_id': 6399}))
+
+    def test_version_stamps_expire(self):
+        """Test stamps and remembered loan owners are written with LOAN_VERSION_TTL"""
+        with override_settings(LOAN_VERSION_TTL=60), \
+                mock.patch.object(cache, 'add', wraps=cache.add) as add, \
+                mock.patch.object(cache, 'set', wraps=cache.set) as set_:
+            self.client.get(reverse('view_loans', kwargs={'customer_id': 6399}))
+            self.client.get(self.loan_url)
+        self.assertEqual(add.call_count, 3)
+        self.assertEqual({call.kwargs['timeout'] for call in add.call_args_list}, {60})
+        owner = [call for call in set_.call_args_list if 'loan_owner' in call.args[0]]
+        self.assertEqual(owner[0].kwargs['timeout'], 60)
+
+    def test_missing_loan_starts_no_stamps(self):
+        """Test a loan that does not exist leaves no version keys behind"""
+        with mock.patch.object(cache, 'add', wraps=cache.add) as add:
+            self.client.get(reverse('view_loan', kwargs={'loan_id': 8398}))
+        self.assertEqual(add.call_count, 0)
+
+    def test_ingest_bumps_one_key_per_customer(self):
+        """Test bumping a customer with many loans sets two keys and reads no loans"""
+        from loans.versions import bump_customer_versions
+
+        Loan.objects.bulk_create([
+            Loan(
+                loan_id=8310 + i, customer=self.customer, loan_amount=1000, tenure=12,
+                interest_rate=10, monthly_repayment=90, emis_paid_on_time=0,
+                start_date=date.today(), end_date=date.today() + timedelta(days=360)
+            )
+            for i in range(50)
+        ])
+        with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many, \
+                self.assertNumQueries(0), self.captureOnCommitCallbacks(execute=True):
+            bump_customer_versions([6301])
+        self.assertEqual(len(set_many.call_args.args[0]), 2)
+
+    def test_moved_loan_is_reread(self):
+        """Test a loan moved to another customer by ingestion gets a new ETag"""
+        from loans.versions import bump_customer_versions
+
+        other = Customer.objects.create(
+            customer_id=6302, first_name="New", last_name="Owner", age=40,
+            phone_number="9876500402", monthly_salary=90000, approved_limit=3200000,
+            current_debt=0
+        )
+        before = self.client.get(self.loan_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Loan.objects.filter(loan_id=8301).update(customer=other)
+            bump_customer_versions([6301, 6302])
+
+        moved = self.client.get(self.loan_url, HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(moved.status_code, 200)
+        self.assertEqual(moved.json()['customer']['id'], 6302)
+
+        # The new owner's changes now reach the loan's ETag
+        current = self.client.get(self.loan_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Customer.objects.filter(customer_id=6302).update(first_name="Renamed")
+            bump_customer_versions([6302])
+        after = self.client.get(self.loan_url, HTTP_IF_NONE_MATCH=current['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.json()['customer']['first_name'], "Renamed")
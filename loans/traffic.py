@@ -0,0 +1,187 @@
+import json
+import logging
+import random
+import threading
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+# URL names of the endpoints whose traffic is captured
+CAPTURED_VIEWS = ('register', 'check_eligibility', 'create_loan', 'view_loan', 'view_loans')
+
+# Request body fields kept per endpoint; anything else is dropped
+BODY_FIELDS = {
+    'register': ('first_name', 'last_name', 'age', 'monthly_income', 'phone_number'),
+    'check_eligibility': ('customer_id', 'loan_amount', 'interest_rate', 'tenure'),
+    'create_loan': ('customer_id', 'loan_amount', 'interest_rate', 'tenure'),
+}
+
+# Personal fields replaced by valid placeholders, so replayed requests
+# still pass validation
+REDACTED_FIELDS = {
+    'first_name': 'Replay',
+    'last_name': 'Customer',
+    'phone_number': 9000000000,
+}
+
+# Youngest age register accepts; age bands never cross it
+MINIMUM_AGE = 18
+
+# Width in years of the bands ages are coarsened to
+AGE_BAND_YEARS = 5
+
+# Significant digits kept of a monthly income
+INCOME_SIGNIFICANT_DIGITS = 2
+
+
+def _age_band(age):
+    """Round an age down to its AGE_BAND_YEARS band, without crossing MINIMUM_AGE"""
+    band = age // AGE_BAND_YEARS * AGE_BAND_YEARS
+    return max(band, MINIMUM_AGE) if age >= MINIMUM_AGE else band
+
+
+def _income_band(income):
+    """Round an income to INCOME_SIGNIFICANT_DIGITS significant digits"""
+    return int(float(f'{income:.{INCOME_SIGNIFICANT_DIGITS}g}'))
+
+
+# Personal numbers coarsened rather than replaced, so replayed registrations
+# keep a realistic spread of approved limits; other values (e.g. invalid
+# strings) are kept so the request fails the same way
+BUCKETED_FIELDS = {
+    'age': _age_band,
+    'monthly_income': _income_band,
+}
+
+# Query parameters kept per endpoint
+QUERY_FIELDS = {
+    'view_loans': ('limit', 'cursor', 'stream'),
+}
+
+# Serializes appends from the threads of one process
+_write_lock = threading.Lock()
+
+
+def sanitize_body(view, body):
+    """
+    The replayable part of a request body: the known fields of the
+    endpoint with names and phone numbers replaced and age and income
+    coarsened. None when the body is not a JSON object (it is replayed
+    empty).
+    """
+    if view not in BODY_FIELDS:
+        return None
+    try:
+        data = json.loads(body)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    return {
+        field: _sanitize_value(field, data[field])
+        for field in BODY_FIELDS[view] if field in data
+    }
+
+
+def _sanitize_value(field, value):
+    if field in REDACTED_FIELDS:
+        return REDACTED_FIELDS[field]
+    if field in BUCKETED_FIELDS and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return BUCKETED_FIELDS[field](value)
+    return value
+
+
+def sanitize_query(view, query):
+    return {field: query[field] for field in QUERY_FIELDS.get(view, ()) if field in query}
+
+
+def write_record(record):
+    """Append one record to TRAFFIC_CAPTURE_FILE as a JSON line"""
+    path = Path(settings.TRAFFIC_CAPTURE_FILE)
+    line = json.dumps(record, separators=(',', ':')) + '\n'
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Single O_APPEND writes keep lines whole across worker processes
+        with _write_lock, open(path, 'a') as f:
+            f.write(line)
+    except OSError as e:
+        logger.warning(f"Could not write traffic record to {path}: {str(e)}")
+
+
+class TrafficCaptureMiddleware:
+    """
+    Record a sample of the requests to CAPTURED_VIEWS, with sanitized
+    bodies, as JSON lines in TRAFFIC_CAPTURE_FILE for replay_traffic.
+    Each request is kept with probability TRAFFIC_CAPTURE_SAMPLE_RATE.
+    Removed from the stack at startup unless TRAFFIC_CAPTURE_ENABLED.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.TRAFFIC_CAPTURE_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def sampled_view(self, request):
+        """URL name of a request chosen for capture, or None"""
+        if random.random() >= settings.TRAFFIC_CAPTURE_SAMPLE_RATE:
+            return None
+        try:
+            view = resolve(request.path_info).url_name
+        except Resolver404:
+            return None
+        return view if view in CAPTURED_VIEWS else None
+
+    def start(self, request):
+        """The record of a sampled request, before its response, or None"""
+        view = self.sampled_view(request)
+        if view is None:
+            return None
+        # Read before the view, which may consume the body stream
+        return {
+            'time': time.time(),
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'query': sanitize_query(view, request.GET),
+            'body': sanitize_body(view, request.body),
+        }
+
+    def finish(self, record, response, started):
+        record['status'] = response.status_code
+        record['duration_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        write_record(record)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        record = self.start(request)
+        if record is None:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.finish(record, response, started)
+        return response
+
+    async def __acall__(self, request):
+        record = self.start(request)
+        if record is None:
+            return await self.get_response(request)
+
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.finish(record, response, started)
+        return response
@@ -1,10 +1,19 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path('register/', views.register, name='register'),
     path('check-eligibility/', views.check_eligibility, name='check_eligibility'),
+    path('check-eligibility-batch/', views.check_eligibility_batch, name='check_eligibility_batch'),
     path('create-loan/', views.create_loan, name='create_loan'),
     path('view-loan/<int:loan_id>/', views.view_loan, name='view_loan'),
     path('view-loans/<int:customer_id>/', views.view_loans, name='view_loans'),
+    path('loan-schedule/<int:loan_id>/', views.loan_schedule, name='loan_schedule'),
+
+    # Async read endpoints, for ASGI deployments
+    path('async/check-eligibility/', async_views.check_eligibility,
+         name='async_check_eligibility'),
+    path('async/view-loan/<int:loan_id>/', async_views.view_loan, name='async_view_loan'),
+    path('async/view-loans/<int:customer_id>/', async_views.view_loans,
+         name='async_view_loans'),
 ]
@@ -0,0 +1,205 @@
+import hashlib
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_PREFIX = 'version'
+
+RESPONSE_CACHE_PREFIX = 'loan_response'
+
+
+def _customer_key(customer_id):
+    return f"{VERSION_CACHE_PREFIX}:customer:{customer_id}"
+
+
+def _customer_loans_key(customer_id):
+    return f"{VERSION_CACHE_PREFIX}:customer_loans:{customer_id}"
+
+
+def _loan_key(loan_id):
+    return f"{VERSION_CACHE_PREFIX}:loan:{loan_id}"
+
+
+def _loan_owner_key(loan_id):
+    return f"{VERSION_CACHE_PREFIX}:loan_owner:{loan_id}"
+
+
+def _new_stamp():
+    return uuid.uuid4().hex
+
+
+def _get_stamp(key):
+    """
+    Return the version stamp stored under key, starting a new one when it
+    is missing (never set, expired or evicted). A fresh stamp only changes
+    ETags, so losing stamps costs clients a full response, never a stale
+    one. Stamps expire after LOAN_VERSION_TTL, so IDs requested once (or
+    that do not exist) do not leave keys behind.
+    """
+    try:
+        stamp = cache.get(key)
+        if stamp is None:
+            cache.add(key, _new_stamp(), timeout=settings.LOAN_VERSION_TTL)
+            stamp = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Version cache unavailable: {str(e)}")
+        stamp = None
+
+    # Without a cache, never let two responses share a version
+    return stamp or _new_stamp()
+
+
+async def _aget_stamp(key):
+    """Async _get_stamp"""
+    try:
+        stamp = await cache.aget(key)
+        if stamp is None:
+            await cache.aadd(key, _new_stamp(), timeout=settings.LOAN_VERSION_TTL)
+            stamp = await cache.aget(key)
+    except Exception as e:
+        logger.warning(f"Version cache unavailable: {str(e)}")
+        stamp = None
+
+    return stamp or _new_stamp()
+
+
+def customer_version(customer_id):
+    """Version stamp of the customer's loan list"""
+    return _get_stamp(_customer_key(customer_id))
+
+
+def _loan_owner(loan_id):
+    """The owner remembered for a loan by remember_loan_owner, or None"""
+    try:
+        return cache.get(_loan_owner_key(loan_id))
+    except Exception as e:
+        logger.warning(f"Version cache unavailable: {str(e)}")
+        return None
+
+
+async def _aloan_owner(loan_id):
+    """Async _loan_owner"""
+    try:
+        return await cache.aget(_loan_owner_key(loan_id))
+    except Exception as e:
+        logger.warning(f"Version cache unavailable: {str(e)}")
+        return None
+
+
+def remember_loan_owner(loan_id, customer_id):
+    """
+    Remember the customer owning a loan just read, so that loan_version
+    can be computed before the loan is read again.
+    """
+    try:
+        cache.set(_loan_owner_key(loan_id), customer_id, timeout=settings.LOAN_VERSION_TTL)
+    except Exception as e:
+        logger.warning(f"Could not remember loan owner: {str(e)}")
+
+
+async def aremember_loan_owner(loan_id, customer_id):
+    """Async remember_loan_owner"""
+    try:
+        await cache.aset(_loan_owner_key(loan_id), customer_id, timeout=settings.LOAN_VERSION_TTL)
+    except Exception as e:
+        logger.warning(f"Could not remember loan owner: {str(e)}")
+
+
+def loan_version(loan_id, customer_id=None):
+    """
+    Version of one loan and the customer details shown with it: the
+    loan's own stamp joined with its owner's stamp, so ingestion bumps
+    one stamp per customer rather than one per loan. The owner is
+    customer_id when given, otherwise the one remembered by
+    remember_loan_owner; None when it is not known, in which case the
+    loan must be read first.
+    """
+    if customer_id is None:
+        customer_id = _loan_owner(loan_id)
+        if customer_id is None:
+            return None
+    return f"{_get_stamp(_loan_key(loan_id))}.{_get_stamp(_customer_loans_key(customer_id))}"
+
+
+async def acustomer_version(customer_id):
+    """Async customer_version"""
+    return await _aget_stamp(_customer_key(customer_id))
+
+
+async def aloan_version(loan_id, customer_id=None):
+    """Async loan_version"""
+    if customer_id is None:
+        customer_id = await _aloan_owner(loan_id)
+        if customer_id is None:
+            return None
+    loan_stamp = await _aget_stamp(_loan_key(loan_id))
+    return f"{loan_stamp}.{await _aget_stamp(_customer_loans_key(customer_id))}"
+
+
+def _bump_on_commit(keys):
+    """Give keys new stamps once the current transaction commits"""
+    def bump():
+        try:
+            cache.set_many(
+                {key: _new_stamp() for key in keys()}, timeout=settings.LOAN_VERSION_TTL
+            )
+        except Exception as e:
+            logger.error(f"Could not bump loan versions: {str(e)}")
+
+    transaction.on_commit(bump)
+
+
+def bump_customer_versions(customer_ids):
+    """
+    Give the given customers' loan lists, and the loans they own, new
+    versions once the current transaction commits (immediately outside a
+    transaction), so the loans are re-read after the change is visible.
+    Loan versions include their owner's stamp, so one key per customer is
+    bumped whatever the number of loans. For changes to existing loans
+    and customers (ingestion, rebuilds); include the previous owners of
+    loans that moved. A new loan only needs bump_new_loan_versions.
+    """
+    customer_ids = sorted(set(customer_ids))
+    if not customer_ids:
+        return
+
+    _bump_on_commit(lambda: [
+        key for customer_id in customer_ids
+        for key in (_customer_key(customer_id), _customer_loans_key(customer_id))
+    ])
+
+
+def bump_new_loan_versions(customer_id, loan_id):
+    """
+    New version stamps for a customer's loan list and a loan just added to
+    it, once the current transaction commits. The customer's other loans
+    are unchanged, so their stamps are kept.
+    """
+    _bump_on_commit(lambda: [_customer_key(customer_id), _loan_key(loan_id)])
+
+
+def bump_customer_list_versions(customer_ids):
+    """
+    New version stamps for the loan lists of the given customers once the
+    current transaction commits, for loans added to them in bulk. Their
+    existing loans are unchanged, so those stamps are kept.
+    """
+    customer_ids = sorted(set(customer_ids))
+    if customer_ids:
+        _bump_on_commit(lambda: [_customer_key(customer_id) for customer_id in customer_ids])
+
+
+def make_etag(*parts):
+    """Quoted strong ETag identifying one representation of a resource"""
+    raw = '|'.join(str(part) for part in parts).encode()
+    return f'"{hashlib.blake2b(raw, digest_size=16).hexdigest()}"'
+
+
+def response_cache_key(etag):
+    """Key of the cached response body for an ETag from make_etag"""
+    return f"{RESPONSE_CACHE_PREFIX}:{etag[1:-1]}"
@@ -1,13 +1,43 @@
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from .models import Customer, Loan
+from django.db.models import Q
+from .models import Customer, CustomerCreditSummary, Loan
+from .credit import (
+    get_credit_profile, load_customer_profile, load_customer_profiles, locked_customer_profile,
+    record_new_loan, to_cents
+)
+from .emi import calculate_emi, calculate_emi_many
+from .ids import create_with_id, customer_ids, loan_ids
+from .metrics import record_loan_decision, record_response_cache, render_metrics
+from .schedules import SCHEDULE_COLUMNS, iter_schedule, schedule_installment
+from .versions import (
+    bump_new_loan_versions, customer_version, loan_version, make_etag, remember_loan_owner,
+    response_cache_key
+)
+from datetime import date
+import base64
+import binascii
+import csv
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on applications accepted by check_eligibility_batch
+MAX_BATCH_APPLICATIONS = 1000
+
+# Page sizes of the keyset-paginated view_loans
+DEFAULT_LOANS_PAGE_SIZE = 100
+MAX_LOANS_PAGE_SIZE = 1000
+
+# Rows fetched per round trip when view_loans streams its response
+LOANS_STREAM_CHUNK_SIZE = 2000
+
 # Create your views here.
 
 @csrf_exempt
@@ -58,23 +88,24 @@ def register(request):
         # Round to nearest lakh (100,000)
         approved_limit = round(approved_limit / 100000) * 100000
 
-        # Generate customer_id (simple auto-increment for demo)
-        # In production, you'd use database sequences or UUIDs
-        last_customer = Customer.objects.order_by('-customer_id').first()
-        customer_id = (last_customer.customer_id + 1) if last_customer else 1
-
-        # Create customer record
-        customer = Customer.objects.create(
-            customer_id=customer_id,
-            first_name=first_name,
-            last_name=last_name,
-            age=age,
-            phone_number=str(phone_number),
-            monthly_salary=monthly_income,  # Store as monthly_salary in DB
-            monthly_income=monthly_income,
-            approved_limit=approved_limit,
-            current_debt=0  # Default value
-        )
+        # Create customer record with an empty credit summary, under an
+        # ID from the process-local block allocator
+        def create_customer(customer_id):
+            customer = Customer.objects.create(
+                customer_id=customer_id,
+                first_name=first_name,
+                last_name=last_name,
+                age=age,
+                phone_number=str(phone_number),
+                monthly_salary=monthly_income,  # Store as monthly_salary in DB
+                monthly_income=monthly_income,
+                approved_limit=approved_limit,
+                current_debt=0  # Default value
+            )
+            CustomerCreditSummary.objects.create(customer=customer)
+            return customer
+
+        customer = create_with_id(customer_ids, create_customer)
 
         logger.info(f"Created customer: {customer}")
 
@@ -97,6 +128,85 @@ def register(request):
         return JsonResponse({'error': 'Internal server error'}, status=500)
 
 
+def validate_loan_request(data):
+    """
+    Validate the loan application fields of an eligibility request.
+    Returns ((customer_id, loan_amount, interest_rate, tenure), None) on
+    success or (None, error_message) on failure.
+    """
+    # Extract required fields
+    customer_id = data.get('customer_id')
+    loan_amount = data.get('loan_amount')
+    interest_rate = data.get('interest_rate')
+    tenure = data.get('tenure')
+
+    # Validate required fields
+    if customer_id is None:
+        return None, 'customer_id is required'
+    if loan_amount is None:
+        return None, 'loan_amount is required'
+    if interest_rate is None:
+        return None, 'interest_rate is required'
+    if tenure is None:
+        return None, 'tenure is required'
+
+    # Validate data types and ranges
+    try:
+        customer_id = int(customer_id)
+        loan_amount = float(loan_amount)
+        interest_rate = float(interest_rate)
+        tenure = int(tenure)
+    except (ValueError, TypeError):
+        return None, 'Invalid data types'
+
+    if loan_amount <= 0:
+        return None, 'loan_amount must be positive'
+    if interest_rate < 0:
+        return None, 'interest_rate cannot be negative'
+    if tenure <= 0:
+        return None, 'tenure must be positive'
+
+    return (customer_id, loan_amount, interest_rate, tenure), None
+
+
+def evaluate_eligibility(customer, profile, loan_amount, interest_rate, tenure,
+                         monthly_installment=None):
+    """
+    Evaluate a loan application against a customer's credit profile.
+    Returns the check-eligibility response data.
+    A monthly_installment already computed for the application may be passed.
+    """
+    # Calculate credit score
+    credit_score = calculate_credit_score(customer, profile)
+
+    # Check if sum of current loans exceeds approved limit
+    if profile.current_loans_sum > float(customer.approved_limit):
+        credit_score = 0
+
+    # Calculate monthly EMI
+    if monthly_installment is None:
+        monthly_installment = calculate_emi(loan_amount, interest_rate, tenure)
+
+    # Check EMI constraint (sum of current EMIs > 50% of monthly salary)
+    if profile.current_emis_sum + monthly_installment > 0.5 * float(customer.monthly_salary):
+        approval = False
+        corrected_interest_rate = None
+    else:
+        # Apply approval rules based on credit score
+        approval, corrected_interest_rate = apply_approval_rules(
+            credit_score, interest_rate, loan_amount
+        )
+
+    return {
+        'customer_id': customer.customer_id,
+        'approval': approval,
+        'interest_rate': interest_rate,
+        'corrected_interest_rate': corrected_interest_rate,
+        'tenure': tenure,
+        'monthly_installment': round(monthly_installment, 2)
+    }
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def check_eligibility(request):
@@ -107,108 +217,119 @@ def check_eligibility(request):
         # Parse request body
         data = json.loads(request.body)
 
-        # Extract required fields
-        customer_id = data.get('customer_id')
-        loan_amount = data.get('loan_amount')
-        interest_rate = data.get('interest_rate')
-        tenure = data.get('tenure')
+        # Validate required fields, data types and ranges
+        values, error = validate_loan_request(data)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        customer_id, loan_amount, interest_rate, tenure = values
 
-        # Validate required fields
-        if customer_id is None:
-            return JsonResponse({'error': 'customer_id is required'}, status=400)
-        if loan_amount is None:
-            return JsonResponse({'error': 'loan_amount is required'}, status=400)
-        if interest_rate is None:
-            return JsonResponse({'error': 'interest_rate is required'}, status=400)
-        if tenure is None:
-            return JsonResponse({'error': 'tenure is required'}, status=400)
-
-        # Validate data types and ranges
-        try:
-            customer_id = int(customer_id)
-            loan_amount = float(loan_amount)
-            interest_rate = float(interest_rate)
-            tenure = int(tenure)
-        except (ValueError, TypeError):
-            return JsonResponse({'error': 'Invalid data types'}, status=400)
-
-        if loan_amount <= 0:
-            return JsonResponse({'error': 'loan_amount must be positive'}, status=400)
-        if interest_rate < 0:
-            return JsonResponse({'error': 'interest_rate cannot be negative'}, status=400)
-        if tenure <= 0:
-            return JsonResponse({'error': 'tenure must be positive'}, status=400)
-
-        # Get customer from database
+        # Get customer and its loan history summary from database
         try:
-            customer = Customer.objects.get(customer_id=customer_id)
+            customer, profile = load_customer_profile(customer_id)
         except Customer.DoesNotExist:
             return JsonResponse({'error': 'Customer not found'}, status=404)
 
-        # Calculate credit score
-        credit_score = calculate_credit_score(customer)
+        response_data = evaluate_eligibility(
+            customer, profile, loan_amount, interest_rate, tenure
+        )
 
-        # Check if sum of current loans exceeds approved limit
-        current_loans_sum = sum(float(loan.loan_amount) for loan in customer.loans.all())
-        if current_loans_sum > float(customer.approved_limit):
-            credit_score = 0
+        return JsonResponse(response_data, status=200)
 
-        # Calculate monthly EMI
-        monthly_installment = calculate_emi(loan_amount, interest_rate, tenure)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except Exception as e:
+        logger.error(f"Error in check_eligibility endpoint: {str(e)}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
 
-        # Check EMI constraint (sum of current EMIs > 50% of monthly salary)
-        current_emis_sum = sum(float(loan.monthly_repayment) for loan in customer.loans.all())
-        if current_emis_sum + monthly_installment > 0.5 * float(customer.monthly_salary):
-            approval = False
-            corrected_interest_rate = None
-        else:
-            # Apply approval rules based on credit score
-            approval, corrected_interest_rate = apply_approval_rules(
-                credit_score, interest_rate, loan_amount
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def check_eligibility_batch(request):
+    """
+    Check loan eligibility for a list of applications in one request.
+    Each item is evaluated exactly like check_eligibility; results are
+    returned in request order, with per-item errors.
+    """
+    try:
+        # Parse request body
+        data = json.loads(request.body)
+
+        if not isinstance(data, list):
+            return JsonResponse({'error': 'Request body must be a list of applications'}, status=400)
+        if len(data) > MAX_BATCH_APPLICATIONS:
+            return JsonResponse(
+                {'error': f'At most {MAX_BATCH_APPLICATIONS} applications per batch'},
+                status=400
             )
 
-        # Prepare response
-        response_data = {
-            'customer_id': customer_id,
-            'approval': approval,
-            'interest_rate': interest_rate,
-            'corrected_interest_rate': corrected_interest_rate,
-            'tenure': tenure,
-            'monthly_installment': round(monthly_installment, 2)
-        }
+        # Validate every application before touching the database
+        applications = []
+        for item in data:
+            if not isinstance(item, dict):
+                applications.append((None, 'Invalid application format'))
+            else:
+                applications.append(validate_loan_request(item))
+
+        # Load all referenced customers and their profiles at once
+        profiles = load_customer_profiles(
+            values[0] for values, error in applications if values
+        )
 
-        return JsonResponse(response_data, status=200)
+        # EMIs of all valid applications at once
+        valid = [values for values, error in applications if values]
+        installments = iter(calculate_emi_many(
+            [values[1] for values in valid],
+            [values[2] for values in valid],
+            [values[3] for values in valid]
+        ).tolist())
+
+        results = []
+        for values, error in applications:
+            monthly_installment = next(installments) if values else None
+            if error:
+                results.append({'error': error, 'status': 400})
+                continue
+
+            customer_id, loan_amount, interest_rate, tenure = values
+            if customer_id not in profiles:
+                results.append({'error': 'Customer not found', 'status': 404})
+                continue
+
+            customer, profile = profiles[customer_id]
+            results.append(evaluate_eligibility(
+                customer, profile, loan_amount, interest_rate, tenure, monthly_installment
+            ))
+
+        return JsonResponse(results, safe=False, status=200)
 
     except json.JSONDecodeError:
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
     except Exception as e:
-        logger.error(f"Error in check_eligibility endpoint: {str(e)}")
+        logger.error(f"Error in check_eligibility_batch endpoint: {str(e)}")
         return JsonResponse({'error': 'Internal server error'}, status=500)
 
 
-def calculate_credit_score(customer):
+def calculate_credit_score(customer, profile=None):
     """
     Calculate credit score based on historical loan data.
     Returns a score between 0-100.
+    A precomputed CreditProfile may be passed to avoid querying the loans again.
     """
-    loans = customer.loans.all()
+    if profile is None:
+        profile = get_credit_profile(customer)
 
-    if not loans.exists():
+    if profile.total_loans == 0:
         # New customer with no loan history
         return 25  # Base score for new customers
 
-    total_loans = loans.count()
-    paid_on_time = sum(1 for loan in loans if loan.emis_paid_on_time == loan.tenure)
-    paid_on_time_ratio = paid_on_time / total_loans if total_loans > 0 else 0
+    total_loans = profile.total_loans
+    paid_on_time_ratio = profile.paid_on_time / total_loans
 
     # Current year activity (simplified - using loans from recent period)
-    from datetime import datetime
-    current_year = datetime.now().year
-    recent_loans = loans.filter(start_date__year=current_year)
-    loan_activity_current_year = recent_loans.count()
+    loan_activity_current_year = profile.loans_current_year
 
     # Loan approved volume (total amount of loans taken)
-    total_loan_volume = sum(float(loan.loan_amount) for loan in loans)
+    total_loan_volume = profile.total_loan_volume
 
     # Credit score calculation (weighted factors)
     score = 0
@@ -231,21 +352,6 @@ def calculate_credit_score(customer):
     return min(100, max(0, round(score)))
 
 
-def calculate_emi(principal, annual_rate, tenure_months):
-    """
-    Calculate EMI using compound interest formula.
-    """
-    if annual_rate == 0:
-        return principal / tenure_months
-
-    monthly_rate = annual_rate / (12 * 100)  # Convert to decimal
-
-    emi = principal * (monthly_rate * (1 + monthly_rate) ** tenure_months) / \
-          ((1 + monthly_rate) ** tenure_months - 1)
-
-    return emi
-
-
 def apply_approval_rules(credit_score, requested_rate, loan_amount):
     """
     Apply approval rules based on credit score and return (approval, corrected_rate).
@@ -272,6 +378,100 @@ def apply_approval_rules(credit_score, requested_rate, loan_amount):
         # Do not approve any loans
         return False, None
 
+
+def approve_and_create_loan(customer, profile, loan_amount, interest_rate, tenure):
+    """
+    Apply the EMI and credit score rules to a loan application and create
+    the loan when approved. Must run under locked_customer_profile.
+    """
+    customer_id = customer.customer_id
+
+    # Calculate credit score
+    credit_score = calculate_credit_score(customer, profile)
+
+    # Check if sum of current loans exceeds approved limit
+    if profile.current_loans_sum > float(customer.approved_limit):
+        credit_score = 0
+
+    # Calculate monthly EMI
+    monthly_installment = calculate_emi(loan_amount, interest_rate, tenure)
+
+    # Check EMI constraint (sum of current EMIs > 50% of monthly salary)
+    if profile.current_emis_sum + monthly_installment > 0.5 * float(customer.monthly_salary):
+        # Loan rejected due to EMI constraint
+        record_loan_decision('rejected', 'emi_cap')
+        return JsonResponse({
+            'loan_id': None,
+            'customer_id': customer_id,
+            'loan_approved': False,
+            'message': 'Loan rejected: Total EMIs would exceed 50% of monthly salary',
+            'monthly_installment': round(monthly_installment, 2)
+        }, status=200)
+
+    # Apply approval rules based on credit score
+    approval, corrected_interest_rate = apply_approval_rules(
+        credit_score, interest_rate, loan_amount
+    )
+
+    if not approval:
+        # Loan rejected due to credit score
+        record_loan_decision('rejected', 'low_score')
+        return JsonResponse({
+            'loan_id': None,
+            'customer_id': customer_id,
+            'loan_approved': False,
+            'message': f'Loan rejected: Credit score {credit_score} is too low',
+            'monthly_installment': round(monthly_installment, 2)
+        }, status=200)
+
+    # Use corrected interest rate if provided, otherwise use original
+    final_interest_rate = corrected_interest_rate if corrected_interest_rate else interest_rate
+
+    # Recalculate EMI with corrected interest rate if needed
+    if corrected_interest_rate:
+        monthly_installment = calculate_emi(loan_amount, corrected_interest_rate, tenure)
+
+    # Create loan record
+    from datetime import datetime, timedelta
+    start_date = datetime.now().date()
+    end_date = start_date + timedelta(days=30 * tenure)  # Approximate end date
+
+    def create_loan_record(loan_id):
+        loan = Loan.objects.create(
+            loan_id=loan_id,
+            customer=customer,
+            loan_amount=to_cents(loan_amount),
+            tenure=tenure,
+            interest_rate=final_interest_rate,
+            monthly_repayment=to_cents(monthly_installment),
+            emis_paid_on_time=0,  # New loan, no payments yet
+            start_date=start_date,
+            end_date=end_date
+        )
+
+        # Keep the customer's credit summary in step with the new loan, and
+        # move the customer's loan list to a new version for view_loans ETags
+        record_new_loan(loan)
+        bump_new_loan_versions(customer_id, loan_id)
+        return loan
+
+    loan = create_with_id(loan_ids, create_loan_record)
+
+    logger.info(f"Created loan: {loan}")
+    record_loan_decision(
+        'approved', 'corrected_rate' if corrected_interest_rate else 'requested_rate'
+    )
+
+    # Return success response
+    return JsonResponse({
+        'loan_id': loan.loan_id,
+        'customer_id': customer_id,
+        'loan_approved': True,
+        'message': 'Loan approved and created successfully',
+        'monthly_installment': round(monthly_installment, 2)
+    }, status=201)
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def create_loan(request):
@@ -314,99 +514,105 @@ def create_loan(request):
         if tenure <= 0:
             return JsonResponse({'error': 'tenure must be positive'}, status=400)
 
-        # Get customer from database
+        # Decide and create under the customer's lock, so concurrent
+        # applications of one customer see each other's loans
         try:
-            customer = Customer.objects.get(customer_id=customer_id)
+            with locked_customer_profile(customer_id) as (customer, profile):
+                return approve_and_create_loan(
+                    customer, profile, loan_amount, interest_rate, tenure
+                )
         except Customer.DoesNotExist:
             return JsonResponse({'error': 'Customer not found'}, status=404)
 
-        # Calculate credit score
-        credit_score = calculate_credit_score(customer)
-
-        # Check if sum of current loans exceeds approved limit
-        current_loans_sum = sum(float(loan.loan_amount) for loan in customer.loans.all())
-        if current_loans_sum > float(customer.approved_limit):
-            credit_score = 0
-
-        # Calculate monthly EMI
-        monthly_installment = calculate_emi(loan_amount, interest_rate, tenure)
-
-        # Check EMI constraint (sum of current EMIs > 50% of monthly salary)
-        current_emis_sum = sum(float(loan.monthly_repayment) for loan in customer.loans.all())
-        if current_emis_sum + monthly_installment > 0.5 * float(customer.monthly_salary):
-            # Loan rejected due to EMI constraint
-            return JsonResponse({
-                'loan_id': None,
-                'customer_id': customer_id,
-                'loan_approved': False,
-                'message': 'Loan rejected: Total EMIs would exceed 50% of monthly salary',
-                'monthly_installment': round(monthly_installment, 2)
-            }, status=200)
-
-        # Apply approval rules based on credit score
-        approval, corrected_interest_rate = apply_approval_rules(
-            credit_score, interest_rate, loan_amount
-        )
-
-        if not approval:
-            # Loan rejected due to credit score
-            return JsonResponse({
-                'loan_id': None,
-                'customer_id': customer_id,
-                'loan_approved': False,
-                'message': f'Loan rejected: Credit score {credit_score} is too low',
-                'monthly_installment': round(monthly_installment, 2)
-            }, status=200)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except Exception as e:
+        logger.error(f"Error in create_loan endpoint: {str(e)}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
 
-        # Use corrected interest rate if provided, otherwise use original
-        final_interest_rate = corrected_interest_rate if corrected_interest_rate else interest_rate
+def loan_detail(loan):
+    """Serialize a loan with select_related customer in exact PRD format"""
+    # Prepare customer information
+    customer_data = {
+        'id': loan.customer.customer_id,
+        'first_name': loan.customer.first_name,
+        'last_name': loan.customer.last_name,
+        'phone_number': loan.customer.phone_number,
+        'age': loan.customer.age
+    }
+
+    return {
+        'loan_id': loan.loan_id,
+        'customer': customer_data,
+        'loan_amount': float(loan.loan_amount),
+        'interest_rate': float(loan.interest_rate),
+        'monthly_installment': float(loan.monthly_repayment),
+        'tenure': loan.tenure
+    }
+
+
+def not_modified_response(request, etag):
+    """
+    A 304 response when the request's If-None-Match matches etag,
+    otherwise None.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response['ETag'] = etag
+    return response
 
-        # Recalculate EMI with corrected interest rate if needed
-        if corrected_interest_rate:
-            monthly_installment = calculate_emi(loan_amount, corrected_interest_rate, tenure)
 
-        # Generate loan_id (auto-increment)
-        last_loan = Loan.objects.order_by('-loan_id').first()
-        loan_id = (last_loan.loan_id + 1) if last_loan else 1001
+def cached_response_body(etag):
+    """The cached JSON body of a view_loan(s) response with this ETag, or None"""
+    try:
+        return cache.get(response_cache_key(etag))
+    except Exception as e:
+        logger.warning(f"Loan response cache unavailable: {str(e)}")
+        return None
 
-        # Create loan record
-        from datetime import datetime, timedelta
-        start_date = datetime.now().date()
-        end_date = start_date + timedelta(days=30 * tenure)  # Approximate end date
 
-        loan = Loan.objects.create(
-            loan_id=loan_id,
-            customer=customer,
-            loan_amount=loan_amount,
-            tenure=tenure,
-            interest_rate=final_interest_rate,
-            monthly_repayment=monthly_installment,
-            emis_paid_on_time=0,  # New loan, no payments yet
-            start_date=start_date,
-            end_date=end_date
-        )
+def cache_response_body(etag, response):
+    """Cache the body of a successful view_loan(s) response under its ETag"""
+    try:
+        cache.set(response_cache_key(etag), response.content, settings.LOAN_RESPONSE_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"Could not cache loan response: {str(e)}")
 
-        logger.info(f"Created loan: {loan}")
 
-        # Return success response
-        return JsonResponse({
-            'loan_id': loan.loan_id,
-            'customer_id': customer_id,
-            'loan_approved': True,
-            'message': 'Loan approved and created successfully',
-            'monthly_installment': round(monthly_installment, 2)
-        }, status=201)
+def tagged_json_response(request, etag, build):
+    """
+    Serve a GET for the representation identified by etag: 304 when the
+    client already has it, the cached body when another client fetched
+    it, otherwise the response from build(), whose body is cached when it
+    succeeds. Only successful responses carry the ETag.
+    """
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        record_response_cache('not_modified')
+        return not_modified
+
+    body = cached_response_body(etag)
+    if body is not None:
+        record_response_cache('hit')
+        response = HttpResponse(body, content_type='application/json')
+    else:
+        record_response_cache('miss')
+        response = build()
+        if response.status_code != 200:
+            return response
+        cache_response_body(etag, response)
+
+    response['ETag'] = etag
+    return response
 
-    except json.JSONDecodeError:
-        return JsonResponse({'error': 'Invalid JSON'}, status=400)
-    except Exception as e:
-        logger.error(f"Error in create_loan endpoint: {str(e)}")
-        return JsonResponse({'error': 'Internal server error'}, status=500)
 
 def view_loan(request, loan_id):
     """
     View details of a loan and its customer.
     Returns loan details with customer information as per PRD.
+    Responses carry an ETag from the loan's version; once its owner is
+    known, a matching If-None-Match is answered with 304 without reading
+    the loan.
     """
     try:
         # Validate loan_id parameter
@@ -415,41 +621,157 @@ def view_loan(request, loan_id):
         except (ValueError, TypeError):
             return JsonResponse({'error': 'Invalid loan_id format'}, status=400)
 
-        # Get loan from database
+        def read_loan():
+            # Get loan from database
+            loan = Loan.objects.select_related('customer').filter(loan_id=loan_id).first()
+            if loan is not None:
+                remember_loan_owner(loan_id, loan.customer_id)
+            return loan
+
+        def respond(loan):
+            if loan is None:
+                return JsonResponse({'error': 'Loan not found'}, status=404)
+            return JsonResponse(loan_detail(loan), status=200)
+
+        version = loan_version(loan_id)
+        if version is None:
+            # The owner is not known yet, so the version needs the loan first
+            loan = read_loan()
+            if loan is None:
+                return respond(loan)
+            etag = view_loan_etag(loan_id, loan_version(loan_id, loan.customer_id))
+            return tagged_json_response(request, etag, lambda: respond(loan))
+
+        etag = view_loan_etag(loan_id, version)
+        return tagged_json_response(request, etag, lambda: respond(read_loan()))
+
+    except Exception as e:
+        logger.error(f"Error in view_loan endpoint: {str(e)}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+def view_loan_etag(loan_id, version):
+    return make_etag('view_loan', loan_id, version)
+
+
+def view_loans_etag(customer_id, version, query, today=None):
+    """
+    ETag of a view_loans response. Which loans are current depends on the
+    date, and the parameters select the page or stream format.
+    """
+    today = today or date.today()
+    variant = [query.get(name, '') for name in ('limit', 'cursor', 'stream')]
+    return make_etag('view_loans', customer_id, version, today.isoformat(), *variant)
+
+
+def encode_loans_cursor(start_date, loan_id):
+    """Opaque keyset cursor pointing after the loan (start_date, loan_id)"""
+    raw = f"{start_date.isoformat()}|{loan_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_loans_cursor(cursor):
+    """
+    Inverse of encode_loans_cursor.
+    Raises ValueError for malformed cursors.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        start_date, loan_id = raw.split('|')
+        return date.fromisoformat(start_date), int(loan_id)
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def parse_view_loans_options(query):
+    """
+    Read the pagination and streaming parameters of view_loans.
+    Returns ((paginated, streamed, limit, after), None) on success or
+    (None, error_message) on failure.
+    """
+    paginated = 'limit' in query or 'cursor' in query
+    streamed = query.get('stream', '').lower() in ('1', 'true')
+    if paginated and streamed:
+        return None, 'stream cannot be combined with limit or cursor'
+
+    limit = after = None
+    if paginated:
         try:
-            loan = Loan.objects.select_related('customer').get(loan_id=loan_id)
-        except Loan.DoesNotExist:
-            return JsonResponse({'error': 'Loan not found'}, status=404)
+            limit = int(query.get('limit', DEFAULT_LOANS_PAGE_SIZE))
+            if 'cursor' in query:
+                after = decode_loans_cursor(query['cursor'])
+        except ValueError as e:
+            return None, str(e)
+        if not 1 <= limit <= MAX_LOANS_PAGE_SIZE:
+            return None, f'limit must be between 1 and {MAX_LOANS_PAGE_SIZE}'
 
-        # Prepare customer information
-        customer_data = {
-            'id': loan.customer.customer_id,
-            'first_name': loan.customer.first_name,
-            'last_name': loan.customer.last_name,
-            'phone_number': loan.customer.phone_number,
-            'age': loan.customer.age
-        }
+    return (paginated, streamed, limit, after), None
 
-        # Prepare response in exact PRD format
-        response_data = {
-            'loan_id': loan.loan_id,
-            'customer': customer_data,
-            'loan_amount': float(loan.loan_amount),
-            'interest_rate': float(loan.interest_rate),
-            'monthly_installment': float(loan.monthly_repayment),
-            'tenure': loan.tenure
-        }
 
-        return JsonResponse(response_data, status=200)
+def current_loan_rows(customer_id, after=None):
+    """
+    The customer's current loans, newest first, as view_loans rows with
+    repayments left computed by the database (served by the
+    (customer_id, end_date) index).
+    With after=(start_date, loan_id), only loans strictly after that
+    keyset position are included.
+    """
+    loans = Loan.objects.filter(customer_id=customer_id).current().with_repayments_left()
+    if after is not None:
+        start_date, loan_id = after
+        loans = loans.filter(
+            Q(start_date__lt=start_date) | Q(start_date=start_date, loan_id__lt=loan_id)
+        )
+    return loans.order_by('-start_date', '-loan_id').values(
+        'loan_id', 'loan_amount', 'interest_rate', 'monthly_repayment', 'remaining_repayments',
+        'start_date'
+    )
+
+
+def loan_list_item(loan):
+    """Serialize a view_loans row in exact PRD format"""
+    return {
+        'loan_id': loan['loan_id'],
+        'loan_amount': float(loan['loan_amount']),
+        'interest_rate': float(loan['interest_rate']),
+        'monthly_installment': float(loan['monthly_repayment']),
+        'repayments_left': loan['remaining_repayments']
+    }
+
+
+def loan_page(rows, limit):
+    """
+    Build a paginated view_loans response from up to limit + 1 rows; the
+    extra row only signals that another page exists.
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_loans_cursor(rows[-1]['start_date'], rows[-1]['loan_id'])
+
+    return {
+        'loans': [loan_list_item(loan) for loan in rows],
+        'next_cursor': next_cursor
+    }
+
+
+def stream_loan_list(loans):
+    """Yield a JSON array of loans, reading rows in chunks from the database"""
+    yield '['
+    for index, loan in enumerate(loans.iterator(chunk_size=LOANS_STREAM_CHUNK_SIZE)):
+        yield (',' if index else '') + json.dumps(loan_list_item(loan))
+    yield ']'
 
-    except Exception as e:
-        logger.error(f"Error in view_loan endpoint: {str(e)}")
-        return JsonResponse({'error': 'Internal server error'}, status=500)
 
 def view_loans(request, customer_id):
     """
     View all current loans for a given customer.
     Returns list of loans with repayments_left calculation as per PRD.
+    Optional query parameters:
+      limit, cursor: keyset pagination over (start_date, loan_id), newest
+        first; returns {'loans': [...], 'next_cursor': ...} instead
+      stream=true: write the full list incrementally
+    Responses carry an ETag from the customer's version stamp; a matching
+    If-None-Match is answered with 304 without reading the loans.
     """
     try:
         # Validate customer_id parameter
@@ -458,29 +780,161 @@ def view_loans(request, customer_id):
         except (ValueError, TypeError):
             return JsonResponse({'error': 'Invalid customer_id format'}, status=400)
 
-        # Get customer from database
-        try:
-            customer = Customer.objects.get(customer_id=customer_id)
-        except Customer.DoesNotExist:
-            return JsonResponse({'error': 'Customer not found'}, status=404)
+        options, error = parse_view_loans_options(request.GET)
+        if error:
+            return JsonResponse({'error': error}, status=400)
+        paginated, streamed, limit, after = options
+
+        def build():
+            # Check customer exists
+            if not Customer.objects.filter(customer_id=customer_id).exists():
+                return JsonResponse({'error': 'Customer not found'}, status=404)
+
+            loans = current_loan_rows(customer_id, after)
+
+            if streamed:
+                return StreamingHttpResponse(
+                    stream_loan_list(loans), content_type='application/json', status=200
+                )
+
+            if paginated:
+                return JsonResponse(loan_page(list(loans[:limit + 1]), limit), status=200)
 
-        # Get all loans for this customer
-        loans = customer.loans.all()
+            # Prepare response in exact PRD format
+            loans_data = [loan_list_item(loan) for loan in loans]
+            return JsonResponse(loans_data, safe=False, status=200)
 
-        # Prepare response in exact PRD format
-        loans_data = []
-        for loan in loans:
-            loan_data = {
-                'loan_id': loan.loan_id,
-                'loan_amount': float(loan.loan_amount),
-                'interest_rate': float(loan.interest_rate),
-                'monthly_installment': float(loan.monthly_repayment),
-                'repayments_left': loan.repayments_left
-            }
-            loans_data.append(loan_data)
+        etag = view_loans_etag(customer_id, customer_version(customer_id), request.GET)
+        if streamed:
+            # Streamed lists are too large to keep in the response cache
+            not_modified = not_modified_response(request, etag)
+            if not_modified is not None:
+                return not_modified
+            response = build()
+            if response.status_code == 200:
+                response['ETag'] = etag
+            return response
 
-        return JsonResponse(loans_data, safe=False, status=200)
+        return tagged_json_response(request, etag, build)
 
     except Exception as e:
         logger.error(f"Error in view_loans endpoint: {str(e)}")
         return JsonResponse({'error': 'Internal server error'}, status=500)
+
+
+def loan_schedule_etag(loan_id, version, schedule_format):
+    return make_etag('loan_schedule', loan_id, version, schedule_format)
+
+
+class EchoBuffer:
+    """File-like object handing back what csv.writer writes, for streaming"""
+
+    def write(self, value):
+        return value
+
+
+def stream_schedule_json(loan, rows):
+    """
+    Yield the loan and its schedule as a JSON object, one instalment at a
+    time. monthly_installment is the stored repayment shown by view-loan;
+    schedule_installment is the EMI the schedule rows are built on.
+    """
+    header = json.dumps({
+        'loan_id': loan['loan_id'],
+        'customer_id': loan['customer_id'],
+        'loan_amount': float(loan['loan_amount']),
+        'interest_rate': float(loan['interest_rate']),
+        'tenure': loan['tenure'],
+        'monthly_installment': float(loan['monthly_repayment']),
+        'schedule_installment': schedule_installment(
+            loan['loan_amount'], loan['interest_rate'], loan['tenure']
+        ),
+        'emis_paid_on_time': loan['emis_paid_on_time'],
+    })
+    yield header[:-1] + ', "schedule": ['
+    for index, row in enumerate(rows):
+        row['due_date'] = row['due_date'].isoformat()
+        yield (',' if index else '') + json.dumps(row)
+    yield ']}'
+
+
+def stream_schedule_csv(rows):
+    """Yield the schedule as CSV lines, header first"""
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(SCHEDULE_COLUMNS)
+    for row in rows:
+        yield writer.writerow([row[column] for column in SCHEDULE_COLUMNS])
+
+
+@require_http_methods(["GET"])
+def loan_schedule(request, loan_id):
+    """
+    Stream the month-by-month amortization schedule of a loan (payment,
+    interest, principal and balance), generated as it is written.
+    Optional query parameter format=csv returns CSV instead of JSON.
+    Responses carry an ETag from the loan's version.
+    """
+    try:
+        # Validate loan_id parameter
+        try:
+            loan_id = int(loan_id)
+        except (ValueError, TypeError):
+            return JsonResponse({'error': 'Invalid loan_id format'}, status=400)
+
+        schedule_format = request.GET.get('format', 'json').lower()
+        if schedule_format not in ('json', 'csv'):
+            return JsonResponse({'error': 'format must be json or csv'}, status=400)
+
+        version = loan_version(loan_id)
+        if version is not None:
+            etag = loan_schedule_etag(loan_id, version, schedule_format)
+            not_modified = not_modified_response(request, etag)
+            if not_modified is not None:
+                return not_modified
+
+        loan = Loan.objects.filter(loan_id=loan_id).values(
+            'loan_id', 'customer_id', 'loan_amount', 'interest_rate', 'tenure',
+            'monthly_repayment', 'emis_paid_on_time', 'start_date'
+        ).first()
+        if loan is None:
+            return JsonResponse({'error': 'Loan not found'}, status=404)
+        remember_loan_owner(loan_id, loan['customer_id'])
+        if version is None:
+            # The owner was not known yet, so the version needed the loan first
+            version = loan_version(loan_id, loan['customer_id'])
+            etag = loan_schedule_etag(loan_id, version, schedule_format)
+            not_modified = not_modified_response(request, etag)
+            if not_modified is not None:
+                return not_modified
+        if loan['tenure'] < 1:
+            return JsonResponse({'error': 'Loan has no instalments to schedule'}, status=400)
+
+        rows = iter_schedule(
+            loan['loan_amount'], loan['interest_rate'], loan['tenure'], loan['start_date'],
+            loan['emis_paid_on_time']
+        )
+        if schedule_format == 'csv':
+            response = StreamingHttpResponse(stream_schedule_csv(rows), content_type='text/csv')
+            response['Content-Disposition'] = (
+                f'attachment; filename="loan-{loan_id}-schedule.csv"'
+            )
+        else:
+            response = StreamingHttpResponse(
+                stream_schedule_json(loan, rows), content_type='application/json'
+            )
+        response['ETag'] = etag
+        return response
+
+    except Exception as e:
+        logger.error(f"Error in loan_schedule endpoint: {str(e)}")
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    """
+    Prometheus metrics of every web and Celery process sharing
+    PROMETHEUS_MULTIPROC_DIR (or of this process when it is unset).
+    """
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)